@@ -8,6 +8,7 @@
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
@@ -15,6 +16,12 @@ import json
 
 from app.services.config import settings
 from app.services.llm_service import LLMService
+from app.services.llm_scheduler import PRIORITY_NORMAL, PRIORITY_BATCH
+from app.services.job_manager import job_manager, Job
+from app.services.spec_extractor import spec_extractor
+from app.services.file_utils import write_json_atomic
+from app.services.asset_index import asset_index
+from app.services.resource_types import SPEC_TYPES
 
 router = APIRouter()
 llm = LLMService()
@@ -26,12 +33,14 @@ class GenerateDocRequest(BaseModel):
     """生成文档请求"""
     project_id: str
     doc_type: str = "main"  # main / character / gameplay / scene / item / quest / ui / audio
+    force_regenerate: bool = False  # 跳过 LLM 响应缓存
 
 
 class ExtractSpecRequest(BaseModel):
     """提取JSON规格请求"""
     project_id: str
     doc_type: str  # character / gameplay / scene / item / quest / ui / audio
+    force_regenerate: bool = False  # 跳过 LLM 响应缓存
 
 
 class DocumentResponse(BaseModel):
@@ -152,7 +161,9 @@ async def generate_document(request: GenerateDocRequest):
         project_intro=project["intro"],
         game_type=project["game_type"],
         art_style=project["art_style"],
-        doc_type=request.doc_type
+        doc_type=request.doc_type,
+        bypass_cache=request.force_regenerate,
+        project_id=request.project_id
     )
     
     # 保存文档
@@ -168,53 +179,105 @@ async def generate_document(request: GenerateDocRequest):
     )
 
 
-@router.get("/{project_id}/specs")
-async def list_specs(project_id: str):
-    """获取项目所有规格文件列表"""
-    specs_dir = os.path.join(settings.PROJECTS_DIR, project_id, "specs")
+@router.post("/generate-stream")
+async def generate_document_stream(request: GenerateDocRequest):
+    """
+    流式生成设计文档 (Server-Sent Events)
     
-    if not os.path.exists(specs_dir):
-        return {"project_id": project_id, "specs": [], "total": 0, "extracted": 0}
+    逐段转发 LLM 输出:
+    - event: start  连接建立，立即发送
+    - event: delta  {"content": "..."} 增量文本
+    - event: done   {"file_path": "...", "length": N} 生成完成
+    - event: error  {"detail": "..."} 生成失败
     
-    # 可提取规格的文档类型
-    spec_types = ["character", "scene", "item", "audio", "gameplay", "quest", "ui"]
+    收到首段文本后即开始增量写入 documents/<file>.md，
+    客户端中途断开时已生成的内容不会丢失
+    """
+    project_path = os.path.join(settings.PROJECTS_DIR, request.project_id)
+    metadata_path = os.path.join(project_path, "project.json")
     
-    specs = []
-    for spec_type in spec_types:
-        spec_path = os.path.join(specs_dir, f"{spec_type}.json")
-        exists = os.path.exists(spec_path)
+    if not os.path.exists(metadata_path):
+        raise HTTPException(status_code=404, detail="项目不存在")
+    
+    if request.doc_type not in DOC_TYPES:
+        raise HTTPException(status_code=400, detail=f"无效的文档类型: {request.doc_type}")
+    
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        project = json.load(f)
+    
+    doc_config = DOC_TYPES[request.doc_type]
+    doc_path = os.path.join(project_path, "documents", doc_config["filename"])
+    
+    async def event_stream():
+        yield _sse_event("start", {"project_id": request.project_id, "doc_type": request.doc_type})
         
+        # 延迟到首段文本到达时再打开文件，避免 LLM 立即失败时清空旧文档
+        doc_file = None
+        length = 0
+        try:
+            async for delta in llm.generate_document_stream(
+                project_name=project["name"],
+                project_intro=project["intro"],
+                game_type=project["game_type"],
+                art_style=project["art_style"],
+                doc_type=request.doc_type,
+                bypass_cache=request.force_regenerate,
+                project_id=request.project_id
+            ):
+                if doc_file is None:
+                    doc_file = open(doc_path, "w", encoding="utf-8")
+                doc_file.write(delta)
+                doc_file.flush()
+                length += len(delta)
+                yield _sse_event("delta", {"content": delta})
+            
+            yield _sse_event("done", {"file_path": doc_path, "length": length})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"文档生成失败: {str(e)}"})
+        finally:
+            if doc_file is not None:
+                doc_file.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 禁止反向代理缓冲
+        }
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """格式化一条 SSE 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get("/{project_id}/specs")
+async def list_specs(project_id: str):
+    """获取项目所有规格文件列表 (查询元数据索引)"""
+    indexed = await asset_index.list_specs(project_id)
+    
+    specs = []
+    for spec_type in SPEC_TYPES:
         spec_info = {
             "spec_type": spec_type,
             "title": DOC_TYPES.get(spec_type, {}).get("title", spec_type),
-            "exists": exists
+            "exists": spec_type in indexed
         }
-        
-        if exists:
-            stat = os.stat(spec_path)
-            spec_info["size"] = stat.st_size
-            spec_info["modified_at"] = stat.st_mtime
-            
-            # 读取规格文件内容概要
-            try:
-                with open(spec_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    # 统计条目数量
-                    if isinstance(data, dict):
-                        for key, value in data.items():
-                            if isinstance(value, list):
-                                spec_info["item_count"] = len(value)
-                                break
-            except Exception:
-                pass
-        
+        if spec_type in indexed:
+            info = indexed[spec_type]
+            spec_info["size"] = info["size"]
+            spec_info["modified_at"] = info["modified_at"]
+            if info["item_count"] is not None:
+                spec_info["item_count"] = info["item_count"]
         specs.append(spec_info)
     
     return {
         "project_id": project_id,
         "specs": specs,
         "total": len(specs),
-        "extracted": sum(1 for s in specs if s["exists"])
+        "extracted": len(indexed)
     }
 
 
@@ -261,12 +324,32 @@ async def update_document(project_id: str, doc_type: str, content: str):
 
 
 @router.post("/extract-spec")
-async def extract_spec(request: ExtractSpecRequest):
+async def extract_spec(request: ExtractSpecRequest, background: bool = False):
     """
     从文档提取 JSON 规格
     
-    将 Markdown 文档中的设计转换为结构化 JSON 数据
+    将 Markdown 文档中的设计转换为结构化 JSON 数据。
+    background=true 时提交后台任务并立即返回任务 ID
     """
+    if background:
+        job = await job_manager.submit("extract_spec", request.project_id, request.model_dump())
+        return {
+            "project_id": request.project_id,
+            "doc_type": request.doc_type,
+            "job_id": job.id,
+            "status": job.status
+        }
+    
+    return await _extract_spec(request)
+
+
+@job_manager.handler("extract_spec")
+async def _extract_spec_job(job: Job):
+    return await _extract_spec(ExtractSpecRequest(**job.params), priority=PRIORITY_BATCH)
+
+
+async def _extract_spec(request: ExtractSpecRequest, priority: int = PRIORITY_NORMAL):
+    """读取文档、调用 LLM 提取并保存规格文件 (后台任务以批量优先级排队)"""
     # 读取对应的文档
     doc_config = DOC_TYPES.get(request.doc_type)
     if not doc_config:
@@ -282,21 +365,27 @@ async def extract_spec(request: ExtractSpecRequest):
     with open(doc_path, "r", encoding="utf-8") as f:
         doc_content = f.read()
     
-    # 调用 LLM 提取规格
-    spec_data = await llm.extract_spec(doc_content, request.doc_type)
+    # 按章节增量提取 (只有内容变化的章节调用 LLM)
+    extraction = await spec_extractor.extract(
+        request.project_id, request.doc_type, doc_content,
+        bypass_cache=request.force_regenerate,
+        priority=priority
+    )
+    spec_data = extraction["spec"]
     
     # 保存规格文件
     spec_path = os.path.join(
         settings.PROJECTS_DIR, request.project_id, "specs", f"{request.doc_type}.json"
     )
-    with open(spec_path, "w", encoding="utf-8") as f:
-        json.dump(spec_data, f, ensure_ascii=False, indent=2)
+    write_json_atomic(spec_path, spec_data)
+    await asset_index.refresh_spec(request.project_id, request.doc_type)
     
     return {
         "project_id": request.project_id,
         "doc_type": request.doc_type,
         "spec": spec_data,
-        "file_path": spec_path
+        "file_path": spec_path,
+        "sections": {key: extraction[key] for key in ("sections", "extracted", "reused", "failed")}
     }
 
 
@@ -10,15 +10,17 @@
 
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, Any
+from collections import OrderedDict
 import os
-import subprocess
-import psutil
 import json
 import asyncio
 from datetime import datetime
 
 from app.services.config import settings
+from app.services.preview_server import preview_server
+from app.services.preview_watcher import preview_watcher
+from app.services.event_bus import event_bus
 
 router = APIRouter()
 
@@ -38,128 +40,57 @@ class GameInstance(BaseModel):
 # ============ 游戏实例管理器 ============
 
 class GameInstanceManager:
-    """管理所有运行中的游戏预览实例"""
+    """
+    管理所有运行中的游戏预览实例
+
+    预览由后端进程内的静态服务提供 (/preview/<项目ID>/)，不再为每个项目启动 npx serve 子进程
+    """
     
     def __init__(self):
-        self._instances: Dict[str, Dict] = {}
-        self._base_port = settings.GAME_PREVIEW_PORT
+        self._port = settings.BACKEND_PORT
     
-    def _get_available_port(self) -> int:
-        """获取可用端口"""
-        used_ports = {inst["port"] for inst in self._instances.values()}
-        port = self._base_port
-        while port in used_ports:
-            port += 1
-        return port
+    def _instance(self, project_id: str, started_at: float) -> GameInstance:
+        return GameInstance(
+            project_id=project_id,
+            port=self._port,
+            status="running",
+            started_at=datetime.fromtimestamp(started_at).isoformat(),
+            url=f"http://localhost:{self._port}/preview/{project_id}/"
+        )
     
     async def start_preview(self, project_id: str) -> GameInstance:
-        """启动游戏预览"""
-        # 检查是否已在运行
-        if project_id in self._instances:
-            inst = self._instances[project_id]
-            if inst["status"] == "running":
-                return GameInstance(**inst)
-        
+        """启动游戏预览 (注册静态目录，立即可用)"""
         # 获取项目路径
-        project_path = os.path.join(settings.PROJECTS_DIR, project_id)
+        project_path = os.path.abspath(os.path.join(settings.PROJECTS_DIR, project_id))
         game_path = os.path.join(project_path, "game")
         
         if not os.path.exists(game_path):
             raise HTTPException(status_code=404, detail="游戏目录不存在")
         
-        port = self._get_available_port()
-        
-        try:
-            # 启动开发服务器 (使用 npx serve 或类似工具)
-            process = subprocess.Popen(
-                ["npx", "serve", "-l", str(port), game_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                cwd=game_path
-            )
-            
-            # 等待服务启动
-            await asyncio.sleep(2)
-            
-            if process.poll() is not None:
-                raise HTTPException(status_code=500, detail="游戏启动失败")
-            
-            instance_info = {
-                "project_id": project_id,
-                "process_id": process.pid,
-                "port": port,
-                "status": "running",
-                "started_at": datetime.now().isoformat(),
-                "url": f"http://localhost:{port}"
-            }
-            
-            self._instances[project_id] = instance_info
-            return GameInstance(**instance_info)
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"启动失败: {str(e)}")
+        started_at = preview_server.start(project_id, project_path, game_path)
+        # 文件变化推送给该项目的 WebSocket 连接 (热重载)
+        preview_watcher.watch(project_id, project_path, lambda events: _push_changes(project_id, events))
+        return self._instance(project_id, started_at)
     
     async def stop_preview(self, project_id: str) -> bool:
         """停止游戏预览"""
-        if project_id not in self._instances:
-            return True
-        
-        inst = self._instances[project_id]
-        pid = inst.get("process_id")
-        
-        if pid:
-            try:
-                # 终止进程及其子进程
-                parent = psutil.Process(pid)
-                for child in parent.children(recursive=True):
-                    child.terminate()
-                parent.terminate()
-                
-                # 等待进程结束
-                parent.wait(timeout=5)
-            except psutil.NoSuchProcess:
-                pass
-            except Exception as e:
-                print(f"停止进程失败: {e}")
-        
-        del self._instances[project_id]
+        preview_server.stop(project_id)
+        await preview_watcher.unwatch(project_id)
         return True
     
     def get_status(self, project_id: str) -> GameInstance:
         """获取预览状态"""
-        if project_id not in self._instances:
+        if not preview_server.is_running(project_id):
             return GameInstance(
                 project_id=project_id,
                 port=0,
                 status="stopped"
             )
-        
-        inst = self._instances[project_id]
-        pid = inst.get("process_id")
-        
-        # 检查进程是否还在运行
-        if pid:
-            try:
-                process = psutil.Process(pid)
-                if process.is_running():
-                    return GameInstance(**inst)
-            except psutil.NoSuchProcess:
-                pass
-        
-        # 进程已结束
-        del self._instances[project_id]
-        return GameInstance(
-            project_id=project_id,
-            port=0,
-            status="stopped"
-        )
+        return self._instance(project_id, preview_server.start_time(project_id))
     
     def list_instances(self) -> list:
         """列出所有运行中的实例"""
-        result = []
-        for project_id in list(self._instances.keys()):
-            result.append(self.get_status(project_id))
-        return result
+        return [self.get_status(project_id) for project_id in preview_server.running()]
 
 
 # 全局实例管理器
@@ -196,32 +127,151 @@ async def list_game_instances():
 
 # ============ WebSocket 实时通信 ============
 
+class _Client:
+    """
+    单个 WebSocket 连接的发送队列
+
+    消息按到达顺序排队，由独立的发送任务写出；带合并键的消息会替换队列中尚未发出的同键旧消息。
+    队列满时丢弃最旧的消息 (慢客户端只会丢自己的消息，不影响其他连接)
+    """
+    
+    def __init__(self, websocket: WebSocket, max_queue: int):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.pending: "OrderedDict[Any, str]" = OrderedDict()
+        self.ready = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self._seq = 0
+    
+    def enqueue(self, text: str, coalesce_key: Optional[str] = None):
+        if coalesce_key is not None and coalesce_key in self.pending:
+            self.pending[coalesce_key] = text
+            self.coalesced += 1
+        else:
+            if len(self.pending) >= self.max_queue:
+                self.pending.popitem(last=False)
+                self.dropped += 1
+            self._seq += 1
+            self.pending[coalesce_key if coalesce_key is not None else self._seq] = text
+        self.ready.set()
+
+
 class ConnectionManager:
-    """WebSocket 连接管理器"""
+    """
+    WebSocket 连接管理器
+
+    - 每条消息只序列化一次，放入各连接的有界队列后立即返回 (广播不等待任何客户端)
+    - 每个连接由自己的任务发送，慢连接或断开的连接不会阻塞同项目的其他连接
+    - 发送超时或失败的连接会被关闭并移除
+    """
     
-    def __init__(self):
-        self.active_connections: Dict[str, list] = {}
+    def __init__(self, max_queue: int, send_timeout: float):
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.active_connections: Dict[str, Dict[WebSocket, _Client]] = {}
+        self.broadcasts = 0
+        self.pruned = 0
     
     async def connect(self, websocket: WebSocket, project_id: str):
         await websocket.accept()
-        if project_id not in self.active_connections:
-            self.active_connections[project_id] = []
-        self.active_connections[project_id].append(websocket)
+        client = _Client(websocket, self.max_queue)
+        client.task = asyncio.create_task(self._writer(project_id, client))
+        self.active_connections.setdefault(project_id, {})[websocket] = client
     
     def disconnect(self, websocket: WebSocket, project_id: str):
-        if project_id in self.active_connections:
-            self.active_connections[project_id].remove(websocket)
+        clients = self.active_connections.get(project_id)
+        client = clients.pop(websocket, None) if clients is not None else None
+        if clients is not None and not clients:
+            del self.active_connections[project_id]
+        if client and client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
     
-    async def broadcast(self, project_id: str, message: dict):
-        if project_id in self.active_connections:
-            for connection in self.active_connections[project_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    pass
+    async def _writer(self, project_id: str, client: _Client):
+        """逐条发送连接队列中的消息，失败或超时则移除该连接"""
+        try:
+            while True:
+                await client.ready.wait()
+                while client.pending:
+                    _, text = client.pending.popitem(last=False)
+                    await asyncio.wait_for(client.websocket.send_text(text), timeout=self.send_timeout)
+                    client.sent += 1
+                client.ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.pruned += 1
+            self.disconnect(client.websocket, project_id)
+            try:
+                await client.websocket.close()
+            except Exception:
+                pass
+    
+    def send(self, websocket: WebSocket, project_id: str, message: dict):
+        """发送给单个连接 (与广播共用发送队列，保证同一连接上的消息顺序)"""
+        client = self.active_connections.get(project_id, {}).get(websocket)
+        if client:
+            client.enqueue(json.dumps(message, ensure_ascii=False))
+    
+    async def broadcast(self, project_id: str, message: dict, coalesce_key: Optional[str] = None):
+        """
+        广播给项目的所有连接
+        
+        Args:
+            coalesce_key: 合并键，同键消息尚未发出时只保留最新一条 (如同一纹理的多次变化)
+        """
+        self.broadcast_nowait(project_id, message, coalesce_key)
+    
+    def broadcast_nowait(self, project_id: str, message: dict, coalesce_key: Optional[str] = None):
+        """同 broadcast，供同步代码 (事件总线订阅) 调用"""
+        clients = self.active_connections.get(project_id)
+        if not clients:
+            return
+        text = json.dumps(message, ensure_ascii=False)
+        for client in list(clients.values()):
+            client.enqueue(text, coalesce_key)
+        self.broadcasts += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "broadcasts": self.broadcasts,
+            "pruned": self.pruned,
+            "max_queue": self.max_queue,
+            "projects": {
+                project_id: [
+                    {
+                        "queue_depth": len(client.pending),
+                        "sent": client.sent,
+                        "dropped": client.dropped,
+                        "coalesced": client.coalesced
+                    }
+                    for client in clients.values()
+                ]
+                for project_id, clients in self.active_connections.items()
+            }
+        }
 
 
-ws_manager = ConnectionManager()
+ws_manager = ConnectionManager(
+    max_queue=settings.WS_SEND_QUEUE_SIZE,
+    send_timeout=settings.WS_SEND_TIMEOUT
+)
+
+
+# 生成进度事件经同一通道推送给编辑器
+event_bus.subscribe(lambda event, key: ws_manager.broadcast_nowait(event["project_id"], event, key))
+
+
+async def _push_changes(project_id: str, events: list):
+    """把预览目录的文件变化逐条广播给页面"""
+    for event in events:
+        # 同一资源在页面取走之前的多次变化只推送最新一次
+        await ws_manager.broadcast(
+            project_id, {**event, "project_id": project_id},
+            coalesce_key=f"{event['type']}:{event.get('key') or event.get('path')}"
+        )
 
 
 @router.websocket("/ws/{project_id}")
@@ -233,7 +283,10 @@ async def websocket_endpoint(websocket: WebSocket, project_id: str):
     - start: 启动游戏
     - stop: 停止游戏
     - status: 获取状态
-    - reload: 热重载
+    - reload: 通知该项目的所有预览页面整页刷新
+    
+    预览运行期间服务端还会推送文件变化事件 (见 preview_watcher):
+    texture_changed / audio_changed / animation_changed / atlas_changed / manifest_changed / code_changed
     """
     await ws_manager.connect(websocket, project_id)
     
@@ -243,32 +296,42 @@ async def websocket_endpoint(websocket: WebSocket, project_id: str):
             action = data.get("action")
             
             if action == "start":
-                result = await game_manager.start_preview(project_id)
-                await websocket.send_json({
+                try:
+                    result = await game_manager.start_preview(project_id)
+                except HTTPException as e:
+                    ws_manager.send(websocket, project_id, {"type": "error", "detail": e.detail})
+                    continue
+                ws_manager.send(websocket, project_id, {
                     "type": "started",
                     "data": result.model_dump()
                 })
                 
             elif action == "stop":
                 await game_manager.stop_preview(project_id)
-                await websocket.send_json({
+                ws_manager.send(websocket, project_id, {
                     "type": "stopped",
                     "project_id": project_id
                 })
                 
             elif action == "status":
                 status = game_manager.get_status(project_id)
-                await websocket.send_json({
+                ws_manager.send(websocket, project_id, {
                     "type": "status",
                     "data": status.model_dump()
                 })
                 
             elif action == "reload":
-                # TODO: 实现热重载
-                await websocket.send_json({
+                await ws_manager.broadcast(project_id, {
+                    "type": "code_changed",
+                    "project_id": project_id,
+                    "paths": []
+                }, coalesce_key="code_changed:")
+                ws_manager.send(websocket, project_id, {
                     "type": "reloaded",
                     "project_id": project_id
                 })
                 
-    except WebSocketDisconnect:
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
         ws_manager.disconnect(websocket, project_id)
@@ -0,0 +1,40 @@
+"""
+后台任务 API
+
+查询与取消长耗时生成任务
+- 获取任务状态与逐条进度
+- 列出项目任务
+- 取消任务
+"""
+
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+
+from app.services.job_manager import job_manager
+
+router = APIRouter()
+
+
+@router.get("/")
+async def list_jobs(project_id: Optional[str] = None):
+    """列出任务（可按项目过滤）"""
+    jobs = [job.to_dict() for job in await job_manager.list_jobs(project_id)]
+    return {"jobs": jobs, "total": len(jobs)}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """获取任务状态"""
+    job = await job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job.to_dict()
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """取消任务"""
+    job = await job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {"message": "已请求取消", "job_id": job_id, "status": job.status}
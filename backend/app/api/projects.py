@@ -8,16 +8,19 @@
 - 删除项目
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+import asyncio
 import os
 import json
 import shutil
 import uuid
 
 from app.services.config import settings
+from app.services.blob_store import blob_store
+from app.services.asset_index import asset_index
 
 router = APIRouter()
 
@@ -47,6 +50,8 @@ class ProjectListResponse(BaseModel):
     """项目列表响应"""
     projects: List[ProjectInfo]
     total: int
+    offset: int = 0
+    limit: Optional[int] = None
 
 
 # ============ API 端点 ============
@@ -89,6 +94,7 @@ async def create_project(project: ProjectCreate):
         metadata_path = os.path.join(project_dir, "project.json")
         with open(metadata_path, "w", encoding="utf-8") as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+        await asset_index.refresh_project(project_id)
         
         return ProjectInfo(**metadata)
         
@@ -100,30 +106,21 @@ async def create_project(project: ProjectCreate):
 
 
 @router.get("/", response_model=ProjectListResponse)
-async def list_projects():
-    """获取所有项目列表"""
-    projects = []
-    projects_dir = settings.PROJECTS_DIR
-    
-    if not os.path.exists(projects_dir):
-        return ProjectListResponse(projects=[], total=0)
+async def list_projects(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """获取项目列表 (按创建时间倒序分页，查询元数据索引)"""
+    rows, total = await asset_index.list_projects(offset, limit)
     
-    for project_id in os.listdir(projects_dir):
-        project_path = os.path.join(projects_dir, project_id)
-        metadata_path = os.path.join(project_path, "project.json")
-        
-        if os.path.isdir(project_path) and os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    metadata = json.load(f)
-                    projects.append(ProjectInfo(**metadata))
-            except Exception:
-                pass  # 跳过无效项目
-    
-    # 按创建时间排序（最新优先）
-    projects.sort(key=lambda x: x.created_at, reverse=True)
+    projects = []
+    for metadata in rows:
+        try:
+            projects.append(ProjectInfo(**metadata))
+        except Exception:
+            pass  # 跳过无效项目
     
-    return ProjectListResponse(projects=projects, total=len(projects))
+    return ProjectListResponse(projects=projects, total=total, offset=offset, limit=limit)
 
 
 @router.get("/{project_id}", response_model=ProjectInfo)
@@ -150,6 +147,9 @@ async def delete_project(project_id: str):
     
     try:
         shutil.rmtree(project_path)
+        await asset_index.refresh_tree(project_id)
+        # 回收只被该项目引用的资源内容
+        await asyncio.to_thread(blob_store.gc)
         return {"message": "项目已删除", "project_id": project_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
@@ -174,5 +174,6 @@ async def update_project_status(project_id: str, status: str):
     
     with open(metadata_path, "w", encoding="utf-8") as f:
         json.dump(metadata, f, ensure_ascii=False, indent=2)
+    await asset_index.refresh_project(project_id)
     
     return {"message": "状态已更新", "status": status}
@@ -8,7 +8,7 @@
 - 资源选择与确认
 """
 
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Query, Header, Response
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import os
@@ -26,6 +26,25 @@ from datetime import datetime
 
 from app.services.config import settings
 from app.services.llm_service import LLMService
+from app.services.llm_scheduler import LLMBusyError, PRIORITY_BATCH
+from app.services.job_manager import job_manager, Job
+from app.services.generator_pool import generator_pool
+from app.services.image_stylizer import stylize_pool, STYLES, DEFAULT_STYLES
+from app.services.file_utils import write_json_atomic
+from app.services.render_cache import render_cache
+from app.services.blob_store import blob_store
+from app.services.resource_types import RESOURCE_TYPES
+from app.services.asset_index import asset_index
+from app.services.animation_meta import animation_meta, split_spritesheet, ANIMATION_TYPES, SPRITESHEET_NAME
+from app.services.atlas_packer import atlas_packer
+from app.services.asset_manifest import asset_manifest
+from app.services.event_bus import (
+    event_bus, EVENT_SCRIPT_SAVED, EVENT_VARIANT_RENDERED, EVENT_STYLIZE_DONE,
+    EVENT_ANIMATION_RENDERED, EVENT_ERROR
+)
+from app.services.script_validator import (
+    script_validator, ScriptValidationError, KIND_RESOURCE, KIND_ANIMATION
+)
 
 router = APIRouter()
 llm = LLMService()
@@ -63,16 +82,12 @@ class ResourceVariant(BaseModel):
     selected: bool = False
 
 
-# ============ 资源类型配置 ============
-
-RESOURCE_TYPES = {
-    "character": {"folder": "characters", "extension": ".png", "category": "image"},
-    "scene": {"folder": "scenes", "extension": ".png", "category": "image"},
-    "item": {"folder": "items", "extension": ".png", "category": "image"},
-    "ui": {"folder": "ui", "extension": ".png", "category": "image"},
-    "bgm": {"folder": "audio/bgm", "extension": ".wav", "category": "audio"},
-    "sfx": {"folder": "audio/sfx", "extension": ".wav", "category": "audio"},
-}
+async def _refresh_asset_manifest(project_id: str):
+    """正式资源变化后重新生成游戏资源清单 (失败不影响主流程)"""
+    try:
+        await asyncio.to_thread(asset_manifest.build, project_id)
+    except Exception as e:
+        print(f"生成资源清单失败: {e}")
 
 
 # ============ API 端点 ============
@@ -117,7 +132,8 @@ async def generate_resource(request: GenerateResourceRequest):
         resource_type=request.resource_type,
         description=request.description,
         params=params,
-        category=resource_config["category"]
+        category=resource_config["category"],
+        project_id=request.project_id
     )
     
     # 保存脚本
@@ -125,8 +141,8 @@ async def generate_resource(request: GenerateResourceRequest):
         project_path, "scripts", "generators", 
         f"{request.resource_type}_{request.resource_id}_{variant_id}.py"
     )
-    with open(script_path, "w", encoding="utf-8") as f:
-        f.write(script_content)
+    # 静态检查通过后才保存 (未通过时由全局异常处理返回 422)
+    script_validator.save(script_path, script_content, KIND_RESOURCE)
     
     # 输出文件路径
     output_path = os.path.join(
@@ -134,14 +150,8 @@ async def generate_resource(request: GenerateResourceRequest):
     )
     
     # 执行脚本生成资源
-    import subprocess
     try:
-        result = subprocess.run(
-            ["python", script_path, "--output", output_path],
-            capture_output=True,
-            text=True,
-            timeout=120
-        )
+        result = await generator_pool.run(script_path, ["--output", output_path], timeout=120)
         
         if result.returncode != 0:
             raise HTTPException(
@@ -149,6 +159,8 @@ async def generate_resource(request: GenerateResourceRequest):
                 detail=f"脚本执行失败: {result.stderr}"
             )
             
+    except HTTPException:
+        raise
     except subprocess.TimeoutExpired:
         raise HTTPException(status_code=500, detail="脚本执行超时")
     except Exception as e:
@@ -162,12 +174,11 @@ async def generate_resource(request: GenerateResourceRequest):
         "created_at": datetime.now().isoformat(),
         "params": params,
         "description": request.description,
-        "selected": False
+        "selected": False,
+        "blob": blob_store.ingest(output_path)
     }
     
-    meta_path = os.path.join(variants_dir, f"{variant_id}.json")
-    with open(meta_path, "w", encoding="utf-8") as f:
-        json.dump(variant_meta, f, ensure_ascii=False, indent=2)
+    write_json_atomic(os.path.join(variants_dir, f"{variant_id}.json"), variant_meta)
     
     return {
         "project_id": request.project_id,
@@ -177,106 +188,154 @@ async def generate_resource(request: GenerateResourceRequest):
     }
 
 
-@router.get("/{project_id}/{resource_type}/{resource_id}/variants")
-async def list_variants(project_id: str, resource_type: str, resource_id: str):
-    """获取资源的所有变体（从temp临时目录读取）"""
-    if resource_type not in RESOURCE_TYPES:
-        raise HTTPException(status_code=400, detail=f"无效的资源类型: {resource_type}")
-    
-    resource_config = RESOURCE_TYPES[resource_type]
-    
-    # 路径统一使用绝对路径
-    projects_dir_abs = os.path.abspath(settings.PROJECTS_DIR)
-    project_path = os.path.join(projects_dir_abs, project_id)
-    
-    # 从temp临时目录读取候选变体
-    variants_dir = os.path.join(
-        project_path, "temp",
-        resource_config["folder"], resource_id, "variants"
+def _animation_dir(project_id: str, resource_id: str) -> str:
+    return os.path.join(
+        os.path.abspath(settings.PROJECTS_DIR), project_id, "assets", "characters", resource_id, "animations"
     )
+
+
+def _animation_info(project_id: str, resource_id: str) -> Dict[str, Any]:
+    """角色的序列帧动画信息 (读取动画清单，文件变化时才重新解析图片；同步，在线程中调用)"""
+    animation = {"exists": False, "types": {}}
+    anim_dir = _animation_dir(project_id, resource_id)
+    if not os.path.exists(anim_dir):
+        return animation
+    
+    files = animation_meta.update(anim_dir)
+    base_url = f"/assets/{project_id}/assets/characters/{resource_id}/animations"
+    
+    # 兼容旧的整体式
+    if os.path.exists(os.path.join(anim_dir, SPRITESHEET_NAME)):
+        animation["exists"] = True
+        animation["spritesheet_url"] = f"{base_url}/{SPRITESHEET_NAME}"
+    
+    # 独立的动作文件 (重点)
+    for atype in ANIMATION_TYPES:
+        filename = f"anim_{atype}.png"
+        if not os.path.exists(os.path.join(anim_dir, filename)):
+            continue
+        animation["exists"] = True
+        meta = files.get(filename)
+        if meta and not meta.get("error"):
+            # 内容的实际包围盒用于减少透明边框导致的缩放过小问题，传给前端进行精准缩放
+            animation["types"][atype] = {
+                "url": f"{base_url}/{filename}",
+                "frames": meta["frames"],
+                "frameSize": meta["frameSize"],
+                "content_bbox": meta["content_bbox"],
+                "frame_bboxes": meta["frame_bboxes"],
+                "sha256": meta["sha256"]
+            }
+        else:
+            animation["types"][atype] = {
+                "url": f"{base_url}/{filename}", "frames": 4, "frameSize": 64, "content_bbox": [0, 0, 64, 64]
+            }
+    return animation
+
+
+def _resource_status(
+    project_id: str,
+    resource_type: str,
+    resource_id: str,
+    variants: List[Dict[str, Any]],
+    final: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    组装单个资源的状态: 候选变体 + 已选定的正式资源 + 动画
     
-    variants = []
-    if os.path.exists(variants_dir):
-        for filename in os.listdir(variants_dir):
-            if filename.endswith(".json"):
-                with open(os.path.join(variants_dir, filename), "r", encoding="utf-8") as f:
-                    variant_data = json.load(f)
-                    # 检查文件是否真实存在
-                    variant_data["exists"] = os.path.exists(variant_data.get("file_path", ""))
-                    variants.append(variant_data)
-        
-        # 按创建时间排序
-        variants.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    
-    # 检查是否存在正式资源资产
-    assets_resource_dir = os.path.join(project_path, "assets", resource_config["folder"], resource_id)
-    final_filename = f"{resource_id}{resource_config['extension']}"
-    final_file_path = os.path.join(assets_resource_dir, final_filename)
-    has_final_asset = os.path.exists(final_file_path)
+    动画清单过期时要哈希并解码序列帧，须在线程中调用
 
+    Args:
+        variants: 索引中的候选变体 (已按创建时间倒序)
+        final: 索引中的正式资源 (不存在时为 None)
+    """
+    variants = list(variants)
     # 如果正式目录有文件，但变体列表里没标记选中，或者变体列表为空，我们合成一个选中的变体
     has_selected_in_variants = any(v.get("selected") for v in variants)
-    if has_final_asset and not has_selected_in_variants:
+    if final and not has_selected_in_variants:
         # 合成一个虚拟的选中变体用于展示
-        stat = os.stat(final_file_path)
         variants.insert(0, {
             "variant_id": "selected_final",
-            "file_path": final_file_path,
-            "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            "file_path": final["file_path"],
+            "created_at": datetime.fromtimestamp(final["created_at"]).isoformat(),
             "selected": True,
             "exists": True,
             "is_final": True
         })
-
-    # 3. 检查是否存在序列帧动画 (仅限角色)
+    
     animation = {"exists": False, "types": {}}
     if resource_type == "character":
-        anim_dir = os.path.join(assets_resource_dir, "animations")
-        if os.path.exists(anim_dir):
-            # 兼容旧的整体式
-            full_path = os.path.join(anim_dir, "spritesheet.png")
-            if os.path.exists(full_path):
-                animation["exists"] = True
-                animation["spritesheet_url"] = f"/assets/{project_id}/assets/characters/{resource_id}/animations/spritesheet.png"
-            
-            # 扫描独立的动作文件 (重点)
-            from PIL import Image
-            for atype in ["idle", "walk", "attack"]:
-                filename = f"anim_{atype}.png"
-                p = os.path.join(anim_dir, filename)
-                if os.path.exists(p):
-                    animation["exists"] = True
-                    # 自动检测帧数
-                    try:
-                        with Image.open(p) as img:
-                            w, h = img.size
-                            # 假设是横向排列。如果 w=h 是单帧，否则 w/h 是帧数
-                            frame_count = max(1, w // h)
-                            
-                            # 【新增】检测内容的实际包围盒，用于减少透明边框导致的缩放过小问题
-                            content_bbox = img.getbbox() # (left, top, right, bottom)
-                            
-                            animation["types"][atype] = {
-                                "url": f"/assets/{project_id}/assets/characters/{resource_id}/animations/{filename}",
-                                "frames": frame_count,
-                                "frameSize": h,
-                                "content_bbox": content_bbox # 传递给前端进行精准缩放
-                            }
-                    except:
-                        animation["types"][atype] = {
-                            "url": f"/assets/{project_id}/assets/characters/{resource_id}/animations/{filename}",
-                            "frames": 4,
-                            "frameSize": 64,
-                            "content_bbox": [0, 0, 64, 64]
-                        }
+        animation = _animation_info(project_id, resource_id)
     
     return {
-        "variants": variants, 
+        "variants": variants,
         "total": len(variants),
         "animation": animation
     }
 
 
+@router.get("/{project_id}/{resource_type}/{resource_id}/variants")
+async def list_variants(project_id: str, resource_type: str, resource_id: str):
+    """获取资源的所有变体（temp临时目录中的候选，查询元数据索引）"""
+    if resource_type not in RESOURCE_TYPES:
+        raise HTTPException(status_code=400, detail=f"无效的资源类型: {resource_type}")
+    
+    variants = await asset_index.list_variants(project_id, resource_type, resource_id)
+    final = await asset_index.get_resource(project_id, resource_type, resource_id)
+    return await asyncio.to_thread(_resource_status, project_id, resource_type, resource_id, variants, final)
+
+
+@router.get("/{project_id}/status")
+async def get_project_asset_status(
+    project_id: str,
+    response: Response,
+    spec_type: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    批量获取项目中全部资源 (或某个规格类型) 的变体、正式资源与动画信息
+
+    前端打开资源面板 / 游戏预览时一次请求取代逐个条目查询 variants。
+    带 ETag (项目版本号)，内容未变化时返回 304，不查询索引。
+    """
+    spec_to_resource = {
+        "character": "character",
+        "scene": "scene",
+        "item": "item",
+        "audio": "sfx",
+        "ui": "ui"
+    }
+    
+    if spec_type is None:
+        resource_types = list(RESOURCE_TYPES)
+    elif spec_type in spec_to_resource:
+        resource_types = [spec_to_resource[spec_type]]
+    else:
+        raise HTTPException(status_code=400, detail=f"不支持的规格类型: {spec_type}")
+    
+    etag = f'W/"{asset_index.version(project_id)}-{spec_type or "all"}"'
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    variants, finals = await asset_index.project_status(project_id, resource_types)
+    
+    def collect() -> Dict[str, Dict[str, Any]]:
+        items: Dict[str, Dict[str, Any]] = {resource_type: {} for resource_type in resource_types}
+        for resource_type, resource_id in sorted(set(variants) | set(finals)):
+            items[resource_type][resource_id] = _resource_status(
+                project_id, resource_type, resource_id,
+                variants.get((resource_type, resource_id), []),
+                finals.get((resource_type, resource_id))
+            )
+        return items
+    
+    # 全部角色的动画清单在一次线程调用中刷新，不阻塞事件循环
+    items = await asyncio.to_thread(collect)
+    
+    response.headers["ETag"] = etag
+    return {"project_id": project_id, "spec_type": spec_type, "items": items}
+
+
 @router.post("/{project_id}/{resource_type}/{resource_id}/select/{variant_id}")
 async def select_variant(
     project_id: str, resource_type: str, resource_id: str, variant_id: str
@@ -284,7 +343,7 @@ async def select_variant(
     """
     选择并确认一个变体作为最终资源
     
-    从temp临时目录复制选中的资源到正式assets目录
+    把选中的资源链接到正式assets目录 (与 temp 中的变体共享同一份内容)
     """
     if resource_type not in RESOURCE_TYPES:
         raise HTTPException(status_code=400, detail=f"无效的资源类型: {resource_type}")
@@ -320,9 +379,8 @@ async def select_variant(
     final_filename = f"{resource_id}{resource_config['extension']}"
     dst_file = os.path.join(assets_dir, final_filename)
     
-    # 复制到正式目录
-    import shutil
-    shutil.copy2(src_file, dst_file)
+    # 正式资源是同一内容的硬链接，无需复制
+    blob_store.link(src_file, dst_file, variant.get("blob"))
     
     # 更新变体状态（在temp目录的元数据中标记已选择）
     # 先清除其他变体的selected状态
@@ -332,11 +390,12 @@ async def select_variant(
             with open(meta_path, "r", encoding="utf-8") as f:
                 meta = json.load(f)
             meta["selected"] = (filename == f"{variant_id}.json")
-            with open(meta_path, "w", encoding="utf-8") as f:
-                json.dump(meta, f, ensure_ascii=False, indent=2)
+            write_json_atomic(meta_path, meta)
+    await asset_index.refresh_resource(project_id, resource_type, resource_id)
+    await _refresh_asset_manifest(project_id)
     
     return {
-        "message": "资源已选定并复制到正式目录",
+        "message": "资源已选定并链接到正式目录",
         "temp_path": src_file,
         "final_path": dst_file,
         "variant_id": variant_id
@@ -348,12 +407,31 @@ class AnimationRequest(BaseModel):
     item_id: str
     description: str
     style: Optional[str] = "像素风"
+    force_regenerate: bool = False  # 跳过 LLM 响应缓存
 
 @router.post("/{project_id}/generate-animations")
-async def generate_character_animations(project_id: str, request: AnimationRequest):
+async def generate_character_animations(
+    project_id: str, request: AnimationRequest, background: bool = False
+):
     """
     为选中角色生成序列帧动画 Spritesheet
+    
+    background=true 时提交后台任务并立即返回任务 ID
     """
+    if background:
+        job = await job_manager.submit("generate_animations", project_id, request.model_dump())
+        return {"project_id": project_id, "job_id": job.id, "status": job.status}
+    
+    return await _generate_character_animations(project_id, request)
+
+
+@job_manager.handler("generate_animations")
+async def _generate_animations_job(job: Job):
+    return await _generate_character_animations(job.project_id, AnimationRequest(**job.params))
+
+
+async def _generate_character_animations(project_id: str, request: AnimationRequest):
+    """生成动画脚本并执行"""
     # 路径准备
     projects_dir_abs = os.path.abspath(settings.PROJECTS_DIR)
     project_path = os.path.join(projects_dir_abs, project_id)
@@ -375,38 +453,64 @@ async def generate_character_animations(project_id: str, request: AnimationReque
     
     # 调用 LLM 生成动画脚本
     try:
-        script_content = await llm.generate_animation_script(
-            resource_id=request.item_id,
-            description=request.description,
-            params={"style": request.style, "size": settings.DEFAULT_IMAGE_SIZE}
-        )
+        with event_bus.context(resource_type="character", item_id=request.item_id):
+            script_content = await llm.generate_animation_script(
+                resource_id=request.item_id,
+                description=request.description,
+                params={"style": request.style, "size": settings.DEFAULT_IMAGE_SIZE},
+                bypass_cache=request.force_regenerate,
+                project_id=project_id
+            )
         
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write(script_content)
+        script_validator.save(script_path, script_content, KIND_ANIMATION)
+        event_bus.publish(
+            project_id, EVENT_SCRIPT_SAVED,
+            resource_type="character", item_id=request.item_id, script_path=script_path, kind=KIND_ANIMATION
+        )
+    except LLMBusyError:
+        raise
+    except ScriptValidationError as e:
+        event_bus.publish(
+            project_id, EVENT_ERROR, resource_type="character", item_id=request.item_id, stage="script", detail=str(e)
+        )
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"动画脚本生成失败: {str(e)}")
         
     # 执行脚本
     try:
-        import subprocess
-        import sys
-        
-        result = subprocess.run(
-            [sys.executable, script_path, "--output", output_path],
-            capture_output=True,
-            text=True,
-            timeout=180,
-            cwd=os.getcwd()
+        result = await generator_pool.run(
+            script_path, ["--output", output_path], cwd=os.getcwd(), timeout=180
         )
         
         if result.returncode != 0:
+            event_bus.publish(
+                project_id, EVENT_ERROR, resource_type="character", item_id=request.item_id,
+                stage="render", detail=result.stderr or result.stdout
+            )
             raise HTTPException(status_code=500, detail=f"动画生成失败: {result.stderr or result.stdout}")
-            
+        
+        # 网格拆分为各动作的序列帧条 (资源清单 / 图集 / 预览按动作读取)，再解析写入动画清单；
+        # 动画文件不在索引中，单独递增项目版本使批量状态的 ETag 失效
+        actions = await asyncio.to_thread(split_spritesheet, anim_dir)
+        await asyncio.to_thread(animation_meta.update, anim_dir)
+        asset_index.touch(project_id)
+        await _refresh_asset_manifest(project_id)
+        event_bus.publish(
+            project_id, EVENT_ANIMATION_RENDERED, resource_type="character", item_id=request.item_id,
+            spritesheet_url=f"/assets/{project_id}/assets/characters/{request.item_id}/animations/spritesheet.png",
+            actions=actions
+        )
         return {
             "success": True,
             "spritesheet_url": f"/assets/{project_id}/assets/characters/{request.item_id}/animations/spritesheet.png",
+            "actions": actions,
             "message": "序列帧动画已生成"
         }
+    except HTTPException:
+        raise
+    except subprocess.TimeoutExpired:
+        raise HTTPException(status_code=500, detail="动画脚本执行超时")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"执行动画脚本异常: {str(e)}")
 
@@ -451,7 +555,10 @@ async def upload_character_animation(
     try:
         with open(output_path, "wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
-            
+        
+        await asyncio.to_thread(animation_meta.update, anim_dir)
+        asset_index.touch(project_id)
+        await _refresh_asset_manifest(project_id)
         return {
             "success": True,
             "anim_type": anim_type,
@@ -484,38 +591,11 @@ async def delete_variant(
         os.remove(resource_file)
     if os.path.exists(meta_file):
         os.remove(meta_file)
+    await asset_index.refresh_resource(project_id, resource_type, resource_id)
     
     return {"message": "变体已删除", "variant_id": variant_id}
 
 
-def stylize_resource_image(input_path, output_path, style_index):
-    """
-    通过 Python 对原始图片进行风格化处理
-    style_index: 2 (鲜艳), 3 (明亮), 4 (复古)
-    """
-    try:
-        from PIL import Image, ImageEnhance
-        with Image.open(input_path) as img:
-            img = img.convert("RGBA")
-            if style_index == 2:
-                # 增强色彩 (鲜艳)
-                img = ImageEnhance.Color(img).enhance(1.8)
-            elif style_index == 3:
-                # 增强亮度和对比度 (明亮)
-                img = ImageEnhance.Brightness(img).enhance(1.2)
-                img = ImageEnhance.Contrast(img).enhance(1.2)
-            elif style_index == 4:
-                # 怀旧风格 (减小饱和度并略微调暗)
-                img = ImageEnhance.Color(img).enhance(0.4)
-                img = ImageEnhance.Brightness(img).enhance(0.9)
-            
-            img.save(output_path)
-            return True
-    except Exception as e:
-        print(f"风格化图片失败: {e}")
-        return False
-
-
 class GenerateItemRequest(BaseModel):
     """生成单个资源请求"""
     spec_type: str
@@ -523,15 +603,36 @@ class GenerateItemRequest(BaseModel):
     params: Optional[Dict[str, Any]] = None
     variant_count: int = 3
     force_regenerate_script: bool = False
+    styles: Optional[List[str]] = None   # 图片风格化变体 (vivid/bright/retro/palette/outline)，默认前三种
+    force_rerun: bool = False            # 跳过生成结果缓存，强制重新执行脚本
 
 
 @router.post("/{project_id}/generate-item")
-async def generate_item_resource(project_id: str, request: GenerateItemRequest):
+async def generate_item_resource(
+    project_id: str, request: GenerateItemRequest, background: bool = False
+):
     """
     为单个条目生成资源脚本和多个变体
     
-    读取规格文件中的指定条目，生成脚本并执行，创建多个候选变体
+    读取规格文件中的指定条目，生成脚本并执行，创建多个候选变体。
+    background=true 时提交后台任务并立即返回任务 ID
     """
+    if background:
+        job = await job_manager.submit("generate_item", project_id, request.model_dump())
+        return {"project_id": project_id, "item_id": request.item_id, "job_id": job.id, "status": job.status}
+    
+    return await _generate_item_resource(project_id, request)
+
+
+@job_manager.handler("generate_item")
+async def _generate_item_job(job: Job):
+    return await _generate_item_resource(job.project_id, GenerateItemRequest(**job.params), job)
+
+
+async def _generate_item_resource(
+    project_id: str, request: GenerateItemRequest, job: Optional[Job] = None
+):
+    """生成条目脚本与变体，job 不为空时逐个变体上报进度"""
     # 规格类型与资源类型的映射
     spec_to_resource = {
         "character": "character",
@@ -547,6 +648,10 @@ async def generate_item_resource(project_id: str, request: GenerateItemRequest):
     resource_type = spec_to_resource[request.spec_type]
     resource_config = RESOURCE_TYPES[resource_type]
     
+    unknown_styles = [style for style in (request.styles or []) if style not in STYLES]
+    if unknown_styles:
+        raise HTTPException(status_code=400, detail=f"不支持的风格: {', '.join(unknown_styles)}")
+    
     # 获取后端绝对路径根目录
     backend_root = os.getcwd()
     
@@ -654,6 +759,7 @@ async def generate_item_resource(project_id: str, request: GenerateItemRequest):
             os.makedirs(variants_dir, exist_ok=True)
         except Exception as e:
             print(f"清理临时变体目录失败: {e}")
+    await asset_index.refresh_resource(project_id, resource_type, request.item_id)
 
     # 2. 如果请求强制重新生成脚本，则删除旧脚本
     if request.force_regenerate_script:
@@ -673,71 +779,89 @@ async def generate_item_resource(project_id: str, request: GenerateItemRequest):
 
     # 如果脚本不存在（或已被删除），调用 LLM 生成
     if not os.path.exists(main_script_path):
+        if job:
+            job.set_item("script", "running")
         # 准备生成参数
         try:
             desc_with_style = f"{description}。美术风格：{art_style}"
             script_params = params.copy()
             script_params["style"] = art_style
             
-            script_content = await llm.generate_resource_script(
-                resource_type=resource_type,
-                description=desc_with_style,
-                params=script_params,
-                category=resource_config["category"]
-            )
+            with event_bus.context(resource_type=resource_type, item_id=request.item_id):
+                script_content = await llm.generate_resource_script(
+                    resource_type=resource_type,
+                    description=desc_with_style,
+                    params=script_params,
+                    category=resource_config["category"],
+                    bypass_cache=request.force_regenerate_script,
+                    project_id=project_id
+                )
             
-            with open(main_script_path, "w", encoding="utf-8") as f:
-                f.write(script_content)
+            script_validator.save(main_script_path, script_content, KIND_RESOURCE)
+            event_bus.publish(
+                project_id, EVENT_SCRIPT_SAVED,
+                resource_type=resource_type, item_id=request.item_id, script_path=main_script_path
+            )
+        except LLMBusyError:
+            raise
+        except ScriptValidationError as e:
+            event_bus.publish(
+                project_id, EVENT_ERROR,
+                resource_type=resource_type, item_id=request.item_id, stage="script", detail=str(e)
+            )
+            raise
         except Exception as e:
             import traceback
             traceback.print_exc()
             raise HTTPException(status_code=500, detail=f"脚本生成失败: {str(e)}")
     
-    # 循环生成多个变体
-    variants = []
-    base_resource_path = None
+    if job:
+        job.set_item("script", "done", script_path=main_script_path)
     
-    # 强制生成 4 个候选 (1 个原版 + 3 个风格化)
-    for i in range(4):
-        seed = i + 1
-        variant_id = f"{request.item_id}_v{seed}_{uuid.uuid4().hex[:4]}"
-        output_path = os.path.join(variants_dir, f"{variant_id}{resource_config['extension']}")
-        output_path_arg = output_path.replace("\\", "/")
-        
-        success = False
-        error_msg = None
+    # 图片: 1 个原版 + 每种风格一个变体 (默认 鲜艳/明亮/复古)；音频: 4 个 seed 全部由脚本生成
+    if resource_config["category"] == "audio":
+        seeds = [1, 2, 3, 4]
+        styles = {}
+    else:
+        style_names = request.styles or DEFAULT_STYLES
+        seeds = list(range(1, len(style_names) + 2))
+        styles = dict(zip(seeds[1:], style_names))
+    variant_ids = {
+        seed: f"{request.item_id}_v{seed}_{uuid.uuid4().hex[:4]}" for seed in seeds
+    }
+    output_paths = {
+        seed: os.path.join(variants_dir, f"{variant_ids[seed]}{resource_config['extension']}")
+        for seed in seeds
+    }
+    
+    # 生成结果缓存: 脚本内容 / seed / 尺寸 / 格式 (风格变体另加风格) 都相同时直接链接上次的输出
+    # (缓存键要读取并哈希脚本、命中时要建立链接，与下面的 blob 纳入、元数据写入一样在线程中执行，不阻塞事件循环)
+    base_seed = seeds[0]
+    
+    def lookup_cache():
+        keys = {
+            seed: render_cache.make_key(
+                main_script_path, base_seed if seed in styles else seed,
+                params.get("size"), resource_config["extension"], styles.get(seed)
+            )
+            for seed in seeds
+        }
+        if request.force_rerun:
+            return keys, set()
+        return keys, {seed for seed in seeds if render_cache.fetch(keys[seed], output_paths[seed])}
+    
+    def store_cache(stored_seeds: List[int]):
+        for seed in stored_seeds:
+            render_cache.store(cache_keys[seed], output_paths[seed])
+    
+    cache_keys, cached_seeds = await asyncio.to_thread(lookup_cache)
+    
+    def save_variant(seed: int, success: bool, error_msg: Optional[str]) -> Dict[str, Any]:
+        variant_id = variant_ids[seed]
+        output_path = output_paths[seed]
         
-        # 第一个变体由脚本生成，或者音频资源全部由脚本生成
-        if i == 0 or resource_config["category"] == "audio":
-            import subprocess
-            import sys
-            cmd = [
-                sys.executable, main_script_path,
-                "--output", output_path_arg,
-                "--seed", str(seed)
-            ]
-            
-            try:
-                result = subprocess.run(
-                    cmd, capture_output=True, text=True, timeout=120, cwd=backend_root
-                )
-                success = result.returncode == 0
-                if success:
-                    if i == 0:
-                        base_resource_path = output_path
-                else:
-                    error_msg = result.stderr or result.stdout or "脚本执行失败"
-            except Exception as e:
-                success = False
-                error_msg = str(e)
-        else:
-            # 后续的图片变体通过 Python 进行风格化处理
-            if base_resource_path and os.path.exists(base_resource_path):
-                success = stylize_resource_image(base_resource_path, output_path, seed)
-                if not success:
-                    error_msg = "风格化处理失败"
-            else:
-                error_msg = "基础图片未生成，无法风格化"
+        # 纳入内容寻址存储 (不同 seed / 风格输出相同时只保留一份)
+        blob = blob_store.ingest(output_path) if success else None
         
         # 保存变体元数据
         variant_meta = {
@@ -745,17 +869,111 @@ async def generate_item_resource(project_id: str, request: GenerateItemRequest):
             "file_path": output_path,
             "script_path": main_script_path,
             "seed": seed,
+            "style": styles.get(seed),
             "is_selected": False,
             "success": success,
+            "cached": seed in cached_seeds,
+            "blob": blob,
             "error": error_msg,
             "generated_at": datetime.now().isoformat()
         }
         
-        meta_path = os.path.join(variants_dir, f"{variant_id}.json")
-        with open(meta_path, "w", encoding="utf-8") as f:
-            json.dump(variant_meta, f, indent=4, ensure_ascii=False)
-            
-        variants.append(variant_meta)
+        write_json_atomic(os.path.join(variants_dir, f"{variant_id}.json"), variant_meta, indent=4)
+        return {**variant_meta, "exists": os.path.exists(output_path)}
+    
+    # 每个变体一有结果就记录并发布事件: 命中缓存的立即记录，其余在脚本 / 风格化完成后记录
+    async def record_variant(seed: int) -> Dict[str, Any]:
+        success = False
+        error_msg = None
+        
+        if seed in cached_seeds:
+            success = True
+        elif seed in script_results:
+            result = script_results[seed]
+            if isinstance(result, subprocess.TimeoutExpired):
+                error_msg = "脚本执行超时"
+            elif result.returncode == 0:
+                success = True
+            else:
+                error_msg = result.stderr or result.stdout or "脚本执行失败"
+        elif not base_resource_path:
+            error_msg = "基础图片未生成，无法风格化"
+        else:
+            success = stylized.get(styles[seed], False)
+            if not success:
+                error_msg = "风格化处理失败"
+        
+        variant = await asyncio.to_thread(save_variant, seed, success, error_msg)
+        exists = variant.pop("exists")
+        
+        if job:
+            job.set_item(f"variant_{seed}", "done" if success else "failed", variant_id=variant_ids[seed], error=error_msg)
+        event_bus.publish(
+            project_id, EVENT_VARIANT_RENDERED,
+            resource_type=resource_type, item_id=request.item_id, seed=seed, total=len(seeds),
+            variant={**variant, "exists": exists}
+        )
+        return variant
+    
+    recorded = {seed: await record_variant(seed) for seed in seeds if seed in cached_seeds}
+    
+    # 需要跑脚本的 seed 一次性交给执行池 (脚本只编译一次)
+    script_seeds = [seed for seed in seeds if seed not in styles and seed not in cached_seeds]
+    if job:
+        for seed in script_seeds:
+            job.set_item(f"variant_{seed}", "running", variant_id=variant_ids[seed])
+    script_results: Dict[int, Any] = {}
+    if script_seeds:
+        try:
+            script_results = await generator_pool.run_seeds(
+                main_script_path,
+                {
+                    seed: ["--output", output_paths[seed].replace("\\", "/"), "--seed", str(seed)]
+                    for seed in script_seeds
+                },
+                cwd=backend_root,
+                timeout=120,
+                parallel=settings.GENERATOR_SEED_PARALLELISM
+            )
+        except Exception as e:
+            script_results = {
+                seed: subprocess.CompletedProcess([], -1, "", str(e)) for seed in script_seeds
+            }
+    await asyncio.to_thread(store_cache, [
+        seed for seed, result in script_results.items()
+        if isinstance(result, subprocess.CompletedProcess) and result.returncode == 0
+    ])
+    for seed in script_results:
+        recorded[seed] = await record_variant(seed)
+    
+    base_resource_path = None
+    if base_seed in cached_seeds or (
+        isinstance(script_results.get(base_seed), subprocess.CompletedProcess)
+        and script_results[base_seed].returncode == 0
+    ):
+        base_resource_path = output_paths[base_seed]
+    
+    # 风格化变体: 基础图片解码一次，未命中缓存的风格一次算完 (在进程池中执行)
+    pending_styles = {seed: style for seed, style in styles.items() if seed not in cached_seeds}
+    stylized: Dict[str, bool] = {}
+    if pending_styles and base_resource_path and os.path.exists(base_resource_path):
+        if job:
+            for seed in pending_styles:
+                job.set_item(f"variant_{seed}", "running", variant_id=variant_ids[seed])
+        try:
+            stylized = await stylize_pool.stylize(
+                base_resource_path, {style: output_paths[seed] for seed, style in pending_styles.items()}
+            )
+        except Exception as e:
+            print(f"风格化任务失败: {e}")
+        await asyncio.to_thread(store_cache, [seed for seed, style in pending_styles.items() if stylized.get(style)])
+        event_bus.publish(
+            project_id, EVENT_STYLIZE_DONE,
+            resource_type=resource_type, item_id=request.item_id, styles=stylized
+        )
+    
+    variants = [recorded[seed] if seed in recorded else await record_variant(seed) for seed in seeds]
+    await asset_index.refresh_resource(project_id, resource_type, request.item_id)
             
     return {
         "success": True,
@@ -766,11 +984,14 @@ async def generate_item_resource(project_id: str, request: GenerateItemRequest):
 
 
 @router.post("/{project_id}/generate-from-spec")
-async def generate_from_spec(project_id: str, spec_type: str):
+async def generate_from_spec(project_id: str, spec_type: str, concurrency: Optional[int] = None):
     """
     从JSON规格批量生成资源
     
-    根据规格类型读取对应的JSON文件，为每个条目生成资源
+    根据规格类型读取对应的JSON文件，为每个条目生成资源脚本。
+    以后台任务并发执行 (并发度由 concurrency 或 BATCH_GENERATION_CONCURRENCY 控制)，
+    立即返回任务 ID，通过 GET /api/jobs/{job_id} 查询逐条进度，
+    POST /api/jobs/{job_id}/cancel 取消
     """
     # 规格类型与资源类型的映射
     spec_to_resource = {
@@ -785,6 +1006,7 @@ async def generate_from_spec(project_id: str, spec_type: str):
         raise HTTPException(status_code=400, detail=f"不支持的规格类型: {spec_type}")
     
     resource_type = spec_to_resource[spec_type]
+    resource_config = RESOURCE_TYPES[resource_type]
     
     # 读取规格文件
     spec_path = os.path.join(
@@ -818,20 +1040,22 @@ async def generate_from_spec(project_id: str, spec_type: str):
     projects_dir_abs = os.path.abspath(settings.PROJECTS_DIR)
     project_path = os.path.join(projects_dir_abs, project_id)
     
-    # 为每个条目生成资源脚本
-    generated = []
+    # 获取项目风格 (整批只读取一次)
+    project_meta_path = os.path.join(project_path, "project.json")
+    art_style = "像素风"
+    if os.path.exists(project_meta_path):
+        with open(project_meta_path, "r", encoding="utf-8") as f:
+            project_meta = json.load(f)
+            art_style = project_meta.get("art_style", "像素风")
+    
+    limit = max(1, concurrency or settings.BATCH_GENERATION_CONCURRENCY)
     
-    # 串行生成避免并发过高
+    # 为每个条目准备生成参数
+    entries = []
     for item in items:
         item_id = item.get("id", str(uuid.uuid4())[:8])
-        resource_config = RESOURCE_TYPES[resource_type]
         
-        # 临时目录（脚本存放位置）
-        temp_dir = os.path.join(project_path, "temp", resource_config["folder"], item_id)
-        scripts_dir = os.path.join(temp_dir, "scripts")
-        os.makedirs(scripts_dir, exist_ok=True)
-        
-        # 构建描接
+        # 构建描述
         if spec_type == "character":
             description = item.get("appearance", item.get("name", ""))
         elif spec_type == "scene":
@@ -845,44 +1069,98 @@ async def generate_from_spec(project_id: str, spec_type: str):
         else:
             description = str(item)
         
-        # 获取项目风格
-        project_meta_path = os.path.join(project_path, "project.json")
-        art_style = "像素风"
-        if os.path.exists(project_meta_path):
-            with open(project_meta_path, "r", encoding="utf-8") as f:
-                project_meta = json.load(f)
-                art_style = project_meta.get("art_style", "像素风")
+        entries.append({
+            "id": item_id,
+            "name": item.get("name", item_id),
+            "description": description
+        })
+    
+    job = await job_manager.submit(
+        "generate_from_spec", project_id,
+        params={
+            "spec_type": spec_type,
+            "resource_type": resource_type,
+            "art_style": art_style,
+            "concurrency": limit,
+            "entries": entries
+        }
+    )
+    
+    return {
+        "project_id": project_id,
+        "spec_type": spec_type,
+        "resource_type": resource_type,
+        "job_id": job.id,
+        "status": job.status,
+        "total": len(entries),
+        "concurrency": limit
+    }
+
+
+@job_manager.handler("generate_from_spec")
+async def _generate_from_spec_job(job: Job):
+    """批量生成条目脚本 (后台任务，重启恢复时已有脚本的条目直接跳过)"""
+    project_id = job.project_id
+    spec_type = job.params["spec_type"]
+    resource_type = job.params["resource_type"]
+    resource_config = RESOURCE_TYPES[resource_type]
+    art_style = job.params["art_style"]
+    entries = job.params["entries"]
+    
+    project_path = os.path.join(os.path.abspath(settings.PROJECTS_DIR), project_id)
+    semaphore = asyncio.Semaphore(job.params["concurrency"])
+    
+    for entry in entries:
+        if entry["id"] not in job.items:
+            job.set_item(entry["id"], "pending", name=entry["name"])
+    
+    async def generate_one(entry):
+        item_id = entry["id"]
+        
+        # 临时目录（脚本存放位置）
+        scripts_dir = os.path.join(project_path, "temp", resource_config["folder"], item_id, "scripts")
+        os.makedirs(scripts_dir, exist_ok=True)
+        script_path = os.path.join(scripts_dir, f"{item_id}_generator.py")
         
-        # 主脚本路径
-        script_filename = f"{item_id}_generator.py"
-        script_path = os.path.join(scripts_dir, script_filename)
+        # 脚本已存在则跳过
+        if os.path.exists(script_path):
+            job.set_item(item_id, "done", script_path=script_path, skipped=True)
+            return
         
-        # 如果脚本不存在，调用 LLM 生成
-        if not os.path.exists(script_path):
+        async with semaphore:
+            job.set_item(item_id, "running")
             try:
-                desc_with_style = f"{description}。美术风格：{art_style}"
+                desc_with_style = f"{entry['description']}。美术风格：{art_style}"
                 # 默认参数
                 script_params = {"style": art_style, "size": settings.DEFAULT_IMAGE_SIZE}
                 
-                script_content = await llm.generate_resource_script(
-                    resource_type=resource_type,
-                    description=desc_with_style,
-                    params=script_params,
-                    category=resource_config["category"]
-                )
+                with event_bus.context(resource_type=resource_type, item_id=item_id):
+                    script_content = await llm.generate_resource_script(
+                        resource_type=resource_type,
+                        description=desc_with_style,
+                        params=script_params,
+                        category=resource_config["category"],
+                        priority=PRIORITY_BATCH,
+                        project_id=project_id
+                    )
                 
-                with open(script_path, "w", encoding="utf-8") as f:
-                    f.write(script_content)
+                script_validator.save(script_path, script_content, KIND_RESOURCE)
+                event_bus.publish(
+                    project_id, EVENT_SCRIPT_SAVED,
+                    resource_type=resource_type, item_id=item_id, script_path=script_path
+                )
+                job.set_item(item_id, "done", script_path=script_path)
             except Exception as e:
+                # 单条失败不影响其他条目
                 print(f"条目 {item_id} 脚本生成失败: {e}")
-                continue # 跳过失败的
-        
-        generated.append({
-            "id": item_id,
-            "name": item.get("name", item_id),
-            "script_path": script_path
-        })
+                job.set_item(item_id, "failed", error=str(e))
+    
+    await asyncio.gather(*(generate_one(entry) for entry in entries))
     
+    generated = [
+        {"id": i["id"], "name": i.get("name", i["id"]), "script_path": i["script_path"]}
+        for i in job.items.values() if i["status"] == "done"
+    ]
     return {
         "project_id": project_id,
         "spec_type": spec_type,
@@ -893,9 +1171,16 @@ async def generate_from_spec(project_id: str, spec_type: str):
 
 
 @router.post("/{project_id}/run-scripts/{spec_type}")
-async def run_resource_scripts(project_id: str, spec_type: str):
+async def run_resource_scripts(
+    project_id: str, spec_type: str, background: bool = False, force: bool = False, stylize: bool = True
+):
     """
     执行已生成的资源脚本 (批量生成默认变体)
+    
+    脚本未变化的条目直接复用生成结果缓存，只有改动过的条目会真正执行；
+    force=true 时跳过缓存全部重新执行。
+    图片资源同时生成默认风格变体 (stylize=false 时只生成原图)，所有条目一次交给风格化进程池批量处理。
+    background=true 时提交后台任务并立即返回任务 ID
     """
     # 规格类型与资源类型的映射
     spec_to_resource = {
@@ -909,6 +1194,34 @@ async def run_resource_scripts(project_id: str, spec_type: str):
     if spec_type not in spec_to_resource:
         raise HTTPException(status_code=400, detail=f"不支持的规格类型: {spec_type}")
     
+    if background:
+        job = await job_manager.submit(
+            "run_scripts", project_id, {"spec_type": spec_type, "force": force, "stylize": stylize}
+        )
+        return {"project_id": project_id, "spec_type": spec_type, "job_id": job.id, "status": job.status}
+    
+    return await _run_resource_scripts(project_id, spec_type, force=force, stylize=stylize)
+
+
+@job_manager.handler("run_scripts")
+async def _run_scripts_job(job: Job):
+    return await _run_resource_scripts(
+        job.project_id, job.params["spec_type"], job,
+        force=job.params.get("force", False), stylize=job.params.get("stylize", True)
+    )
+
+
+async def _run_resource_scripts(
+    project_id: str, spec_type: str, job: Optional[Job] = None, force: bool = False, stylize: bool = True
+):
+    """逐个条目执行主脚本生成 seed=1 的默认变体，再批量风格化各条目的默认变体"""
+    spec_to_resource = {
+        "character": "character",
+        "scene": "scene", 
+        "item": "item",
+        "audio": "sfx",
+        "ui": "ui"
+    }
     resource_type = spec_to_resource[spec_type]
     resource_config = RESOURCE_TYPES[resource_type]
     
@@ -924,6 +1237,11 @@ async def run_resource_scripts(project_id: str, spec_type: str):
     # 获取后端绝对路径根目录
     backend_root = os.getcwd()
     
+    # 图片资源: 变体 2.. 为默认风格 (与 generate-item 的默认变体一致)
+    styles = {}
+    if stylize and resource_config["category"] != "audio":
+        styles = dict(zip(range(2, len(DEFAULT_STYLES) + 2), DEFAULT_STYLES))
+    
     results = []
     # 遍历所有 item_id 目录
     for item_id in os.listdir(temp_root):
@@ -941,6 +1259,9 @@ async def run_resource_scripts(project_id: str, spec_type: str):
         
         if not os.path.exists(script_path):
             continue
+        
+        if job:
+            job.set_item(item_id, "running")
             
         # 生成默认变体 (seed=1)
         seed = 1
@@ -948,58 +1269,76 @@ async def run_resource_scripts(project_id: str, spec_type: str):
         output_path = os.path.join(variants_dir, f"{variant_id}{resource_config['extension']}")
         output_path_arg = output_path.replace("\\", "/")
         
-        try:
-            import sys
-            import subprocess
-            cmd = [
-                sys.executable, script_path,
-                "--output", output_path_arg,
-                "--seed", str(seed)
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=60,
-                cwd=backend_root
-            )
-            
-            success = result.returncode == 0
-            error_out = None if success else (result.stderr or result.stdout)
-        except subprocess.TimeoutExpired:
-            success = False
-            error_out = "执行超时"
-            
-            # 保存元数据
-            variant_meta = {
-                "variant_id": variant_id,
-                "file_path": output_path,
-                "script_path": script_path,
-                "created_at": datetime.now().isoformat(),
-                "params": {"seed": seed},
-                "seed": seed,
-                "selected": False,
-                "exists": os.path.exists(output_path),
-                "error": None if success else (result.stderr or result.stdout)
-            }
-            
-            meta_path = os.path.join(variants_dir, f"{variant_id}.json")
-            with open(meta_path, "w", encoding="utf-8") as f:
-                json.dump(variant_meta, f, ensure_ascii=False, indent=2)
-            
-            results.append({
-                "script": script_filename,
-                "success": success,
-                "item_id": item_id
-            })
-            
-        except Exception as e:
-             results.append({
-                "script": script_filename,
-                "success": False,
-                "output": str(e)
-            })
+        # 与 generate-item 默认尺寸的 seed=1 共用缓存键 (哈希脚本、链接缓存结果在线程中执行)
+        cache_key = await asyncio.to_thread(
+            render_cache.make_key, script_path, seed, settings.DEFAULT_IMAGE_SIZE, resource_config["extension"]
+        )
+        cached = not force and await asyncio.to_thread(render_cache.fetch, cache_key, output_path)
+        
+        if cached:
+            success = True
+            error_out = None
+        else:
+            try:
+                result = await generator_pool.run(
+                    script_path,
+                    ["--output", output_path_arg, "--seed", str(seed)],
+                    cwd=backend_root,
+                    timeout=60
+                )
+                
+                success = result.returncode == 0
+                error_out = None if success else (result.stderr or result.stdout)
+                if success:
+                    await asyncio.to_thread(render_cache.store, cache_key, output_path)
+            except subprocess.TimeoutExpired:
+                success = False
+                error_out = "执行超时"
+            except Exception as e:
+                success = False
+                error_out = str(e)
+        
+        # 保存元数据
+        variant_meta = {
+            "variant_id": variant_id,
+            "file_path": output_path,
+            "script_path": script_path,
+            "created_at": datetime.now().isoformat(),
+            "params": {"seed": seed},
+            "seed": seed,
+            "selected": False,
+            "exists": os.path.exists(output_path),
+            "cached": cached,
+            "blob": await asyncio.to_thread(blob_store.ingest, output_path) if success else None,
+            "error": error_out
+        }
+        
+        await asyncio.to_thread(write_json_atomic, os.path.join(variants_dir, f"{variant_id}.json"), variant_meta)
+        await asset_index.refresh_resource(project_id, resource_type, item_id)
+        event_bus.publish(
+            project_id, EVENT_VARIANT_RENDERED,
+            resource_type=resource_type, item_id=item_id, seed=seed, total=1, variant=variant_meta
+        )
+        
+        results.append({
+            "script": script_filename,
+            "success": success,
+            "item_id": item_id,
+            "cached": cached,
+            "output": error_out,
+            "base_path": output_path if success and styles else None,
+            "variants_dir": variants_dir,
+            "script_path": script_path,
+            "variant_id": variant_id
+        })
+        if job and not results[-1]["base_path"]:
+            job.set_item(item_id, "done" if success else "failed", variant_id=variant_id, error=error_out)
+    
+    if styles:
+        await _stylize_script_results(project_id, resource_type, results, styles, job, force)
+    for result in results:
+        for key in ("base_path", "variants_dir", "script_path", "variant_id"):
+            result.pop(key)
         
     success_count = sum(1 for r in results if r["success"])
     
@@ -1008,46 +1347,129 @@ async def run_resource_scripts(project_id: str, spec_type: str):
         "spec_type": spec_type,
         "total": len(results),
         "success": success_count,
+        "cached": sum(1 for r in results if r["cached"]),
         "failed": len(results) - success_count,
         "results": results
     }
 
 
+async def _stylize_script_results(
+    project_id: str,
+    resource_type: str,
+    results: List[Dict[str, Any]],
+    styles: Dict[int, str],
+    job: Optional[Job],
+    force: bool
+):
+    """
+    为 run-scripts 成功生成的基础图片批量生成风格变体
+
+    未命中生成结果缓存的条目一次交给 stylize_pool.stylize_many (按进程数切分，每个进程依次处理多个条目)，
+    每个条目的风格结果写回 results[i]["styles"]
+    """
+    resource_config = RESOURCE_TYPES[resource_type]
+    items = [result for result in results if result["base_path"]]
+    
+    def plan(result: Dict[str, Any]):
+        variant_ids = {seed: f"{result['item_id']}_v{seed}_{uuid.uuid4().hex[:4]}" for seed in styles}
+        output_paths = {
+            seed: os.path.join(result["variants_dir"], f"{variant_ids[seed]}{resource_config['extension']}")
+            for seed in styles
+        }
+        # 与 generate-item 默认尺寸的风格变体共用缓存键
+        cache_keys = {
+            seed: render_cache.make_key(
+                result["script_path"], 1, settings.DEFAULT_IMAGE_SIZE, resource_config["extension"], style
+            )
+            for seed, style in styles.items()
+        }
+        cached_seeds = set()
+        if not force:
+            cached_seeds = {seed for seed in styles if render_cache.fetch(cache_keys[seed], output_paths[seed])}
+        return result, variant_ids, output_paths, cache_keys, cached_seeds
+    
+    def save(result, variant_ids, output_paths, cache_keys, cached_seeds, outcome) -> List[Dict[str, Any]]:
+        """存入生成结果缓存、纳入 blob 存储并写入一个条目全部风格变体的元数据"""
+        variants = []
+        for seed, style in styles.items():
+            success = seed in cached_seeds or outcome.get(style, False)
+            if success and seed not in cached_seeds:
+                render_cache.store(cache_keys[seed], output_paths[seed])
+            variant_meta = {
+                "variant_id": variant_ids[seed],
+                "file_path": output_paths[seed],
+                "script_path": result["script_path"],
+                "created_at": datetime.now().isoformat(),
+                "params": {"seed": seed, "style": style},
+                "seed": seed,
+                "style": style,
+                "selected": False,
+                "exists": os.path.exists(output_paths[seed]),
+                "cached": seed in cached_seeds,
+                "blob": blob_store.ingest(output_paths[seed]) if success else None,
+                "error": None if success else "风格化处理失败"
+            }
+            write_json_atomic(os.path.join(result["variants_dir"], f"{variant_ids[seed]}.json"), variant_meta)
+            variants.append(variant_meta)
+        return variants
+    
+    # 缓存键哈希脚本、命中时建立链接，与元数据写入一样在线程中执行，不阻塞事件循环
+    plans = await asyncio.to_thread(lambda: [plan(result) for result in items])
+    
+    pending = [
+        (result["base_path"], {styles[seed]: output_paths[seed] for seed in styles if seed not in cached_seeds})
+        for result, _, output_paths, _, cached_seeds in plans
+    ]
+    stylized: List[Dict[str, bool]] = [{} for _ in plans]
+    batch = [i for i, (_, outputs) in enumerate(pending) if outputs]
+    try:
+        for i, outcome in zip(batch, await stylize_pool.stylize_many([pending[i] for i in batch])):
+            stylized[i] = outcome
+    except Exception as e:
+        print(f"批量风格化失败: {e}")
+    
+    for item_plan, outcome in zip(plans, stylized):
+        result = item_plan[0]
+        for variant_meta in await asyncio.to_thread(save, *item_plan, outcome):
+            event_bus.publish(
+                project_id, EVENT_VARIANT_RENDERED,
+                resource_type=resource_type, item_id=result["item_id"], seed=variant_meta["seed"],
+                total=len(styles) + 1, variant=variant_meta
+            )
+        cached_seeds = item_plan[4]
+        result["styles"] = {style: seed in cached_seeds or outcome.get(style, False) for seed, style in styles.items()}
+        await asset_index.refresh_resource(project_id, resource_type, result["item_id"])
+        event_bus.publish(
+            project_id, EVENT_STYLIZE_DONE,
+            resource_type=resource_type, item_id=result["item_id"], styles=result["styles"]
+        )
+        if job:
+            job.set_item(result["item_id"], "done", variant_id=result["variant_id"], styles=result["styles"])
+
+
 @router.get("/{project_id}/resources/{resource_type}")
-async def list_resources(project_id: str, resource_type: str):
-    """列出某类型的所有已生成资源"""
+async def list_resources(
+    project_id: str,
+    resource_type: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """列出某类型的所有已生成资源 (查询元数据索引，分页)"""
     if resource_type not in RESOURCE_TYPES:
         raise HTTPException(status_code=400, detail=f"无效的资源类型: {resource_type}")
     
-    resource_config = RESOURCE_TYPES[resource_type]
-    assets_dir = os.path.join(
-        settings.PROJECTS_DIR, project_id, "assets", resource_config["folder"]
-    )
-    
-    if not os.path.exists(assets_dir):
-        return {"resources": [], "total": 0}
-    
-    resources = []
-    for item_id in os.listdir(assets_dir):
-        item_dir = os.path.join(assets_dir, item_id)
-        if os.path.isdir(item_dir):
-            # 查找资源文件
-            resource_file = os.path.join(item_dir, f"{item_id}{resource_config['extension']}")
-            if os.path.exists(resource_file):
-                stat = os.stat(resource_file)
-                resources.append({
-                    "id": item_id,
-                    "file_path": resource_file,
-                    "size": stat.st_size,
-                    "created_at": stat.st_mtime
-                })
+    resources, total = await asset_index.list_resources(project_id, resource_type, offset, limit)
     
     return {
         "project_id": project_id,
         "resource_type": resource_type,
         "resources": resources,
-        "total": len(resources)
+        "total": total,
+        "offset": offset,
+        "limit": limit
     }
+
+
 @router.delete("/{project_id}/temp/{spec_type}/{item_id}")
 async def clear_item_temp_directory(project_id: str, spec_type: str, item_id: str):
     """
@@ -1080,6 +1502,9 @@ async def clear_item_temp_directory(project_id: str, spec_type: str, item_id: st
                 func(path)
             
             shutil.rmtree(item_temp_dir, onerror=handle_remove_readonly)
+            await asset_index.refresh_resource(project_id, resource_type, item_id)
+            # 回收已无引用的资源内容
+            await asyncio.to_thread(blob_store.gc)
             return {"success": True, "message": f"条目 {item_id} 的临时缓存已清理"}
         except Exception as e:
             print(f"清理条目 {item_id} 临时目录失败: {e}")
@@ -1107,9 +1532,97 @@ async def clear_temp_directory(project_id: str):
                 func(path)
             
             shutil.rmtree(temp_dir, onerror=handle_remove_readonly)
+            await asset_index.refresh_tree(project_id)
+            await asyncio.to_thread(blob_store.gc)
             return {"success": True, "message": "临时目录已清理"}
         except Exception as e:
             print(f"清理临时目录失败: {e}")
             raise HTTPException(status_code=500, detail=f"清理失败: {str(e)}")
     else:
         return {"success": True, "message": "临时目录不存在"}
+
+
+@router.delete("/render-cache")
+async def clear_render_cache():
+    """清空生成结果缓存 (已生成的变体文件不受影响)"""
+    removed = render_cache.invalidate()
+    return {"success": True, "removed": removed}
+
+
+@router.delete("/{project_id}/render-cache/{spec_type}/{item_id}")
+async def invalidate_item_render_cache(project_id: str, spec_type: str, item_id: str):
+    """使某个条目当前脚本的全部缓存结果失效，下次生成时重新执行脚本"""
+    spec_to_resource = {
+        "character": "character",
+        "scene": "scene", 
+        "item": "item",
+        "audio": "sfx",
+        "ui": "ui"
+    }
+    
+    if spec_type not in spec_to_resource:
+        raise HTTPException(status_code=400, detail=f"不支持的规格类型: {spec_type}")
+    
+    resource_config = RESOURCE_TYPES[spec_to_resource[spec_type]]
+    script_path = os.path.join(
+        os.path.abspath(settings.PROJECTS_DIR), project_id, "temp",
+        resource_config["folder"], item_id, "scripts", f"{item_id}_generator.py"
+    )
+    if not os.path.exists(script_path):
+        raise HTTPException(status_code=404, detail="条目脚本不存在")
+    
+    removed = render_cache.invalidate(script_path)
+    return {"success": True, "item_id": item_id, "removed": removed}
+
+
+@router.post("/blobs/gc")
+async def collect_blobs():
+    """清理所有项目中都已无引用的资源内容"""
+    return await asyncio.to_thread(blob_store.gc)
+
+
+@router.post("/{project_id}/blobs/dedupe")
+async def dedupe_project_assets(project_id: str):
+    """
+    对已有项目去重: 把 temp/ 与 assets/ 下的资源文件换成指向内容存储的硬链接
+    (动画目录会被原地重写，不参与去重)
+    """
+    project_path = os.path.join(os.path.abspath(settings.PROJECTS_DIR), project_id)
+    if not os.path.exists(project_path):
+        raise HTTPException(status_code=404, detail="项目不存在")
+    
+    result = {"project_id": project_id}
+    for folder in ("temp", "assets"):
+        folder_path = os.path.join(project_path, folder)
+        if os.path.exists(folder_path):
+            result[folder] = await asyncio.to_thread(blob_store.ingest_tree, folder_path)
+    return result
+
+
+@router.post("/{project_id}/atlas")
+async def build_project_atlas(project_id: str, force: bool = False):
+    """
+    把已选定的角色 / 道具及动画帧打包为精灵图集 (assets/atlas/atlas.json，Phaser multiatlas 格式)
+
+    选定资源未变化时直接返回上次的结果；force=true 强制重新打包
+    """
+    try:
+        result = await asyncio.to_thread(atlas_packer.build, project_id, force)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="项目不存在")
+    # 清单中的资源改由图集提供
+    await _refresh_asset_manifest(project_id)
+    return result
+
+
+@router.post("/{project_id}/asset-manifest")
+async def build_asset_manifest(project_id: str):
+    """
+    重新生成游戏资源清单 configs/asset_manifest.json
+
+    选定资源、上传 / 生成动画、打包图集后会自动生成，一般无需手动调用
+    """
+    try:
+        return await asyncio.to_thread(asset_manifest.build, project_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="项目不存在")
@@ -10,8 +10,9 @@ AI 游戏引擎 - 后端服务主入口
 
 # Triggering reload to pick up configuration changes
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 import os
 import sys
@@ -21,8 +22,28 @@ import asyncio
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-from app.api import projects, documents, resources, game_control
+from app.api import projects, documents, resources, game_control, jobs
 from app.services.config import settings
+from app.services.http_client import http_client
+from app.services.llm_cache import llm_cache
+from app.services.llm_scheduler import llm_scheduler, LLMBusyError
+from app.services.event_bus import event_bus
+from app.services.spec_extractor import spec_extractor
+from app.services.database import init_db, close_db
+from app.services.job_manager import job_manager
+from app.services.generator_pool import generator_pool
+from app.services.image_stylizer import stylize_pool
+from app.services.process_runner import process_runner
+from app.services.loop_monitor import loop_monitor
+from app.services.script_validator import script_validator, ScriptValidationError
+from app.services.render_cache import render_cache
+from app.services.blob_store import blob_store
+from app.services.asset_index import asset_index
+from app.services.animation_meta import animation_meta
+from app.services.atlas_packer import atlas_packer
+from app.services.asset_manifest import asset_manifest
+from app.services.preview_server import preview_server
+from app.services.preview_watcher import preview_watcher
 
 
 @asynccontextmanager
@@ -32,9 +53,31 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.PROJECTS_DIR, exist_ok=True)
     print(f"✓ 项目目录已就绪: {settings.PROJECTS_DIR}")
     
+    # 启动时: 创建共享 LLM HTTP 连接池
+    await http_client.start()
+    print("✓ LLM 连接池已创建")
+    
+    # 启动时: 事件循环延迟监控
+    loop_monitor.start()
+    
+    # 启动时: 预热生成脚本 worker 池
+    await generator_pool.start()
+    
+    # 启动时: 初始化数据库、对账元数据索引，并启动后台任务 worker (恢复未完成任务)
+    await init_db()
+    await asset_index.reconcile()
+    await job_manager.start()
+    
     yield
     
     # 关闭时: 清理资源
+    await preview_watcher.stop_all()
+    await job_manager.stop()
+    await generator_pool.stop()
+    stylize_pool.shutdown()
+    await loop_monitor.stop()
+    await close_db()
+    await http_client.close()
     print("✓ 服务已关闭")
 
 
@@ -53,16 +96,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],  # 前端需要读取批量资源状态的 ETag
 )
 
+@app.exception_handler(LLMBusyError)
+async def llm_busy_handler(request: Request, exc: LLMBusyError):
+    """LLM 繁忙时快速返回 503，提示客户端稍后重试"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "10"}
+    )
+
+
+@app.exception_handler(ScriptValidationError)
+async def script_invalid_handler(request: Request, exc: ScriptValidationError):
+    """生成脚本未通过静态检查: 返回 422 与具体问题，可用 force_regenerate 重新生成"""
+    return JSONResponse(
+        status_code=422,
+        content={"detail": f"生成脚本未通过检查: {exc}", "errors": exc.errors}
+    )
+
+
 # 注册 API 路由
 app.include_router(projects.router, prefix="/api/projects", tags=["项目管理"])
 app.include_router(documents.router, prefix="/api/documents", tags=["文档生成"])
 app.include_router(resources.router, prefix="/api/resources", tags=["资源生成"])
 app.include_router(game_control.router, prefix="/api/game", tags=["游戏控制"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["后台任务"])
 
 # 静态文件服务 - 提供资源文件访问
 app.mount("/assets", StaticFiles(directory=settings.PROJECTS_DIR), name="assets")
+# 游戏预览 - 已启动预览的项目 game/ 目录
+app.mount("/preview", preview_server, name="preview")
 
 
 @app.get("/")
@@ -83,3 +149,28 @@ async def health_check():
         "projects_dir": settings.PROJECTS_DIR,
         "llm_configured": bool(settings.LLM_BASE_URL)
     }
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """运行时指标"""
+    return {
+        "llm_http_pool": http_client.stats(),
+        "llm_cache": llm_cache.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "generator_pool": generator_pool.stats(),
+        "script_validator": script_validator.stats(),
+        "render_cache": render_cache.stats(),
+        "blob_store": blob_store.stats(),
+        "animation_meta": animation_meta.stats(),
+        "atlas_packer": atlas_packer.stats(),
+        "asset_manifest": asset_manifest.stats(),
+        "preview_server": preview_server.stats(),
+        "preview_watcher": preview_watcher.stats(),
+        "websocket": game_control.ws_manager.stats(),
+        "event_bus": event_bus.stats(),
+        "spec_extractor": spec_extractor.stats(),
+        "asset_index": asset_index.stats(),
+        "subprocess": process_runner.stats(),
+        "event_loop": loop_monitor.stats()
+    }
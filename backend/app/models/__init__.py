@@ -0,0 +1,6 @@
+"""数据模型模块"""
+
+from app.models.job import JobRecord
+from app.models.asset_index import ProjectRecord, VariantRecord, ResourceRecord, SpecRecord
+
+__all__ = ["JobRecord", "ProjectRecord", "VariantRecord", "ResourceRecord", "SpecRecord"]
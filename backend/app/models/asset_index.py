@@ -0,0 +1,68 @@
+"""
+项目与资源元数据索引表
+
+磁盘上的 project.json / 变体 JSON / 资源文件 / 规格文件仍是数据源，
+这些表是它们的索引，供列表接口分页查询 (启动时全量对账，写路径上增量更新)
+"""
+
+from sqlalchemy import String, Text, Integer, Float, Boolean, JSON, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+
+from app.services.database import Base
+
+
+class ProjectRecord(Base):
+    """项目 (project.json)"""
+    __tablename__ = "project_index"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    name: Mapped[str] = mapped_column(Text, default="")
+    status: Mapped[str] = mapped_column(String(16), default="draft")
+    created_at: Mapped[str] = mapped_column(String(32), index=True)
+    data: Mapped[dict] = mapped_column(JSON, default=dict)   # project.json 全文
+
+
+class VariantRecord(Base):
+    """候选变体 (temp/<folder>/<id>/variants/*.json)"""
+    __tablename__ = "variant_index"
+    __table_args__ = (
+        Index("ix_variant_resource", "project_id", "resource_type", "resource_id", "created_at"),
+    )
+
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)  # 项目/类型/资源/变体
+    project_id: Mapped[str] = mapped_column(String(64))
+    resource_type: Mapped[str] = mapped_column(String(32))
+    resource_id: Mapped[str] = mapped_column(String(128))
+    variant_id: Mapped[str] = mapped_column(String(128))
+    created_at: Mapped[str] = mapped_column(String(32), default="")
+    selected: Mapped[bool] = mapped_column(Boolean, default=False)
+    data: Mapped[dict] = mapped_column(JSON, default=dict)   # 变体元数据 (含 exists)
+
+
+class ResourceRecord(Base):
+    """已选定的正式资源 (assets/<folder>/<id>/<id>.<ext>)"""
+    __tablename__ = "resource_index"
+    __table_args__ = (
+        Index("ix_resource_project", "project_id", "resource_type", "resource_id"),
+    )
+
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)  # 项目/类型/资源
+    project_id: Mapped[str] = mapped_column(String(64))
+    resource_type: Mapped[str] = mapped_column(String(32))
+    resource_id: Mapped[str] = mapped_column(String(128))
+    file_path: Mapped[str] = mapped_column(Text)
+    size: Mapped[int] = mapped_column(Integer, default=0)
+    modified_at: Mapped[float] = mapped_column(Float, default=0.0)
+
+
+class SpecRecord(Base):
+    """规格文件 (specs/<type>.json)"""
+    __tablename__ = "spec_index"
+
+    id: Mapped[str] = mapped_column(String(128), primary_key=True)  # 项目/规格类型
+    project_id: Mapped[str] = mapped_column(String(64), index=True)
+    spec_type: Mapped[str] = mapped_column(String(32))
+    size: Mapped[int] = mapped_column(Integer, default=0)
+    modified_at: Mapped[float] = mapped_column(Float, default=0.0)
+    item_count: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
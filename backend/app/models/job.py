@@ -0,0 +1,26 @@
+"""
+后台任务表
+"""
+
+from sqlalchemy import String, Text, Integer, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+
+from app.services.database import Base
+
+
+class JobRecord(Base):
+    """持久化的后台任务"""
+    __tablename__ = "jobs"
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(64), index=True)
+    project_id: Mapped[str] = mapped_column(String(64), index=True)
+    status: Mapped[str] = mapped_column(String(16), index=True)  # pending / running / succeeded / failed / cancelled
+    params: Mapped[dict] = mapped_column(JSON, default=dict)     # 任务参数，重启后据此恢复执行
+    items: Mapped[dict] = mapped_column(JSON, default=dict)      # 逐条进度
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)    # 执行次数 (含重启恢复)
+    created_at: Mapped[str] = mapped_column(String(32))
+    updated_at: Mapped[str] = mapped_column(String(32))
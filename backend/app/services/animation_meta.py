@@ -0,0 +1,171 @@
+"""
+角色动画元数据清单
+
+序列帧的帧数、帧尺寸、内容包围盒在动画生成 / 上传时计算一次，写入动画目录下的 animations.json:
+- 列表接口只读清单，不再用 PIL 打开图片
+- 每个文件记录 mtime / 大小 / sha256，文件变化时才重新计算
+  (mtime 变化但内容哈希相同时只更新 mtime)
+- 每帧的内容包围盒一并保存，预览可直接按帧裁剪透明边框
+- 动画生成脚本输出的网格 Spritesheet 由 split_spritesheet 按行拆分为各动作的序列帧条
+"""
+
+from typing import Dict, Any, List, Optional
+import json
+import os
+import uuid
+
+from app.services.file_utils import write_json_atomic
+from app.services.blob_store import file_sha256
+
+
+MANIFEST_NAME = "animations.json"
+MANIFEST_VERSION = 1
+
+# 独立动作文件 anim_<type>.png (横向排列的正方形帧)
+ANIMATION_TYPES = ["idle", "walk", "attack"]
+# 兼容旧的整体式 Spritesheet
+SPRITESHEET_NAME = "spritesheet.png"
+# 动画生成脚本输出的 Spritesheet 布局: 每行一个动作 (顺序同 ANIMATION_TYPES)，每行 4 帧
+SPRITESHEET_COLUMNS = 4
+
+
+def _analyze(path: str) -> Dict[str, Any]:
+    """
+    解析序列帧图片
+
+    Returns:
+        frames / frameSize / content_bbox (整张图的内容包围盒) /
+        frame_bboxes (每帧相对于帧左上角的包围盒，全透明帧为 None) / width / height
+    """
+    from PIL import Image
+
+    with Image.open(path) as img:
+        w, h = img.size
+        # 假设是横向排列。如果 w=h 是单帧，否则 w/h 是帧数
+        frames = max(1, w // h) if h else 1
+        frame_bboxes: List[Optional[List[int]]] = []
+        for i in range(frames):
+            bbox = img.crop((i * h, 0, (i + 1) * h, h)).getbbox()
+            frame_bboxes.append(list(bbox) if bbox else None)
+        content_bbox = img.getbbox()
+    return {
+        "frames": frames,
+        "frameSize": h,
+        "width": w,
+        "height": h,
+        "content_bbox": list(content_bbox) if content_bbox else None,
+        "frame_bboxes": frame_bboxes
+    }
+
+
+def split_spritesheet(anim_dir: str, columns: int = SPRITESHEET_COLUMNS) -> List[str]:
+    """
+    把生成的网格 Spritesheet 按行拆分为 anim_<动作>.png (资源清单、图集与预览都按动作条读取帧数据)
+
+    行数须等于动作数、每行 columns 个正方形帧，尺寸不符时不拆分
+
+    Returns:
+        拆分出的动作
+    """
+    from PIL import Image
+
+    with Image.open(os.path.join(anim_dir, SPRITESHEET_NAME)) as img:
+        sheet = img.convert("RGBA")
+    width, height = sheet.size
+    size = height // len(ANIMATION_TYPES)
+    if not size or height % len(ANIMATION_TYPES) or width != size * columns:
+        print(f"Spritesheet 尺寸 {width}x{height} 不是 {columns}x{len(ANIMATION_TYPES)} 网格，不拆分动作")
+        return []
+
+    written = []
+    for row, atype in enumerate(ANIMATION_TYPES):
+        filename = f"anim_{atype}.png"
+        path = os.path.join(anim_dir, filename)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        sheet.crop((0, row * size, width, (row + 1) * size)).save(tmp_path, format="PNG")
+        os.replace(tmp_path, path)
+        written.append(atype)
+    return written
+
+
+class AnimationMetadata:
+    """动画清单的读取与增量更新"""
+
+    def __init__(self):
+        self.computed = 0
+        self.reused = 0
+        self.errors = 0
+
+    @staticmethod
+    def manifest_path(anim_dir: str) -> str:
+        return os.path.join(anim_dir, MANIFEST_NAME)
+
+    def _load(self, anim_dir: str) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path(anim_dir), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return {}
+        files = data.get("files")
+        return files if isinstance(files, dict) else {}
+
+    def _entry(self, path: str, stat: os.stat_result, old: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        文件未变化时复用旧条目，否则重新计算
+
+        无法解析的图片记录 error 字段 (同样按 mtime / 哈希缓存，不会每次请求都重试)
+        """
+        if old and old.get("mtime_ns") == stat.st_mtime_ns and old.get("size") == stat.st_size:
+            self.reused += 1
+            return old
+        try:
+            sha256 = file_sha256(path)
+        except OSError:
+            return None
+        if old and old.get("sha256") == sha256:
+            self.reused += 1
+            return {**old, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        try:
+            entry = _analyze(path)
+            self.computed += 1
+        except Exception as e:
+            print(f"解析动画文件失败 {path}: {e}")
+            self.errors += 1
+            entry = {"error": str(e)}
+        entry.update({"sha256": sha256, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+        return entry
+
+    def update(self, anim_dir: str) -> Dict[str, Dict[str, Any]]:
+        """
+        按目录中的现有文件刷新清单 (只重新计算变化的文件)，有变化时写回
+
+        Returns:
+            文件名 -> 元数据
+        """
+        old_files = self._load(anim_dir)
+        files: Dict[str, Dict[str, Any]] = {}
+        for filename in [SPRITESHEET_NAME] + [f"anim_{atype}.png" for atype in ANIMATION_TYPES]:
+            path = os.path.join(anim_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = self._entry(path, stat, old_files.get(filename))
+            if entry:
+                files[filename] = entry
+
+        if files != old_files and os.path.isdir(anim_dir):
+            try:
+                write_json_atomic(self.manifest_path(anim_dir), {"version": MANIFEST_VERSION, "files": files})
+            except OSError as e:
+                print(f"写入动画清单失败: {e}")
+        return files
+
+    def stats(self) -> Dict[str, Any]:
+        return {"computed": self.computed, "reused": self.reused, "errors": self.errors}
+
+
+# 全局动画元数据
+animation_meta = AnimationMetadata()
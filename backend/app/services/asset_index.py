@@ -0,0 +1,360 @@
+"""
+项目与资源元数据索引
+
+列表接口不再逐个扫描目录、解析 JSON，而是查询 SQLite 中的索引表 (见 models/asset_index.py)
+- 启动时全量对账: 扫描 PROJECTS_DIR 重建索引 (外部直接改动磁盘的情况也能纠正)
+- 写路径增量更新: 写入 project.json / 变体 / 正式资源 / 规格文件后刷新对应范围
+  (只重新扫描单个资源或单个文件，代价与项目规模无关)
+- 列表查询走索引并分页
+- 每个项目维护一个版本号，索引或动画文件变化时递增，供批量状态接口生成 ETag
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from sqlalchemy import delete, func, insert, select
+
+from app.models.asset_index import ProjectRecord, VariantRecord, ResourceRecord, SpecRecord
+from app.services.config import settings
+from app.services.database import async_session
+from app.services.resource_types import RESOURCE_TYPES, SPEC_TYPES
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class AssetIndex:
+    """元数据索引"""
+
+    def __init__(self, projects_dir: str):
+        self.projects_dir = projects_dir
+
+        self.reconciled_at: Optional[float] = None
+        self.reconcile_seconds = 0.0
+        self.refreshes = 0
+
+        # 对账批次 (每次全量对账后更换) 与项目版本号
+        self._generation = uuid.uuid4().hex[:8]
+        self._versions: Dict[str, int] = {}
+
+    def _project_path(self, project_id: str) -> str:
+        return os.path.join(os.path.abspath(self.projects_dir), project_id)
+
+    def touch(self, project_id: str):
+        """项目内容变化 (含不在索引中的文件，如动画序列帧)，版本号递增"""
+        self._versions[project_id] = self._versions.get(project_id, 0) + 1
+
+    def version(self, project_id: str) -> str:
+        """项目当前版本 (进程重启或全量对账后也会变化)"""
+        return f"{self._generation}-{self._versions.get(project_id, 0)}"
+
+    # ============ 磁盘扫描 (同步，在线程中执行) ============
+
+    def _scan_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        data = _read_json(os.path.join(self._project_path(project_id), "project.json"))
+        if not isinstance(data, dict):
+            return None
+        return {
+            "id": project_id,
+            "name": data.get("name", ""),
+            "status": data.get("status", "draft"),
+            "created_at": data.get("created_at", ""),
+            "data": data
+        }
+
+    def _scan_variants(self, project_id: str, resource_type: str, resource_id: str) -> List[Dict[str, Any]]:
+        variants_dir = os.path.join(
+            self._project_path(project_id), "temp",
+            RESOURCE_TYPES[resource_type]["folder"], resource_id, "variants"
+        )
+        if not os.path.isdir(variants_dir):
+            return []
+        rows = []
+        for filename in os.listdir(variants_dir):
+            if not filename.endswith(".json"):
+                continue
+            meta = _read_json(os.path.join(variants_dir, filename))
+            if not isinstance(meta, dict):
+                continue
+            variant_id = meta.get("variant_id") or filename[:-5]
+            meta["exists"] = os.path.exists(meta.get("file_path", ""))
+            rows.append({
+                "id": f"{project_id}/{resource_type}/{resource_id}/{variant_id}",
+                "project_id": project_id,
+                "resource_type": resource_type,
+                "resource_id": resource_id,
+                "variant_id": variant_id,
+                "created_at": meta.get("created_at") or meta.get("generated_at") or "",
+                "selected": bool(meta.get("selected")),
+                "data": meta
+            })
+        return rows
+
+    def _scan_resource(self, project_id: str, resource_type: str, resource_id: str) -> Optional[Dict[str, Any]]:
+        config = RESOURCE_TYPES[resource_type]
+        path = os.path.join(
+            self._project_path(project_id), "assets", config["folder"],
+            resource_id, f"{resource_id}{config['extension']}"
+        )
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return {
+            "id": f"{project_id}/{resource_type}/{resource_id}",
+            "project_id": project_id,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "file_path": path,
+            "size": stat.st_size,
+            "modified_at": stat.st_mtime
+        }
+
+    def _scan_spec(self, project_id: str, spec_type: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self._project_path(project_id), "specs", f"{spec_type}.json")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        # 条目数: 第一个列表字段的长度 (与原 list_specs 一致)
+        item_count = None
+        data = _read_json(path)
+        if isinstance(data, dict):
+            for value in data.values():
+                if isinstance(value, list):
+                    item_count = len(value)
+                    break
+        return {
+            "id": f"{project_id}/{spec_type}",
+            "project_id": project_id,
+            "spec_type": spec_type,
+            "size": stat.st_size,
+            "modified_at": stat.st_mtime,
+            "item_count": item_count
+        }
+
+    def _resource_ids(self, project_id: str, resource_type: str) -> set:
+        """temp 与 assets 下出现过的全部资源 ID"""
+        folder = RESOURCE_TYPES[resource_type]["folder"]
+        ids = set()
+        for area in ("temp", "assets"):
+            base = os.path.join(self._project_path(project_id), area, folder)
+            if os.path.isdir(base):
+                ids.update(name for name in os.listdir(base) if os.path.isdir(os.path.join(base, name)))
+        return ids
+
+    def _scan_tree(self, project_id: str) -> Dict[str, list]:
+        """扫描单个项目的全部索引数据"""
+        project = self._scan_project(project_id)
+        rows = {"projects": [project] if project else [], "variants": [], "resources": [], "specs": []}
+        if not project:
+            return rows
+        for resource_type in RESOURCE_TYPES:
+            for resource_id in self._resource_ids(project_id, resource_type):
+                rows["variants"].extend(self._scan_variants(project_id, resource_type, resource_id))
+                resource = self._scan_resource(project_id, resource_type, resource_id)
+                if resource:
+                    rows["resources"].append(resource)
+        for spec_type in SPEC_TYPES:
+            spec = self._scan_spec(project_id, spec_type)
+            if spec:
+                rows["specs"].append(spec)
+        return rows
+
+    def _scan_all(self) -> Dict[str, list]:
+        rows = {"projects": [], "variants": [], "resources": [], "specs": []}
+        if not os.path.isdir(self.projects_dir):
+            return rows
+        for project_id in os.listdir(self.projects_dir):
+            if not os.path.isdir(self._project_path(project_id)):
+                continue
+            for key, items in self._scan_tree(project_id).items():
+                rows[key].extend(items)
+        return rows
+
+    # ============ 写入 ============
+
+    @staticmethod
+    async def _replace(session, model, conditions: list, rows: List[Dict[str, Any]]):
+        """删除满足条件的行后批量写入新行"""
+        await session.execute(delete(model).where(*conditions))
+        if rows:
+            await session.execute(insert(model), rows)
+
+    async def reconcile(self):
+        """全量对账: 按磁盘内容重建索引"""
+        started = time.perf_counter()
+        rows = await asyncio.to_thread(self._scan_all)
+        async with async_session() as session:
+            async with session.begin():
+                for model, key in (
+                    (ProjectRecord, "projects"), (VariantRecord, "variants"),
+                    (ResourceRecord, "resources"), (SpecRecord, "specs")
+                ):
+                    await self._replace(session, model, [], rows[key])
+        self._generation = uuid.uuid4().hex[:8]
+        self.reconciled_at = time.time()
+        self.reconcile_seconds = time.perf_counter() - started
+        print(
+            f"✓ 元数据索引已对账: {len(rows['projects'])} 个项目, {len(rows['variants'])} 个变体 "
+            f"({self.reconcile_seconds:.2f}s)"
+        )
+
+    async def refresh_project(self, project_id: str):
+        """project.json 写入后刷新项目行"""
+        row = await asyncio.to_thread(self._scan_project, project_id)
+        async with async_session() as session:
+            async with session.begin():
+                await self._replace(session, ProjectRecord, [ProjectRecord.id == project_id], [row] if row else [])
+        self.refreshes += 1
+        self.touch(project_id)
+
+    async def refresh_resource(self, project_id: str, resource_type: str, resource_id: str):
+        """某个资源的变体或正式资源变化后刷新 (只扫描该资源目录)"""
+        variants, resource = await asyncio.to_thread(
+            lambda: (
+                self._scan_variants(project_id, resource_type, resource_id),
+                self._scan_resource(project_id, resource_type, resource_id)
+            )
+        )
+        async with async_session() as session:
+            async with session.begin():
+                await self._replace(session, VariantRecord, [
+                    VariantRecord.project_id == project_id,
+                    VariantRecord.resource_type == resource_type,
+                    VariantRecord.resource_id == resource_id
+                ], variants)
+                await self._replace(
+                    session, ResourceRecord,
+                    [ResourceRecord.id == f"{project_id}/{resource_type}/{resource_id}"],
+                    [resource] if resource else []
+                )
+        self.refreshes += 1
+        self.touch(project_id)
+
+    async def refresh_spec(self, project_id: str, spec_type: str):
+        """规格文件写入后刷新"""
+        row = await asyncio.to_thread(self._scan_spec, project_id, spec_type)
+        async with async_session() as session:
+            async with session.begin():
+                await self._replace(session, SpecRecord, [SpecRecord.id == f"{project_id}/{spec_type}"], [row] if row else [])
+        self.refreshes += 1
+        self.touch(project_id)
+
+    async def refresh_tree(self, project_id: str):
+        """重新扫描整个项目 (批量写入、清理目录后使用；项目已删除时清除其全部索引)"""
+        rows = await asyncio.to_thread(self._scan_tree, project_id)
+        async with async_session() as session:
+            async with session.begin():
+                await self._replace(session, ProjectRecord, [ProjectRecord.id == project_id], rows["projects"])
+                await self._replace(session, VariantRecord, [VariantRecord.project_id == project_id], rows["variants"])
+                await self._replace(session, ResourceRecord, [ResourceRecord.project_id == project_id], rows["resources"])
+                await self._replace(session, SpecRecord, [SpecRecord.project_id == project_id], rows["specs"])
+        self.refreshes += 1
+        self.touch(project_id)
+
+    # ============ 查询 ============
+
+    async def list_projects(self, offset: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], int]:
+        """按创建时间倒序分页"""
+        async with async_session() as session:
+            total = await session.scalar(select(func.count()).select_from(ProjectRecord))
+            rows = await session.scalars(
+                select(ProjectRecord).order_by(ProjectRecord.created_at.desc()).offset(offset).limit(limit)
+            )
+            return [row.data for row in rows], total or 0
+
+    async def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        async with async_session() as session:
+            row = await session.get(ProjectRecord, project_id)
+            return row.data if row else None
+
+    async def list_variants(self, project_id: str, resource_type: str, resource_id: str) -> List[Dict[str, Any]]:
+        """某个资源的候选变体，按创建时间倒序"""
+        async with async_session() as session:
+            rows = await session.scalars(
+                select(VariantRecord)
+                .where(
+                    VariantRecord.project_id == project_id,
+                    VariantRecord.resource_type == resource_type,
+                    VariantRecord.resource_id == resource_id
+                )
+                .order_by(VariantRecord.created_at.desc(), VariantRecord.variant_id)
+            )
+            return [row.data for row in rows]
+
+    async def get_resource(self, project_id: str, resource_type: str, resource_id: str) -> Optional[Dict[str, Any]]:
+        async with async_session() as session:
+            row = await session.get(ResourceRecord, f"{project_id}/{resource_type}/{resource_id}")
+            return self._resource_dict(row) if row else None
+
+    async def project_status(
+        self, project_id: str, resource_types: List[str]
+    ) -> Tuple[Dict[Tuple[str, str], List[Dict[str, Any]]], Dict[Tuple[str, str], Dict[str, Any]]]:
+        """
+        一次查询项目中指定类型的全部变体与正式资源
+
+        Returns:
+            ({(类型, 资源ID): [变体, ...]}, {(类型, 资源ID): 正式资源})
+        """
+        async with async_session() as session:
+            variant_rows = await session.scalars(
+                select(VariantRecord)
+                .where(VariantRecord.project_id == project_id, VariantRecord.resource_type.in_(resource_types))
+                .order_by(VariantRecord.created_at.desc(), VariantRecord.variant_id)
+            )
+            variants: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+            for row in variant_rows:
+                variants.setdefault((row.resource_type, row.resource_id), []).append(row.data)
+
+            resource_rows = await session.scalars(
+                select(ResourceRecord)
+                .where(ResourceRecord.project_id == project_id, ResourceRecord.resource_type.in_(resource_types))
+            )
+            finals = {(row.resource_type, row.resource_id): self._resource_dict(row) for row in resource_rows}
+        return variants, finals
+
+    @staticmethod
+    def _resource_dict(row: ResourceRecord) -> Dict[str, Any]:
+        return {"id": row.resource_id, "file_path": row.file_path, "size": row.size, "created_at": row.modified_at}
+
+    async def list_resources(
+        self, project_id: str, resource_type: str, offset: int = 0, limit: int = 100
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        conditions = [ResourceRecord.project_id == project_id, ResourceRecord.resource_type == resource_type]
+        async with async_session() as session:
+            total = await session.scalar(select(func.count()).select_from(ResourceRecord).where(*conditions))
+            rows = await session.scalars(
+                select(ResourceRecord).where(*conditions)
+                .order_by(ResourceRecord.resource_id).offset(offset).limit(limit)
+            )
+            return [self._resource_dict(r) for r in rows], total or 0
+
+    async def list_specs(self, project_id: str) -> Dict[str, Dict[str, Any]]:
+        """规格类型 -> 文件信息 (只含已存在的规格)"""
+        async with async_session() as session:
+            rows = await session.scalars(select(SpecRecord).where(SpecRecord.project_id == project_id))
+            return {
+                r.spec_type: {"size": r.size, "modified_at": r.modified_at, "item_count": r.item_count}
+                for r in rows
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reconciled_at": self.reconciled_at,
+            "reconcile_seconds": round(self.reconcile_seconds, 3),
+            "refreshes": self.refreshes
+        }
+
+
+# 全局元数据索引
+asset_index = AssetIndex(settings.PROJECTS_DIR)
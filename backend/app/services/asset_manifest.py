@@ -0,0 +1,237 @@
+"""
+游戏资源清单
+
+为游戏模板生成 configs/asset_manifest.json，BootScene 据此只预加载当前场景需要的资源，其余延后加载:
+- assets: 资源 key -> 带内容哈希的 URL、大小、类型 (序列帧附帧尺寸 / 帧数 / 每帧包围盒)
+- groups: boot (所有场景共用: 图集、主角、UI) / scene:<场景ID> (背景与 BGM) / deferred (其余资源)
+- version: 资源与分组内容的哈希，内容不变时不重写文件
+- 图集已打包且未过期时，其中包含的帧标注 atlas 字段，不再单独加载
+
+资源 key:
+- character/<id>、scene/<id>、item/<id>、ui/<id>、bgm/<id>、sfx/<id>: 选定的正式资源
+- anim/<角色ID>/<动作>: 角色动作序列帧 (动画 key 为 character/<角色ID>/<动作>)
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import hashlib
+import json
+import os
+
+from app.services.config import settings
+from app.services.file_utils import write_json_atomic
+from app.services.blob_store import file_sha256
+from app.services.animation_meta import animation_meta, ANIMATION_TYPES
+from app.services.atlas_packer import atlas_packer, ATLAS_MANIFEST
+from app.services.resource_types import RESOURCE_TYPES
+
+
+MANIFEST_PATH = os.path.join("configs", "asset_manifest.json")
+MANIFEST_FORMAT = 1
+
+# 图集在游戏中的纹理 key (与模板 BootScene 的 ATLAS_KEY 一致)
+ATLAS_KEY = "sprites"
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _spec_items(project_path: str, spec_type: str, field: str) -> List[Dict[str, Any]]:
+    data = _read_json(os.path.join(project_path, "specs", f"{spec_type}.json"))
+    if isinstance(data, dict) and isinstance(data.get("spec"), dict):
+        data = data["spec"]
+    items = data.get(field) if isinstance(data, dict) else None
+    return [item for item in items or [] if isinstance(item, dict) and item.get("id")]
+
+
+class AssetManifestBuilder:
+    """资源清单生成器"""
+
+    def __init__(self, projects_dir: str):
+        self.projects_dir = projects_dir
+
+        # 文件哈希缓存: 路径 -> ((inode, mtime_ns, size), sha256)
+        self._hashes: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+
+        self.builds = 0
+        self.writes = 0
+
+    def _project_path(self, project_id: str) -> str:
+        return os.path.join(os.path.abspath(self.projects_dir), project_id)
+
+    def _hash(self, path: str, stat: os.stat_result) -> str:
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        digest = file_sha256(path)
+        self._hashes[path] = (version, digest)
+        return digest
+
+    def _collect_assets(self, project_path: str) -> Dict[str, Dict[str, Any]]:
+        """扫描 assets/ 下的正式资源与动作序列帧"""
+        assets: Dict[str, Dict[str, Any]] = {}
+        for resource_type, config in RESOURCE_TYPES.items():
+            base = os.path.join(project_path, "assets", config["folder"])
+            if not os.path.isdir(base):
+                continue
+            for resource_id in sorted(os.listdir(base)):
+                filename = f"{resource_id}{config['extension']}"
+                path = os.path.join(base, resource_id, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    stat = None
+                if stat:
+                    digest = self._hash(path, stat)
+                    assets[f"{resource_type}/{resource_id}"] = {
+                        "type": "image" if config["category"] == "image" else "audio",
+                        "url": f"assets/{config['folder']}/{resource_id}/{filename}?v={digest[:12]}",
+                        "size": stat.st_size,
+                        "sha256": digest
+                    }
+
+                anim_dir = os.path.join(base, resource_id, "animations")
+                if resource_type != "character" or not os.path.isdir(anim_dir):
+                    continue
+                files = animation_meta.update(anim_dir)
+                for atype in ANIMATION_TYPES:
+                    anim_file = f"anim_{atype}.png"
+                    meta = files.get(anim_file)
+                    if not meta or meta.get("error"):
+                        continue
+                    assets[f"anim/{resource_id}/{atype}"] = {
+                        "type": "spritesheet",
+                        "url": f"assets/{config['folder']}/{resource_id}/animations/{anim_file}?v={meta['sha256'][:12]}",
+                        "size": meta["size"],
+                        "sha256": meta["sha256"],
+                        "animation": f"character/{resource_id}/{atype}",
+                        "frameWidth": meta["frameSize"],
+                        "frameHeight": meta["frameSize"],
+                        "frames": meta["frames"],
+                        "frame_bboxes": meta["frame_bboxes"]
+                    }
+        return assets
+
+    def _attach_atlas(self, project_id: str, project_path: str, assets: Dict[str, Dict[str, Any]]) -> Optional[str]:
+        """图集未过期时加入清单，并给其中包含的资源标注所在帧"""
+        atlas = atlas_packer.current_manifest(project_id)
+        if atlas is None:
+            return None
+        frame_names = {frame["filename"] for texture in atlas["textures"] for frame in texture["frames"]}
+        for key, asset in assets.items():
+            if asset["type"] == "image" and key in frame_names:
+                asset["atlas"] = {"key": ATLAS_KEY, "frame": key}
+            elif asset["type"] == "spritesheet":
+                prefix = asset["animation"]
+                frames = [f"{prefix}/{i}" for i in range(asset["frames"])]
+                if all(name in frame_names for name in frames):
+                    asset["atlas"] = {"key": ATLAS_KEY, "frames": frames}
+
+        atlas_path = os.path.join(project_path, "assets", "atlas", ATLAS_MANIFEST)
+        assets[ATLAS_KEY] = {
+            "type": "multiatlas",
+            "url": f"assets/atlas/{ATLAS_MANIFEST}?v={atlas['meta']['inputs'][:12]}",
+            "path": "assets/atlas/",
+            "size": os.path.getsize(atlas_path) + sum(
+                os.path.getsize(os.path.join(os.path.dirname(atlas_path), t["image"])) for t in atlas["textures"]
+            ),
+            "sha256": atlas["meta"]["inputs"]
+        }
+        return ATLAS_KEY
+
+    @staticmethod
+    def _match_bgm(bgm_id: Optional[str], assets: Dict[str, Dict[str, Any]]) -> Optional[str]:
+        """场景的 bgm_id 与已有 BGM 匹配 (允许前缀匹配，如 bgm_huaguoshan_joyful -> bgm_huaguoshan)"""
+        if not bgm_id:
+            return None
+        if f"bgm/{bgm_id}" in assets:
+            return f"bgm/{bgm_id}"
+        candidates = [
+            key for key in assets
+            if key.startswith("bgm/") and (bgm_id.startswith(key[4:]) or key[4:].startswith(bgm_id))
+        ]
+        return max(candidates, key=len) if candidates else None
+
+    def _group(self, project_path: str, assets: Dict[str, Dict[str, Any]], atlas_key: Optional[str]) -> Tuple[Dict[str, List[str]], Optional[str]]:
+        """按场景划分依赖组，返回 (分组, 起始场景)"""
+        groups: Dict[str, List[str]] = {"boot": []}
+        if atlas_key:
+            groups["boot"].append(atlas_key)
+
+        # 主角在所有场景中都会出现
+        for character in _spec_items(project_path, "character", "characters"):
+            if character.get("type") != "protagonist":
+                continue
+            groups["boot"].extend(
+                key for key in assets
+                if key == f"character/{character['id']}" or key.startswith(f"anim/{character['id']}/")
+            )
+        groups["boot"].extend(key for key in assets if key.startswith("ui/"))
+
+        start_scene = None
+        for scene in _spec_items(project_path, "scene", "scenes"):
+            keys = [key for key in (f"scene/{scene['id']}", self._match_bgm(scene.get("bgm_id"), assets)) if key in assets]
+            groups[f"scene:{scene['id']}"] = keys
+            if start_scene is None and keys:
+                start_scene = scene["id"]
+
+        grouped = {key for keys in groups.values() for key in keys}
+        groups["deferred"] = [key for key in assets if key not in grouped]
+        return groups, start_scene
+
+    def build(self, project_id: str) -> Dict[str, Any]:
+        """
+        生成资源清单 (同步，在线程中调用)；内容未变化时不重写文件
+        """
+        project_path = self._project_path(project_id)
+        if not os.path.isdir(project_path):
+            raise FileNotFoundError(project_id)
+
+        assets = self._collect_assets(project_path)
+        atlas_key = self._attach_atlas(project_id, project_path, assets)
+        groups, start_scene = self._group(project_path, assets, atlas_key)
+
+        version = hashlib.sha256(
+            json.dumps({"assets": assets, "groups": groups, "start_scene": start_scene}, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+
+        manifest_path = os.path.join(project_path, MANIFEST_PATH)
+        existing = _read_json(manifest_path)
+        changed = not (isinstance(existing, dict) and existing.get("version") == version
+                       and existing.get("format") == MANIFEST_FORMAT)
+        if changed:
+            os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+            write_json_atomic(manifest_path, {
+                "format": MANIFEST_FORMAT,
+                "version": version,
+                "generated_at": datetime.now().isoformat(),
+                "start_scene": start_scene,
+                "total_bytes": sum(asset["size"] for asset in assets.values()),
+                "assets": assets,
+                "groups": groups
+            })
+            self.writes += 1
+        self.builds += 1
+
+        return {
+            "project_id": project_id,
+            "version": version,
+            "changed": changed,
+            "manifest_url": f"/assets/{project_id}/configs/asset_manifest.json",
+            "start_scene": start_scene,
+            "assets": len(assets),
+            "groups": {name: len(keys) for name, keys in groups.items()}
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"builds": self.builds, "writes": self.writes, "hashed_files": len(self._hashes)}
+
+
+# 全局资源清单生成器
+asset_manifest = AssetManifestBuilder(settings.PROJECTS_DIR)
@@ -0,0 +1,363 @@
+"""
+精灵图集打包
+
+把项目中已选定的角色、道具图片以及角色动画的每一帧合并为少量 2 的幂尺寸的图集，
+输出 Phaser multiatlas 格式的 JSON (assets/atlas/atlas.json + atlas-<输入指纹>-<n>.png):
+- 每帧裁掉透明边框 (trimmed + spriteSourceSize，Phaser 渲染时自动还原位置)
+- 帧之间保留间距，避免纹理过滤时相邻帧渗色
+- 单张图集放不下时拆分为多张
+- 增量: 输入文件的内容哈希与打包参数都没变时不重新打包 (文件哈希按 inode / mtime / 大小缓存)
+- 图集页文件名带输入指纹，浏览器不会把新的 atlas.json 与缓存的旧图集页配对
+
+帧命名:
+- character/<id>、item/<id>: 选定的正式资源
+- character/<id>/<动作>/<帧号>: anim_<动作>.png 中的各帧 (生成的 spritesheet.png 已拆分为动作条；
+  上传的整体式 spritesheet.png 布局不固定，不参与打包)
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from app.services.config import settings
+from app.services.file_utils import write_json_atomic
+from app.services.blob_store import file_sha256
+from app.services.animation_meta import animation_meta, ANIMATION_TYPES
+from app.services.resource_types import RESOURCE_TYPES
+
+
+ATLAS_DIR = os.path.join("assets", "atlas")
+ATLAS_MANIFEST = "atlas.json"
+ATLAS_FORMAT_VERSION = 1
+
+# 参与打包的资源类型 (场景是大尺寸背景图，单独加载更合适)
+ATLAS_RESOURCE_TYPES = ["character", "item"]
+
+
+def _pow2_sizes(max_size: int) -> List[Tuple[int, int]]:
+    """候选图集尺寸 (宽高都是 2 的幂，宽不小于高且不超过高的 2 倍)，按面积从小到大"""
+    sizes = []
+    w = 16
+    while w <= max_size:
+        for h in (w // 2, w):
+            if h >= 16:
+                sizes.append((w, h))
+        w *= 2
+    return sorted(sizes, key=lambda s: (s[0] * s[1], s[0]))
+
+
+def _shelf_pack(
+    sizes: List[Tuple[int, int]], width: int, height: int, padding: int
+) -> List[Optional[Tuple[int, int]]]:
+    """
+    货架式装箱 (输入应已按高度降序)，返回每个矩形的左上角坐标，放不下的为 None
+    """
+    positions: List[Optional[Tuple[int, int]]] = []
+    x = y = shelf_h = 0
+    for w, h in sizes:
+        if w > width or h > height:
+            positions.append(None)
+            continue
+        if x + w > width:
+            # 换到下一层货架
+            x, y, shelf_h = 0, y + shelf_h + padding, 0
+        if y + h > height:
+            positions.append(None)
+            continue
+        positions.append((x, y))
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+    return positions
+
+
+class AtlasPacker:
+    """项目精灵图集打包器"""
+
+    def __init__(self, projects_dir: str, max_size: int, padding: int):
+        self.projects_dir = projects_dir
+        self.max_size = max_size
+        self.padding = padding
+
+        # 文件哈希缓存: 路径 -> ((inode, mtime_ns, size), sha256)
+        self._hashes: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+
+        self.builds = 0
+        self.up_to_date = 0
+        self.last_build_seconds = 0.0
+
+    def _project_path(self, project_id: str) -> str:
+        return os.path.join(os.path.abspath(self.projects_dir), project_id)
+
+    # ============ 输入收集 ============
+
+    def _hash(self, path: str) -> str:
+        stat = os.stat(path)
+        version = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+        digest = file_sha256(path)
+        self._hashes[path] = (version, digest)
+        return digest
+
+    def _sources(self, project_id: str) -> List[Dict[str, Any]]:
+        """
+        列出参与打包的源文件 (不解码图片)
+
+        Returns:
+            [{"path", "sha256", "name" (单图) 或 "prefix" + "frames" + "frameSize" (动画条)}]
+        """
+        project_path = self._project_path(project_id)
+        sources = []
+        for resource_type in ATLAS_RESOURCE_TYPES:
+            config = RESOURCE_TYPES[resource_type]
+            base = os.path.join(project_path, "assets", config["folder"])
+            if not os.path.isdir(base):
+                continue
+            for resource_id in sorted(os.listdir(base)):
+                path = os.path.join(base, resource_id, f"{resource_id}{config['extension']}")
+                if os.path.isfile(path):
+                    sources.append({
+                        "name": f"{resource_type}/{resource_id}",
+                        "path": path,
+                        "sha256": self._hash(path)
+                    })
+
+                anim_dir = os.path.join(base, resource_id, "animations")
+                if resource_type != "character" or not os.path.isdir(anim_dir):
+                    continue
+                files = animation_meta.update(anim_dir)
+                for atype in ANIMATION_TYPES:
+                    meta = files.get(f"anim_{atype}.png")
+                    if not meta or meta.get("error"):
+                        continue
+                    sources.append({
+                        "prefix": f"{resource_type}/{resource_id}/{atype}",
+                        "path": os.path.join(anim_dir, f"anim_{atype}.png"),
+                        "sha256": meta["sha256"],
+                        "frames": meta["frames"],
+                        "frameSize": meta["frameSize"]
+                    })
+        return sources
+
+    def _fingerprint(self, sources: List[Dict[str, Any]]) -> str:
+        payload = json.dumps(
+            {
+                "version": ATLAS_FORMAT_VERSION,
+                "max_size": self.max_size,
+                "padding": self.padding,
+                "sources": [[s.get("name") or s["prefix"], s["sha256"]] for s in sources]
+            },
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _load_sprites(sources: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """解码源图片并裁掉透明边框，返回 (帧列表, 跳过的文件)"""
+        from PIL import Image
+
+        sprites, skipped = [], []
+        for source in sources:
+            try:
+                with Image.open(source["path"]) as img:
+                    img = img.convert("RGBA")
+            except Exception as e:
+                print(f"图集跳过无法读取的图片 {source['path']}: {e}")
+                skipped.append(source["path"])
+                continue
+
+            if "name" in source:
+                frames = [(source["name"], img)]
+            else:
+                size = source["frameSize"]
+                frames = [
+                    (f"{source['prefix']}/{i}", img.crop((i * size, 0, (i + 1) * size, size)))
+                    for i in range(source["frames"])
+                ]
+
+            for name, frame in frames:
+                # 全透明帧保留 1x1 像素，Phaser 仍能按 sourceSize 占位
+                bbox = frame.getbbox() or (0, 0, 1, 1)
+                sprites.append({
+                    "name": name,
+                    "image": frame.crop(bbox),
+                    "offset": (bbox[0], bbox[1]),
+                    "source_size": frame.size
+                })
+        return sprites, skipped
+
+    # ============ 装箱 ============
+
+    def _smallest_fit(self, sprites: List[Dict[str, Any]]) -> Optional[Tuple[Tuple[int, int], list]]:
+        """能放下全部帧的最小图集尺寸"""
+        sizes = [sprite["image"].size for sprite in sprites]
+        # 面积下界，小于它的尺寸不必尝试
+        area = sum(w * h for w, h in sizes)
+        for width, height in _pow2_sizes(self.max_size):
+            if width * height < area:
+                continue
+            positions = _shelf_pack(sizes, width, height, self.padding)
+            if all(p is not None for p in positions):
+                return (width, height), positions
+        return None
+
+    def _paginate(self, sprites: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """拆分为若干张图集，返回 (图集列表, 超出最大尺寸而跳过的帧)"""
+        remaining = sorted(sprites, key=lambda s: (-s["image"].size[1], -s["image"].size[0], s["name"]))
+        too_large = [s["name"] for s in remaining if max(s["image"].size) > self.max_size]
+        remaining = [s for s in remaining if max(s["image"].size) <= self.max_size]
+
+        pages = []
+        while remaining:
+            fit = self._smallest_fit(remaining)
+            if fit is None:
+                # 最大尺寸也放不下: 先装满一张，剩余的放到下一张
+                positions = _shelf_pack(
+                    [s["image"].size for s in remaining], self.max_size, self.max_size, self.padding
+                )
+                page_sprites = [s for s, p in zip(remaining, positions) if p is not None]
+                remaining = [s for s, p in zip(remaining, positions) if p is None]
+                fit = self._smallest_fit(page_sprites)
+            else:
+                page_sprites, remaining = remaining, []
+            (width, height), positions = fit
+            pages.append({"size": (width, height), "sprites": list(zip(page_sprites, positions))})
+        return pages, too_large
+
+    # ============ 输出 ============
+
+    def _write_pages(self, atlas_dir: str, pages: List[Dict[str, Any]], fingerprint: str) -> List[Dict[str, Any]]:
+        from PIL import Image
+
+        textures = []
+        for index, page in enumerate(pages):
+            width, height = page["size"]
+            sheet = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+            frames = []
+            for sprite, (x, y) in page["sprites"]:
+                w, h = sprite["image"].size
+                sheet.paste(sprite["image"], (x, y))
+                source_w, source_h = sprite["source_size"]
+                frames.append({
+                    "filename": sprite["name"],
+                    "rotated": False,
+                    "trimmed": (w, h) != (source_w, source_h),
+                    "sourceSize": {"w": source_w, "h": source_h},
+                    "spriteSourceSize": {"x": sprite["offset"][0], "y": sprite["offset"][1], "w": w, "h": h},
+                    "frame": {"x": x, "y": y, "w": w, "h": h}
+                })
+
+            image_name = f"atlas-{fingerprint[:12]}-{index}.png"
+            path = os.path.join(atlas_dir, image_name)
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            sheet.save(tmp_path, format="PNG", optimize=True)
+            os.replace(tmp_path, path)
+            textures.append({
+                "image": image_name,
+                "format": "RGBA8888",
+                "size": {"w": width, "h": height},
+                "scale": 1,
+                "frames": sorted(frames, key=lambda f: f["filename"])
+            })
+        return textures
+
+    @staticmethod
+    def _summary(project_id: str, manifest: Dict[str, Any], rebuilt: bool) -> Dict[str, Any]:
+        return {
+            "project_id": project_id,
+            "rebuilt": rebuilt,
+            "manifest_url": f"/assets/{project_id}/assets/atlas/{ATLAS_MANIFEST}",
+            "pages": [{"image": t["image"], "size": t["size"], "frames": len(t["frames"])} for t in manifest["textures"]],
+            "frames": sum(len(t["frames"]) for t in manifest["textures"]),
+            "skipped": manifest["meta"].get("skipped", [])
+        }
+
+    def current_manifest(self, project_id: str, sources: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """
+        已打包且与当前选定资源一致的图集清单；未打包或已过期时返回 None
+        """
+        atlas_dir = os.path.join(self._project_path(project_id), ATLAS_DIR)
+        if sources is None:
+            sources = self._sources(project_id)
+        try:
+            with open(os.path.join(atlas_dir, ATLAS_MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if (manifest.get("meta", {}).get("inputs") == self._fingerprint(sources) and all(
+                os.path.exists(os.path.join(atlas_dir, t["image"])) for t in manifest["textures"]
+            )):
+                return manifest
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def build(self, project_id: str, force: bool = False) -> Dict[str, Any]:
+        """
+        打包项目图集 (同步，耗时操作请在线程中调用)
+
+        Args:
+            force: 忽略增量判断，强制重新打包
+        """
+        project_path = self._project_path(project_id)
+        if not os.path.isdir(project_path):
+            raise FileNotFoundError(project_id)
+
+        atlas_dir = os.path.join(project_path, ATLAS_DIR)
+        manifest_path = os.path.join(atlas_dir, ATLAS_MANIFEST)
+        sources = self._sources(project_id)
+        fingerprint = self._fingerprint(sources)
+
+        if not force:
+            manifest = self.current_manifest(project_id, sources)
+            if manifest is not None:
+                self.up_to_date += 1
+                return self._summary(project_id, manifest, rebuilt=False)
+
+        started = time.perf_counter()
+        sprites, skipped = self._load_sprites(sources)
+        pages, too_large = self._paginate(sprites)
+
+        os.makedirs(atlas_dir, exist_ok=True)
+        textures = self._write_pages(atlas_dir, pages, fingerprint)
+        manifest = {
+            "textures": textures,
+            "meta": {
+                "app": "ai-engine atlas packer",
+                "version": ATLAS_FORMAT_VERSION,
+                "inputs": fingerprint,
+                "padding": self.padding,
+                "skipped": skipped + too_large
+            }
+        }
+        write_json_atomic(manifest_path, manifest)
+
+        # 删除上次打包的图集页
+        current = {t["image"] for t in textures}
+        for filename in os.listdir(atlas_dir):
+            if filename.startswith("atlas-") and filename.endswith(".png") and filename not in current:
+                try:
+                    os.remove(os.path.join(atlas_dir, filename))
+                except OSError:
+                    pass
+
+        self.builds += 1
+        self.last_build_seconds = time.perf_counter() - started
+        return self._summary(project_id, manifest, rebuilt=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "builds": self.builds,
+            "up_to_date": self.up_to_date,
+            "last_build_seconds": round(self.last_build_seconds, 3),
+            "hashed_files": len(self._hashes),
+            "max_size": self.max_size,
+            "padding": self.padding
+        }
+
+
+# 全局图集打包器
+atlas_packer = AtlasPacker(settings.PROJECTS_DIR, settings.ATLAS_MAX_SIZE, settings.ATLAS_PADDING)
@@ -0,0 +1,192 @@
+"""
+内容寻址资源存储
+
+变体与正式资源的文件内容按 sha256 存入 blob 目录，项目中的 temp/ 与 assets/ 路径都是指向 blob 的硬链接:
+- 相同内容 (不同 seed 输出相同、重复生成、选定后的正式资源) 只占一份磁盘空间
+- 选定变体只是新建一个硬链接，O(1)，不再复制文件
+- 引用计数即文件系统链接数: blob 自身占 1 个，其余是项目文件 (或生成结果缓存) 的引用
+- GC 清理链接数为 1 (项目中已无引用) 的 blob
+- 无法硬链接时 (跨文件系统等) 退回复制
+
+blob 与项目文件共用 inode，写入项目文件前必须先删除再新建，不能原地覆盖
+"""
+
+from typing import Optional, Dict, Any, Iterable
+import hashlib
+import os
+import shutil
+import uuid
+
+from app.services.config import settings
+
+
+# 参与去重的资源文件类型
+MEDIA_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".wav", ".mp3", ".ogg"}
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """按内容哈希存放资源文件，项目路径为其硬链接"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+        self.created = 0
+        self.deduped = 0
+        self.bytes_saved = 0
+        self.links = 0
+        self.copies = 0
+        self.gc_removed = 0
+        self.gc_bytes = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest)
+
+    def _link_into(self, blob: str, dst: str):
+        """dst 原子替换为指向 blob 的硬链接"""
+        tmp_path = f"{dst}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.link(blob, tmp_path)
+            os.replace(tmp_path, dst)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def ingest(self, path: str) -> Optional[str]:
+        """
+        把项目文件纳入 blob 存储
+
+        内容已存在时把 path 换成指向已有 blob 的硬链接 (释放重复的一份)，
+        否则为 path 建立 blob 链接。
+
+        Returns:
+            内容哈希；无法链接 (跨文件系统等) 时返回 None，文件保持原样
+        """
+        try:
+            digest = file_sha256(path)
+        except OSError:
+            return None
+        blob = self._path(digest)
+
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)
+                self.created += 1
+                return digest
+            except FileExistsError:
+                pass  # 并发纳入了相同内容，按已存在处理
+            except OSError:
+                return None
+
+        try:
+            blob_stat = os.stat(blob)
+            stat = os.stat(path)
+            if (stat.st_dev, stat.st_ino) == (blob_stat.st_dev, blob_stat.st_ino):
+                return digest
+            self._link_into(blob, path)
+        except OSError:
+            # blob 恰好被 GC 或无法链接: 文件内容不变，只是没有去重
+            return None
+        self.deduped += 1
+        self.bytes_saved += stat.st_size
+        return digest
+
+    def link(self, src: str, dst: str, digest: Optional[str] = None) -> Optional[str]:
+        """
+        让 dst 成为 src 内容的引用 (替代 shutil.copy2)
+
+        Args:
+            digest: 已知的内容哈希 (如变体元数据中的 blob)，可省去重新计算
+
+        Returns:
+            内容哈希；退回复制时返回 None
+        """
+        if not digest or not os.path.exists(self._path(digest)):
+            digest = self.ingest(src)
+        if digest:
+            try:
+                self._link_into(self._path(digest), dst)
+                self.links += 1
+                return digest
+            except OSError:
+                pass
+        # 先删除旧文件再复制，避免原地覆盖仍被其他路径共享的 inode
+        if os.path.exists(dst):
+            os.remove(dst)
+        shutil.copy2(src, dst)
+        self.copies += 1
+        return None
+
+    def ingest_tree(self, root: str, skip_dirs: Iterable[str] = ("animations",)) -> Dict[str, int]:
+        """
+        扫描目录，把其中的资源文件全部纳入 blob 存储 (用于已有项目的去重)
+
+        skip_dirs 中的目录 (如会被原地重写的动画输出) 不处理
+        """
+        before_saved, before_deduped = self.bytes_saved, self.deduped
+        files = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d not in skip_dirs]
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() not in MEDIA_EXTENSIONS:
+                    continue
+                if self.ingest(os.path.join(dirpath, filename)):
+                    files += 1
+        return {
+            "files": files,
+            "deduped": self.deduped - before_deduped,
+            "bytes_saved": self.bytes_saved - before_saved
+        }
+
+    def gc(self) -> Dict[str, int]:
+        """清理项目中已无引用 (链接数为 1) 的 blob"""
+        removed = freed = remaining = remaining_bytes = 0
+        if os.path.exists(self.root):
+            for shard in os.listdir(self.root):
+                shard_dir = os.path.join(self.root, shard)
+                if not os.path.isdir(shard_dir):
+                    continue
+                for name in os.listdir(shard_dir):
+                    path = os.path.join(shard_dir, name)
+                    try:
+                        stat = os.stat(path)
+                        if stat.st_nlink <= 1:
+                            os.remove(path)
+                            removed += 1
+                            freed += stat.st_size
+                        else:
+                            remaining += 1
+                            remaining_bytes += stat.st_size
+                    except OSError:
+                        pass
+        self.gc_removed += removed
+        self.gc_bytes += freed
+        return {"removed": removed, "freed_bytes": freed, "blobs": remaining, "bytes": remaining_bytes}
+
+    def stats(self) -> Dict[str, Any]:
+        """存储统计 (累计值，blob 总数与大小见 gc 返回)"""
+        return {
+            "root": self.root,
+            "created": self.created,
+            "deduped": self.deduped,
+            "bytes_saved": self.bytes_saved,
+            "links": self.links,
+            "copies": self.copies,
+            "gc_removed": self.gc_removed,
+            "gc_freed_bytes": self.gc_bytes
+        }
+
+
+# 全局资源存储
+blob_store = BlobStore(settings.BLOB_STORE_DIR)
@@ -0,0 +1,118 @@
+"""
+生成脚本字节码缓存
+
+以脚本内容哈希 (含解释器 magic number) 为键，marshal 保存编译后的代码对象:
+- 后端在脚本保存并通过静态检查后写入
+- generator_worker 执行前按内容查找，命中则跳过解析与编译
+
+本模块只依赖标准库，worker 进程可直接导入
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import importlib.util
+import marshal
+import os
+import types
+import uuid
+
+
+class BytecodeCache:
+    """按内容寻址的字节码缓存"""
+
+    def __init__(self, cache_dir: str, max_entries: int = 2000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @staticmethod
+    def make_key(source: str) -> str:
+        """内容哈希；magic number 随 Python 版本变化，升级后旧缓存自然失效"""
+        digest = hashlib.sha256(importlib.util.MAGIC_NUMBER)
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.bin")
+
+    def load(self, source: str, filename: str) -> Optional[types.CodeType]:
+        """查找已编译的代码对象，未命中或文件损坏返回 None"""
+        try:
+            with open(self._path(self.make_key(source)), "rb") as f:
+                code = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        if not isinstance(code, types.CodeType):
+            self.misses += 1
+            return None
+        self.hits += 1
+        # 相同内容可能保存在不同路径，traceback 应指向当前文件
+        return _with_filename(code, filename)
+
+    def store(self, source: str, code: types.CodeType):
+        """写入缓存 (临时文件 + 原子替换，并发写入同一键互不干扰)"""
+        path = self._path(self.make_key(source))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                marshal.dump(code, f)
+            os.replace(tmp_path, path)
+            self.stores += 1
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def compile(self, source: str, filename: str) -> Tuple[types.CodeType, bool]:
+        """取缓存或编译并写入缓存，返回 (代码对象, 是否命中)"""
+        code = self.load(source, filename)
+        if code is not None:
+            return code, True
+        code = compile(source, filename, "exec", dont_inherit=True)
+        self.store(source, code)
+        return code, False
+
+    def prune(self):
+        """条目数超过上限时按修改时间淘汰最旧的一半"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries // 2]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dir": self.cache_dir,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "max_entries": self.max_entries
+        }
+
+
+def _with_filename(code: types.CodeType, filename: str) -> types.CodeType:
+    """递归替换代码对象 (含嵌套函数/类) 的 co_filename"""
+    if code.co_filename == filename:
+        return code
+    consts = tuple(
+        _with_filename(const, filename) if isinstance(const, types.CodeType) else const
+        for const in code.co_consts
+    )
+    return code.replace(co_filename=filename, co_consts=consts)
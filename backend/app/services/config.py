@@ -17,18 +17,86 @@ class Settings(BaseSettings):
     LLM_MODEL: str = "qwen2.5:14b"
     LLM_API_KEY: str = "ollama"
     
+    # LLM HTTP 连接池 (进程内共享长连接)
+    LLM_TIMEOUT: float = 300.0              # 单次请求读超时（秒）
+    LLM_CONNECT_TIMEOUT: float = 10.0       # 建连超时（秒）
+    LLM_POOL_MAX_CONNECTIONS: int = 20      # 最大连接数
+    LLM_POOL_MAX_KEEPALIVE: int = 10        # 最大保活空闲连接数
+    LLM_POOL_KEEPALIVE_EXPIRY: float = 60.0 # 空闲连接保活时间（秒）
+    LLM_HTTP2: bool = False                 # 启用 HTTP/2 (需安装 h2)
+    
+    # LLM 响应缓存 (按 模型+消息+采样参数 内容寻址)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/llm"))
+    LLM_CACHE_TTL: int = 7 * 24 * 3600      # 过期时间（秒），0 表示永不过期
+    LLM_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 缓存总大小上限
+    
+    # LLM 准入调度 (并发上限 / 排队上限 / 排队超时)
+    LLM_MAX_CONCURRENCY: int = 2            # 同时发往 LLM 的最大请求数
+    LLM_MAX_QUEUE: int = 16                 # 交互/普通请求的最大排队数，超出立即拒绝
+    LLM_QUEUE_TIMEOUT: float = 60.0         # 排队超时（秒），批量任务不受限
+    
+    # 生成进度事件 (经游戏控制 WebSocket 推送给编辑器)
+    LLM_STREAM_PROGRESS: bool = True        # 属于项目的 LLM 调用一律流式请求，以便上报 token 进度
+    EVENT_TOKENS_INTERVAL: float = 0.5      # token 进度事件的最小间隔（秒）
+    
     # 服务端口
     BACKEND_PORT: int = 8000
     FRONTEND_PORT: int = 3000
-    GAME_PREVIEW_PORT: int = 8080
     
     # 项目存储路径
     # 修改为相对于 workspace root 的路径，如果从 backend 目录运行，则是 ../projects
     PROJECTS_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../projects"))
+    # 内容寻址资源存储 (项目中的资源文件是其硬链接，需与 PROJECTS_DIR 在同一文件系统)
+    BLOB_STORE_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.blobs"))
     
     # 资源生成配置
     DEFAULT_IMAGE_SIZE: int = 64
     DEFAULT_AUDIO_SAMPLE_RATE: int = 44100
+    BATCH_GENERATION_CONCURRENCY: int = 4   # 批量生成脚本的默认并发度
+    
+    # 生成脚本执行池 (预热 worker 进程，0 表示每次直接起新进程)
+    GENERATOR_POOL_SIZE: int = 4
+    GENERATOR_WORKER_MAX_JOBS: int = 200    # 单个 worker 执行多少个任务后替换
+    GENERATOR_MEMORY_LIMIT_MB: int = 2048   # 单个脚本的地址空间上限，0 表示不限制
+    GENERATOR_MAX_OUTPUT: int = 1024 * 1024 # stdout / stderr 各自保留的最大字节数
+    GENERATOR_SEED_PARALLELISM: int = 4     # 多 seed 模式下同时运行的 seed 数，1 为串行
+    VARIANT_PARALLELISM: int = 4            # 变体风格化进程池大小
+    
+    # 生成脚本静态检查与字节码缓存 (按脚本内容哈希)
+    SCRIPT_VALIDATION_ENABLED: bool = True
+    SCRIPT_BYTECODE_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/bytecode"))
+    SCRIPT_BYTECODE_MAX_ENTRIES: int = 2000
+    
+    # 生成结果缓存 (脚本内容 + seed + 尺寸 + 格式相同时直接链接上次的输出)
+    RENDER_CACHE_ENABLED: bool = True
+    RENDER_CACHE_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.cache/renders"))
+    RENDER_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    
+    # 精灵图集打包 (角色 / 道具 / 动画帧合并为 2 的幂尺寸的图集)
+    ATLAS_MAX_SIZE: int = 2048              # 单张图集的最大边长
+    ATLAS_PADDING: int = 2                  # 帧之间的间距（像素）
+    
+    # 游戏预览热重载 (监听 game/ 与 assets/，通过 WebSocket 推送变化)
+    PREVIEW_HOT_RELOAD: bool = True
+    PREVIEW_WATCH_DEBOUNCE_MS: int = 100    # 去抖时间（毫秒），连续写入合并为一次推送
+    
+    # WebSocket 推送 (每个连接独立的有界发送队列)
+    WS_SEND_QUEUE_SIZE: int = 256           # 单个连接最多积压的消息数，超出丢弃最旧的
+    WS_SEND_TIMEOUT: float = 10.0           # 单条消息发送超时（秒），超时视为断开
+    
+    # 事件循环延迟监控
+    LOOP_LAG_INTERVAL: float = 0.5          # 采样间隔（秒）
+    LOOP_LAG_STALL_THRESHOLD: float = 0.1   # 超过该延迟（秒）记为一次阻塞
+    
+    # 数据库 (后台任务等持久化数据)
+    DATABASE_URL: str = "sqlite+aiosqlite:///" + os.path.abspath(
+        os.path.join(os.path.dirname(__file__), "../../data/ai_engine.db")
+    )
+    
+    # 后台任务
+    JOB_WORKERS: int = 4                    # 同时执行的后台任务数
+    JOB_FLUSH_INTERVAL: float = 1.0         # 任务进度落盘间隔（秒）
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,45 @@
+"""
+数据库
+
+基于 SQLAlchemy (异步) + aiosqlite 的本地 SQLite 存储
+- 后台任务表
+"""
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import DeclarativeBase
+import os
+
+from app.services.config import settings
+
+
+class Base(DeclarativeBase):
+    """ORM 模型基类"""
+
+
+def _ensure_sqlite_dir(url: str):
+    """SQLite 文件所在目录不存在时自动创建"""
+    prefix = "sqlite+aiosqlite:///"
+    if url.startswith(prefix):
+        db_path = url[len(prefix):]
+        if db_path and db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+
+_ensure_sqlite_dir(settings.DATABASE_URL)
+
+engine = create_async_engine(settings.DATABASE_URL)
+async_session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+async def init_db():
+    """创建数据表"""
+    # 导入模型以注册到 Base.metadata
+    from app import models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_db():
+    """释放数据库连接"""
+    await engine.dispose()
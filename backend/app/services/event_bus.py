@@ -0,0 +1,92 @@
+"""
+生成进度事件总线
+
+生成流程 (LLM 调用、脚本保存、变体渲染、风格化、后台任务) 在关键节点发布事件，
+订阅者 (游戏控制 WebSocket) 按项目推送给编辑器，界面不必等整个请求结束才有反馈:
+- llm_queued / llm_started / llm_tokens / llm_done: LLM 排队、开始、已生成的 token 数、结束
+- script_saved: 生成脚本已保存
+- variant_rendered: 单个变体渲染完成 (带变体元数据，界面可立即显示)
+- stylize_done: 风格化变体一批完成
+- animation_rendered: 角色序列帧生成完成
+- job_status / job_item: 后台任务状态与逐条进度
+- error: 某个阶段失败
+
+发布是同步且不阻塞的: 订阅者只做入队，慢客户端不会拖慢生成流程。
+当前操作的上下文 (任务 ID、条目 ID 等) 通过 contextvars 传递，嵌套调用发布的事件自动带上
+"""
+
+from typing import Dict, Any, Optional, Callable, List
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+
+
+# 事件类型
+EVENT_LLM_QUEUED = "llm_queued"
+EVENT_LLM_STARTED = "llm_started"
+EVENT_LLM_TOKENS = "llm_tokens"
+EVENT_LLM_DONE = "llm_done"
+EVENT_SCRIPT_SAVED = "script_saved"
+EVENT_VARIANT_RENDERED = "variant_rendered"
+EVENT_STYLIZE_DONE = "stylize_done"
+EVENT_ANIMATION_RENDERED = "animation_rendered"
+EVENT_JOB_STATUS = "job_status"
+EVENT_JOB_ITEM = "job_item"
+EVENT_ERROR = "error"
+
+# 订阅者: (事件, 合并键) -> None，须立即返回
+Subscriber = Callable[[Dict[str, Any], Optional[str]], None]
+
+_context: ContextVar[Dict[str, Any]] = ContextVar("event_context", default={})
+
+
+class EventBus:
+    """进程内发布 / 订阅"""
+
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self.published = 0
+        self.by_type: Dict[str, int] = {}
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """注册订阅者，返回取消订阅的函数"""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+    @contextmanager
+    def context(self, **fields):
+        """在当前协程 (及其创建的子任务) 中发布的事件附加这些字段"""
+        token = _context.set({**_context.get(), **fields})
+        try:
+            yield
+        finally:
+            _context.reset(token)
+
+    def publish(self, project_id: Optional[str], event_type: str, coalesce_key: Optional[str] = None, **data):
+        """
+        发布事件 (须在事件循环线程中调用，没有项目归属的事件忽略)
+
+        Args:
+            coalesce_key: 合并键，同键事件在客户端取走前只保留最新一条 (如 token 进度)
+        """
+        if not project_id:
+            return
+        event = {"type": event_type, "project_id": project_id, **_context.get(), **data, "ts": time.time()}
+        self.published += 1
+        self.by_type[event_type] = self.by_type.get(event_type, 0) + 1
+        for callback in list(self._subscribers):
+            try:
+                callback(event, coalesce_key)
+            except Exception as e:
+                print(f"事件订阅者处理失败: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "by_type": dict(self.by_type)
+        }
+
+
+# 全局事件总线
+event_bus = EventBus()
@@ -0,0 +1,31 @@
+"""
+文件读写工具
+
+- write_json_atomic: 先写临时文件再 os.replace，读者不会看到写了一半的 JSON
+- write_text_atomic: 同上，用于脚本等文本文件
+"""
+
+from typing import Any
+import json
+import os
+import uuid
+
+
+def write_json_atomic(path: str, data: Any, indent: int = 2):
+    """原子写入 JSON 文件 (同目录临时文件 + os.replace)"""
+    write_text_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+def write_text_atomic(path: str, content: str):
+    """原子写入文本文件 (同目录临时文件 + os.replace)"""
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,416 @@
+"""
+生成脚本执行池
+
+常驻的预热 worker 进程 (见 generator_worker.py) 执行 AI 生成的资源脚本
+- worker 启动时已导入 PIL / numpy / scipy，省去每次执行的解释器启动与导入开销
+- 每个任务在 worker fork 出的独立子进程中运行，隔离性与直接起新进程一致
+- 多 seed 模式 (run_seeds): 脚本只编译一次，各 seed 串行或并行 fork 执行，逐个报告结果
+- 编译结果按内容哈希缓存 (bytecode_dir)，重复执行同一脚本时跳过编译
+- 单任务超时与内存上限，超时整组杀掉
+- worker 执行 N 个任务后或异常退出后自动替换
+- 不支持 fork 的平台 (Windows) 或 GENERATOR_POOL_SIZE=0 时退回为经 process_runner 直接起子进程
+
+接口与 subprocess.run 保持一致: 返回 CompletedProcess，超时抛出 TimeoutExpired
+"""
+
+from typing import Dict, Any, List, Optional, Union
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import psutil
+
+from app.services.config import settings
+from app.services.process_runner import process_runner
+
+
+# 单次运行结果: 正常结束为 CompletedProcess，超时为 TimeoutExpired
+RunResult = Union[subprocess.CompletedProcess, subprocess.TimeoutExpired]
+
+# worker 以 `python -m app.services.generator_worker` 启动，需要 backend 目录作为工作目录
+BACKEND_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+
+# 生成脚本可直接 import 的辅助库目录 (ai_engine_gen)
+GEN_LIB_DIR = os.path.join(BACKEND_ROOT, "gen_lib")
+
+# worker 启动 (预热导入) 的最长等待时间
+WORKER_START_TIMEOUT = 60.0
+# worker 自身在任务超时之外额外允许的响应时间
+WORKER_GRACE = 10.0
+
+
+class _Worker:
+    """单个常驻 worker 进程"""
+
+    def __init__(self, proc: asyncio.subprocess.Process):
+        self.proc = proc
+        self.jobs = 0
+        self.started_at = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.returncode is None
+
+    def kill(self):
+        """杀掉 worker 及其正在执行的脚本子进程 (子进程各自 setsid，不在 worker 的进程组内，须逐个清理)"""
+        if not self.alive:
+            return
+        try:
+            children = psutil.Process(self.proc.pid).children(recursive=True)
+        except psutil.NoSuchProcess:
+            children = []
+        try:
+            if sys.platform != "win32":
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            else:
+                self.proc.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+        for child in children:
+            if sys.platform != "win32":
+                try:
+                    os.killpg(child.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+
+
+class GeneratorPool:
+    """预热 worker 进程池"""
+
+    def __init__(
+        self,
+        size: int,
+        max_jobs_per_worker: int,
+        memory_mb: int,
+        max_output: int,
+        bytecode_dir: Optional[str] = None
+    ):
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.memory_mb = memory_mb
+        self.max_output = max_output
+        self.bytecode_dir = bytecode_dir
+        self.enabled = size > 0 and hasattr(os, "fork")
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: set = set()
+        self._replacing: set = set()
+
+        self.jobs_total = 0
+        self.batches = 0
+        self.jobs_failed = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+        self.fallback_runs = 0
+        self.bytecode_hits = 0
+        self._busy = 0
+
+    # ============ 生命周期 ============
+
+    async def start(self):
+        """启动并预热全部 worker"""
+        if not self.enabled:
+            return
+        self._idle = asyncio.Queue()
+        results = await asyncio.gather(
+            *(self._spawn() for _ in range(self.size)), return_exceptions=True
+        )
+        for result in results:
+            # 启动失败的槽位留空，首次使用时再尝试
+            self._idle.put_nowait(result if isinstance(result, _Worker) else None)
+        ready = sum(1 for r in results if isinstance(r, _Worker))
+        print(f"✓ 生成脚本 worker 池已就绪 ({ready}/{self.size})")
+
+    async def stop(self):
+        for task in list(self._replacing):
+            task.cancel()
+        await asyncio.gather(*self._replacing, return_exceptions=True)
+        for worker in list(self._workers):
+            await self._retire(worker)
+        self._idle = None
+
+    @staticmethod
+    def _script_env() -> Dict[str, str]:
+        """生成脚本的运行环境"""
+        env = dict(os.environ)
+        # 脚本各自单线程计算，避免 BLAS 线程数随并发数成倍膨胀
+        env.setdefault("OMP_NUM_THREADS", "1")
+        env.setdefault("OPENBLAS_NUM_THREADS", "1")
+        env.setdefault("MKL_NUM_THREADS", "1")
+        paths = [GEN_LIB_DIR] + [p for p in env.get("PYTHONPATH", "").split(os.pathsep) if p]
+        env["PYTHONPATH"] = os.pathsep.join(paths)
+        return env
+
+    async def _spawn(self) -> _Worker:
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "app.services.generator_worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=BACKEND_ROOT,
+            env=self._script_env(),
+            start_new_session=True,
+            limit=4 * self.max_output + 65536
+        )
+        worker = _Worker(proc)
+        try:
+            line = await asyncio.wait_for(proc.stdout.readline(), WORKER_START_TIMEOUT)
+            if not line or not json.loads(line).get("ready"):
+                raise RuntimeError("生成 worker 启动失败")
+        except BaseException:
+            worker.kill()
+            await proc.wait()
+            raise
+        self._workers.add(worker)
+        return worker
+
+    async def _retire(self, worker: _Worker):
+        self._workers.discard(worker)
+        if worker.alive:
+            try:
+                worker.proc.stdin.close()
+                await asyncio.wait_for(worker.proc.wait(), 2)
+            except (asyncio.TimeoutError, OSError):
+                worker.kill()
+        await worker.proc.wait()
+
+    async def _replace(self, worker: Optional[_Worker]):
+        """后台替换 worker，完成后放回空闲队列"""
+        idle = self._idle
+        try:
+            if worker is not None:
+                await self._retire(worker)
+            new_worker = await self._spawn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"生成 worker 重启失败: {e}")
+            new_worker = None
+        if idle is not None:
+            idle.put_nowait(new_worker)
+
+    def _schedule_replace(self, worker: Optional[_Worker]):
+        task = asyncio.create_task(self._replace(worker))
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+
+    # ============ 执行 ============
+
+    async def run(
+        self,
+        script_path: str,
+        args: List[str],
+        cwd: Optional[str] = None,
+        timeout: float = 120
+    ) -> subprocess.CompletedProcess:
+        """
+        执行生成脚本，等价于 subprocess.run([python, script, *args], capture_output=True, text=True)
+
+        Raises:
+            subprocess.TimeoutExpired: 执行超时
+        """
+        result = (await self._execute(script_path, [args], cwd, timeout, 1))[0]
+        if isinstance(result, subprocess.TimeoutExpired):
+            raise result
+        return result
+
+    async def run_seeds(
+        self,
+        script_path: str,
+        seed_args: Dict[int, List[str]],
+        cwd: Optional[str] = None,
+        timeout: float = 120,
+        parallel: int = 1
+    ) -> Dict[int, RunResult]:
+        """
+        多 seed 模式: 脚本只加载编译一次，为每个 seed 各运行一次
+
+        Args:
+            seed_args: seed -> 该次运行的命令行参数 (通常含 --output / --seed)
+            timeout: 单个 seed 的超时
+            parallel: 同时运行的 seed 数，1 为串行
+
+        Returns:
+            seed -> CompletedProcess，超时的 seed 对应 TimeoutExpired 实例
+        """
+        seeds = list(seed_args)
+        results = await self._execute(
+            script_path, [seed_args[seed] for seed in seeds], cwd, timeout, parallel
+        )
+        return dict(zip(seeds, results))
+
+    async def _execute(
+        self,
+        script_path: str,
+        arg_lists: List[List[str]],
+        cwd: Optional[str],
+        timeout: float,
+        parallel: int
+    ) -> List[RunResult]:
+        cmds = [[sys.executable, script_path, *args] for args in arg_lists]
+        cwd = cwd or os.getcwd()
+        parallel = max(1, parallel)
+        self.jobs_total += len(cmds)
+        self.batches += 1
+        self._busy += len(cmds)
+        try:
+            if not self.enabled or self._idle is None:
+                results = await self._run_fallback(cmds, cwd, timeout, parallel)
+            else:
+                results = await self._run_pooled(cmds, script_path, arg_lists, cwd, timeout, parallel)
+        finally:
+            self._busy -= len(cmds)
+
+        for result in results:
+            if isinstance(result, subprocess.TimeoutExpired):
+                self.timeouts += 1
+            elif result.returncode != 0:
+                self.jobs_failed += 1
+        return results
+
+    async def _run_pooled(
+        self,
+        cmds: List[List[str]],
+        script_path: str,
+        arg_lists: List[List[str]],
+        cwd: str,
+        timeout: float,
+        parallel: int
+    ) -> List[RunResult]:
+        idle = self._idle
+        worker = await idle.get()
+        if worker is None or not worker.alive:
+            self._workers.discard(worker)
+            try:
+                worker = await self._spawn()
+            except Exception:
+                # 无法启动 worker 时本次退回直接执行，槽位留待下次重试
+                idle.put_nowait(None)
+                return await self._run_fallback(cmds, cwd, timeout, parallel)
+            except BaseException:
+                # 启动过程中被取消: 归还槽位，否则池永久少一个 worker
+                idle.put_nowait(None)
+                raise
+
+        request = {
+            "script": os.path.abspath(script_path),
+            "runs": [{"args": [str(a) for a in args]} for args in arg_lists],
+            "cwd": cwd,
+            "timeout": timeout,
+            "parallel": parallel,
+            "memory_mb": self.memory_mb,
+            "max_output": self.max_output,
+            "bytecode_dir": self.bytecode_dir
+        }
+        rounds = -(-len(cmds) // parallel)
+        try:
+            worker.proc.stdin.write((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            await worker.proc.stdin.drain()
+            line = await asyncio.wait_for(
+                worker.proc.stdout.readline(), rounds * timeout + WORKER_GRACE
+            )
+        except BaseException as e:
+            # 调用方取消或 worker 无响应: worker 状态未知，整组杀掉后替换
+            worker.kill()
+            self._schedule_replace(worker)
+            if isinstance(e, asyncio.TimeoutError):
+                return [subprocess.TimeoutExpired(cmd, timeout) for cmd in cmds]
+            if isinstance(e, (BrokenPipeError, ConnectionResetError)):
+                self.crashes += 1
+                return [subprocess.CompletedProcess(cmd, -1, "", "生成 worker 异常退出") for cmd in cmds]
+            raise
+
+        response = json.loads(line) if line else {"error": "生成 worker 异常退出"}
+        if "error" in response:
+            self.crashes += 1
+            self._schedule_replace(worker)
+            return [subprocess.CompletedProcess(cmd, -1, "", response["error"]) for cmd in cmds]
+
+        worker.jobs += len(cmds)
+        if response.get("cached"):
+            self.bytecode_hits += 1
+        if worker.jobs >= self.max_jobs_per_worker:
+            self.recycled += 1
+            self._schedule_replace(worker)
+        else:
+            idle.put_nowait(worker)
+
+        results = []
+        for cmd, item in zip(cmds, response["results"]):
+            if item.get("timed_out"):
+                results.append(subprocess.TimeoutExpired(
+                    cmd, timeout, output=item.get("stdout"), stderr=item.get("stderr")
+                ))
+            else:
+                results.append(subprocess.CompletedProcess(
+                    cmd, item["returncode"], item.get("stdout", ""), item.get("stderr", "")
+                ))
+        return results
+
+    async def _run_fallback(
+        self,
+        cmds: List[List[str]],
+        cwd: str,
+        timeout: float,
+        parallel: int
+    ) -> List[RunResult]:
+        """退回路径: 每次运行都起新解释器"""
+        semaphore = asyncio.Semaphore(parallel)
+
+        async def run_one(cmd):
+            async with semaphore:
+                try:
+                    return await self._run_subprocess(cmd, cwd, timeout)
+                except subprocess.TimeoutExpired as e:
+                    return e
+
+        return list(await asyncio.gather(*(run_one(cmd) for cmd in cmds)))
+
+    async def _run_subprocess(
+        self,
+        cmd: List[str],
+        cwd: str,
+        timeout: float
+    ) -> subprocess.CompletedProcess:
+        self.fallback_runs += 1
+        return await process_runner.run(
+            cmd, cwd=cwd, timeout=timeout, env=self._script_env(), max_output=self.max_output
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """执行池统计"""
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "workers_alive": sum(1 for w in self._workers if w.alive),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "busy": self._busy,
+            "jobs_total": self.jobs_total,
+            "batches": self.batches,
+            "jobs_failed": self.jobs_failed,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "recycled": self.recycled,
+            "fallback_runs": self.fallback_runs,
+            "bytecode_hits": self.bytecode_hits,
+            "max_jobs_per_worker": self.max_jobs_per_worker,
+            "memory_limit_mb": self.memory_mb
+        }
+
+
+# 全局生成脚本执行池
+generator_pool = GeneratorPool(
+    size=settings.GENERATOR_POOL_SIZE,
+    max_jobs_per_worker=settings.GENERATOR_WORKER_MAX_JOBS,
+    memory_mb=settings.GENERATOR_MEMORY_LIMIT_MB,
+    max_output=settings.GENERATOR_MAX_OUTPUT,
+    bytecode_dir=settings.SCRIPT_BYTECODE_DIR
+)
@@ -0,0 +1,245 @@
+"""
+生成脚本常驻 worker 进程
+
+由 generator_pool 以 `python -m app.services.generator_worker` 启动:
+- 启动时预先导入 PIL / numpy / scipy，之后每个任务无需再付解释器启动与导入开销
+- 脚本只读取、编译一次，每次运行 (如每个 seed) fork 一个子进程执行 __main__，
+  隔离性与独立进程相同；多次运行可串行或并行 fork
+- 编译结果按内容哈希存入字节码缓存 (保存脚本时已由 script_validator 写入)，命中则跳过编译
+- 子进程独立进程组，超时后整组 SIGKILL；可选 RLIMIT_AS 内存上限
+
+协议: stdin/stdout 每行一个 JSON
+    请求: {"script": ..., "runs": [{"args": [...]}, ...], "cwd": ..., "timeout": 单次运行秒数,
+           "parallel": 同时运行数, "memory_mb": N, "max_output": 字节, "bytecode_dir": 缓存目录}
+    响应: {"results": [{"returncode": N, "stdout": ..., "stderr": ..., "timed_out": bool, "duration": 秒}, ...],
+           "cached": 是否命中字节码缓存}
+仅支持提供 os.fork 的平台 (Linux / macOS)
+"""
+
+import json
+import os
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+from app.services.bytecode_cache import BytecodeCache
+
+
+# 预热导入: fork 出的子进程直接继承已加载的模块
+WARM_MODULES = [
+    "argparse", "random", "math", "colorsys", "wave", "struct",
+    "numpy", "PIL.Image", "PIL.ImageDraw", "PIL.ImageFilter", "PIL.ImageEnhance",
+    "scipy.io.wavfile", "scipy.signal", "scipy.ndimage",
+    "ai_engine_gen",
+]
+
+
+_caches = {}
+
+
+def _compile(script: str, bytecode_dir: str):
+    """读取并编译脚本，返回 (代码对象, 是否命中缓存)"""
+    with open(script, "r", encoding="utf-8") as f:
+        source = f.read()
+    if not bytecode_dir:
+        return compile(source, script, "exec", dont_inherit=True), False
+    cache = _caches.get(bytecode_dir)
+    if cache is None:
+        cache = _caches[bytecode_dir] = BytecodeCache(bytecode_dir)
+    return cache.compile(source, script)
+
+
+def _warm_up():
+    import importlib
+    loaded = []
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            pass
+    return loaded
+
+
+def _read_capped(path: str, limit: int) -> str:
+    with open(path, "rb") as f:
+        data = f.read(limit + 1)
+    text = data[:limit].decode("utf-8", errors="replace")
+    if len(data) > limit:
+        text += "\n...[输出已截断]"
+    return text
+
+
+def _run_child(compiled, request: dict, args: list, stdout_path: str, stderr_path: str, protocol_fds: list):
+    """在 fork 出的子进程中执行已编译的脚本，永不返回"""
+    code = 1
+    try:
+        os.setsid()
+        # fork 继承 worker 的随机数状态: numpy 不会在 fork 后自动重新播种，
+        # 不重新播种时未显式设置种子的脚本每次运行得到相同的随机序列
+        import random
+        random.seed()
+        if "numpy" in sys.modules:
+            sys.modules["numpy"].random.seed()
+        for fd in protocol_fds:
+            os.close(fd)
+
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        out_fd = os.open(stdout_path, os.O_WRONLY | os.O_TRUNC)
+        err_fd = os.open(stderr_path, os.O_WRONLY | os.O_TRUNC)
+        os.dup2(out_fd, 1)
+        os.dup2(err_fd, 2)
+
+        memory_mb = request.get("memory_mb") or 0
+        if memory_mb > 0:
+            import resource
+            limit = memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        script = request["script"]
+        os.chdir(request.get("cwd") or os.path.dirname(script))
+        sys.argv = [script] + list(args)
+        sys.path.insert(0, os.path.dirname(script))
+
+        namespace = {"__name__": "__main__", "__file__": script, "__builtins__": __builtins__}
+        try:
+            exec(compiled, namespace)
+            code = 0
+        except SystemExit as e:
+            if e.code is None:
+                code = 0
+            elif isinstance(e.code, int):
+                code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(code)
+
+
+def _temp_paths():
+    with tempfile.NamedTemporaryFile(prefix="gen_out_", delete=False) as out, \
+            tempfile.NamedTemporaryFile(prefix="gen_err_", delete=False) as err:
+        return out.name, err.name
+
+
+def _collect(paths, returncode: int, timed_out: bool, started: float, max_output: int) -> dict:
+    stdout_path, stderr_path = paths
+    try:
+        return {
+            "returncode": returncode,
+            "stdout": _read_capped(stdout_path, max_output),
+            "stderr": _read_capped(stderr_path, max_output),
+            "timed_out": timed_out,
+            "duration": round(time.monotonic() - started, 4)
+        }
+    finally:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def handle(request: dict, protocol_fds: list) -> dict:
+    """编译一次脚本，按 parallel 并发 fork 执行全部 runs，逐个返回结果"""
+    runs = request.get("runs") or [{"args": request.get("args", [])}]
+    timeout = float(request.get("timeout") or 120)
+    parallel = max(1, int(request.get("parallel") or 1))
+    max_output = request.get("max_output") or 1024 * 1024
+
+    try:
+        compiled, cached = _compile(request["script"], request.get("bytecode_dir"))
+    except Exception:
+        # 语法错误等对所有运行都相同，无需 fork
+        error = traceback.format_exc()
+        return {"results": [
+            {"returncode": 1, "stdout": "", "stderr": error, "timed_out": False, "duration": 0}
+            for _ in runs
+        ]}
+
+    results = [None] * len(runs)
+    pending = list(enumerate(runs))
+    running = {}  # pid -> (序号, 开始时间, 输出文件)
+    delay = 0.001
+
+    try:
+        while pending or running:
+            while pending and len(running) < parallel:
+                index, run = pending.pop(0)
+                paths = _temp_paths()
+                pid = os.fork()
+                if pid == 0:
+                    _run_child(compiled, request, run.get("args", []), *paths, protocol_fds)
+                running[pid] = (index, time.monotonic(), paths)
+
+            finished = False
+            for pid, (index, started, paths) in list(running.items()):
+                waited, status = os.waitpid(pid, os.WNOHANG)
+                timed_out = False
+                if not waited:
+                    if time.monotonic() - started < timeout:
+                        continue
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    _, status = os.waitpid(pid, 0)
+                    timed_out = True
+                del running[pid]
+                finished = True
+                results[index] = _collect(
+                    paths, os.waitstatus_to_exitcode(status), timed_out, started, max_output
+                )
+
+            if finished:
+                delay = 0.001
+            else:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.02)
+    finally:
+        # worker 自身出错时不留下孤儿进程
+        for pid in running:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+
+    return {"results": results, "cached": cached}
+
+
+def main():
+    # 协议输出使用独立的文件描述符，进程内的 print 全部转到 stderr
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    protocol_in = sys.stdin
+    protocol_fds = [protocol_out.fileno(), protocol_in.fileno()]
+
+    loaded = _warm_up()
+    protocol_out.write(json.dumps({"ready": True, "pid": os.getpid(), "modules": loaded}) + "\n")
+
+    for line in protocol_in:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            response = handle(json.loads(line), protocol_fds)
+        except Exception as e:
+            response = {"error": f"worker 内部错误: {e}"}
+        protocol_out.write(json.dumps(response, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+共享 HTTP 客户端
+
+为 LLM 调用提供进程级长连接池
+- 在应用 lifespan 中创建与关闭
+- 可配置连接池上限、keep-alive 与 HTTP/2
+- 暴露连接池统计 (使用中 / 空闲 / 排队等待)
+"""
+
+from typing import Optional, Dict, Any
+import httpx
+
+from app.services.config import settings
+
+
+def _http2_available() -> bool:
+    """检查 h2 依赖是否已安装 (httpx 的 HTTP/2 支持是可选的)"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientManager:
+    """管理进程内唯一的 httpx.AsyncClient"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._http2 = False
+        self._requests_total = 0
+        self._peak_queued = 0
+
+    async def start(self) -> httpx.AsyncClient:
+        """创建共享客户端 (重复调用返回同一实例)"""
+        if self._client is not None and not self._client.is_closed:
+            return self._client
+
+        self._client = self._build_client(warn=True)
+        return self._client
+
+    async def close(self):
+        """关闭共享客户端并释放所有连接"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        获取共享客户端
+
+        正常情况下由 lifespan 创建；脚本或测试中未经过 lifespan 时惰性创建
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def _build_client(self, warn: bool = False) -> httpx.AsyncClient:
+        """按配置构建 AsyncClient"""
+        self._http2 = settings.LLM_HTTP2 and _http2_available()
+        if warn and settings.LLM_HTTP2 and not self._http2:
+            print("⚠ 未安装 h2，LLM 客户端回退到 HTTP/1.1")
+
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.LLM_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.LLM_POOL_KEEPALIVE_EXPIRY
+            ),
+            http2=self._http2,
+            event_hooks={"request": [self._on_request]}
+        )
+
+    async def _on_request(self, request: httpx.Request):
+        """请求钩子: 统计请求数与排队峰值"""
+        self._requests_total += 1
+        queued = self._pool_snapshot()["queued"]
+        if queued > self._peak_queued:
+            self._peak_queued = queued
+
+    def _pool_snapshot(self) -> Dict[str, int]:
+        """读取底层 httpcore 连接池的瞬时状态"""
+        snapshot = {"in_use": 0, "idle": 0, "queued": 0}
+        if self._client is None:
+            return snapshot
+
+        # httpx 未公开连接池对象，这里按 httpcore 1.x 的结构尽力读取
+        pool = getattr(self._client._transport, "_pool", None)
+        if pool is None:
+            return snapshot
+
+        for connection in getattr(pool, "connections", []):
+            if connection.is_idle():
+                snapshot["idle"] += 1
+            else:
+                snapshot["in_use"] += 1
+        snapshot["queued"] = sum(
+            1 for request in getattr(pool, "_requests", []) if request.is_queued()
+        )
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计"""
+        return {
+            "started": self._client is not None and not self._client.is_closed,
+            "http2": self._http2,
+            "max_connections": settings.LLM_POOL_MAX_CONNECTIONS,
+            "max_keepalive": settings.LLM_POOL_MAX_KEEPALIVE,
+            "requests_total": self._requests_total,
+            "peak_queued": self._peak_queued,
+            **self._pool_snapshot()
+        }
+
+
+# 全局 HTTP 客户端管理器
+http_client = HTTPClientManager()
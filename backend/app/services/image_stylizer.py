@@ -0,0 +1,238 @@
+"""
+图片变体风格化
+
+由脚本生成的基础图片派生风格化变体
+- 基础图片只解码一次，所有风格以 NumPy 数组运算一次算完 (共享灰度等中间结果)
+- 风格: vivid (鲜艳) / bright (明亮) / retro (复古) / palette (调色板量化) / outline (描边)
+- 多个输出并行编码
+- stylize_pool: 进程池，按条目分发到多个 CPU 核心，不阻塞事件循环；支持多条目批量
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+
+import numpy as np
+
+from app.services.config import settings
+
+
+# 变体序号 -> 风格 (变体 1 为脚本生成的原图)
+STYLE_BY_INDEX = {2: "vivid", 3: "bright", 4: "retro", 5: "palette", 6: "outline"}
+DEFAULT_STYLES = ["vivid", "bright", "retro"]
+STYLES = list(STYLE_BY_INDEX.values())
+
+# palette 风格每个通道保留的色阶数 (4^3 = 64 色)
+PALETTE_LEVELS = 4
+# outline 风格的描边颜色
+OUTLINE_COLOR = (24, 20, 28)
+
+
+def _luma(rgba: np.ndarray) -> np.ndarray:
+    """整数 ITU-R 601 灰度，与 PIL convert("L") 逐像素一致"""
+    gray = rgba[..., 0].astype(np.uint32) * 19595
+    gray += rgba[..., 1] * np.uint32(38470)
+    gray += rgba[..., 2] * np.uint32(7471)
+    gray += 0x8000
+    gray >>= 16
+    return gray.astype(np.float32)[..., None]
+
+
+def _blend(diff: np.ndarray, gray: np.ndarray, factor: float) -> np.ndarray:
+    """
+    等价于 ImageEnhance.Color(factor): gray + (rgb - gray) * factor，
+    与 PIL 一样截断取整，输出逐像素一致 (PNG 压缩率也不变)
+    """
+    out = diff * np.float32(factor)
+    out += gray
+    np.clip(out, 0, 255, out=out)
+    return out.astype(np.uint8)
+
+
+def _scale_lut(factor: float) -> np.ndarray:
+    """等价于 ImageEnhance.Brightness(factor) 的查找表"""
+    return np.clip(np.arange(256) * factor, 0, 255).astype(np.uint8)
+
+
+def _bright_lut(rgba: np.ndarray) -> np.ndarray:
+    """
+    Brightness(1.2) + Contrast(1.2) 都是逐通道映射 (对比度的均值可由直方图求得)，
+    合成为一张 256 项查找表
+    """
+    brightened = _scale_lut(1.2).astype(np.float64)
+    pixels = rgba.shape[0] * rgba.shape[1]
+    channel_means = [
+        float(np.bincount(rgba[..., c].ravel(), minlength=256) @ brightened) / pixels
+        for c in range(3)
+    ]
+    mean = int(channel_means[0] * 0.299 + channel_means[1] * 0.587 + channel_means[2] * 0.114 + 0.5)
+    return np.clip(mean + (brightened - mean) * 1.2, 0, 255).astype(np.uint8)
+
+
+def _palette_lut() -> np.ndarray:
+    step = 255.0 / (PALETTE_LEVELS - 1)
+    return (np.round(np.arange(256) / step) * step).astype(np.uint8)
+
+
+def _outline(rgba: np.ndarray) -> np.ndarray:
+    """在不透明区域外侧加 1 像素描边"""
+    out = rgba.copy()
+    opaque = rgba[..., 3] > 0
+    padded = np.pad(opaque, 1)
+    grown = padded[:-2, 1:-1] | padded[2:, 1:-1] | padded[1:-1, :-2] | padded[1:-1, 2:]
+    edge = grown & ~opaque
+    out[edge, :3] = OUTLINE_COLOR
+    out[edge, 3] = 255
+    return out
+
+
+def render_styles(rgba: np.ndarray, styles: List[str]) -> Dict[str, np.ndarray]:
+    """
+    对已解码的 RGBA 数组一次计算多个风格
+
+    Args:
+        rgba: (H, W, 4) uint8
+        styles: 风格名列表
+
+    Returns:
+        风格名 -> (H, W, 4) uint8
+    """
+    # vivid / retro 共享灰度与色差 (rgb - gray)，只计算一次
+    gray = diff = None
+    if {"vivid", "retro"} & set(styles):
+        gray = _luma(rgba)
+        diff = rgba[..., :3].astype(np.float32)
+        diff -= gray
+
+    results = {}
+    for style in styles:
+        if style == "outline":
+            results[style] = _outline(rgba)
+            continue
+
+        if style == "vivid":
+            merged = np.empty_like(rgba)
+            merged[..., :3] = _blend(diff, gray, 1.8)
+        elif style == "retro":
+            # Color(0.4) 后 Brightness(0.9)，亮度一步用查找表
+            merged = np.empty_like(rgba)
+            merged[..., :3] = np.take(_scale_lut(0.9), _blend(diff, gray, 0.4))
+        elif style in ("bright", "palette"):
+            lut = _bright_lut(rgba) if style == "bright" else _palette_lut()
+            merged = np.take(lut, rgba)
+        else:
+            raise ValueError(f"未知风格: {style}")
+        merged[..., 3] = rgba[..., 3]
+        results[style] = merged
+    return results
+
+
+def _encode(array: np.ndarray, output_path: str) -> Tuple[str, bool]:
+    from PIL import Image
+    try:
+        Image.fromarray(array, "RGBA").save(output_path)
+        return output_path, True
+    except Exception as e:
+        print(f"保存风格化图片失败: {e}")
+        return output_path, False
+
+
+def stylize_variants(input_path: str, outputs: Dict[str, str]) -> Dict[str, bool]:
+    """
+    解码一次基础图片，生成全部风格变体并并行编码
+
+    Args:
+        input_path: 基础图片
+        outputs: 风格名 -> 输出路径
+
+    Returns:
+        风格名 -> 是否成功
+    """
+    try:
+        from PIL import Image
+        with Image.open(input_path) as img:
+            rgba = np.asarray(img.convert("RGBA"))
+        rendered = render_styles(rgba, list(outputs))
+    except Exception as e:
+        print(f"风格化图片失败: {e}")
+        return {style: False for style in outputs}
+
+    # PIL 编码时释放 GIL，多个输出用线程并行编码 (单核机器上直接串行)
+    workers = min(len(rendered), os.cpu_count() or 1)
+    if workers <= 1:
+        return {style: _encode(rendered[style], outputs[style])[1] for style in rendered}
+    with ThreadPoolExecutor(max_workers=workers) as encoders:
+        return dict(encoders.map(
+            lambda style: (style, _encode(rendered[style], outputs[style])[1]), rendered
+        ))
+
+
+def stylize_batch(jobs: List[Tuple[str, Dict[str, str]]]) -> List[Dict[str, bool]]:
+    """多个条目依次风格化 (在同一个子进程内执行，省去逐条的进程间往返)"""
+    return [stylize_variants(input_path, outputs) for input_path, outputs in jobs]
+
+
+class StylizePool:
+    """风格化进程池 (首次使用时创建)"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        """创建进程池并等待子进程启动 (启动 forkserver 需要上百毫秒，在线程中调用)"""
+        with self._lock:
+            if self._executor is None:
+                # 后端进程内有事件循环和数据库线程，直接 fork 不安全，改用 forkserver / spawn
+                method = "forkserver" if sys.platform != "win32" else "spawn"
+                executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(method)
+                )
+                executor.submit(int).result()
+                self._executor = executor
+            return self._executor
+
+    async def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            return await asyncio.to_thread(self._start_executor)
+        return self._executor
+
+    async def stylize(self, input_path: str, outputs: Dict[str, str]) -> Dict[str, bool]:
+        """在进程池中为一张基础图片生成多个风格变体"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            await self._get_executor(), stylize_variants, input_path, outputs
+        )
+
+    async def stylize_many(self, jobs: List[Tuple[str, Dict[str, str]]]) -> List[Dict[str, bool]]:
+        """
+        批量风格化多个条目，按进程数切分后并行执行
+
+        Args:
+            jobs: [(基础图片, {风格名: 输出路径}), ...]
+        """
+        if not jobs:
+            return []
+        loop = asyncio.get_running_loop()
+        executor = await self._get_executor()
+        chunk_size = -(-len(jobs) // self.workers)
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, stylize_batch, chunk) for chunk in chunks)
+        )
+        return [item for chunk in results for item in chunk]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# 全局风格化进程池
+stylize_pool = StylizePool(workers=settings.VARIANT_PARALLELISM)
@@ -0,0 +1,357 @@
+"""
+后台任务管理
+
+长耗时生成流程以后台任务运行，接口立即返回任务 ID
+- 任务状态: pending / running / succeeded / failed / cancelled
+- 任务持久化到 SQLite，后端重启后未完成的任务自动恢复执行
+- 固定数量的 worker 协程消费任务队列
+- 按条目记录进度，单条失败不影响其他条目
+- 支持取消
+
+任务处理函数通过 @job_manager.handler("kind") 注册，只能依赖 job.params，
+这样重启后才能仅凭数据库记录重新执行
+"""
+
+from typing import Dict, Any, Optional, Callable, Awaitable
+from datetime import datetime
+import asyncio
+import uuid
+
+from sqlalchemy import select
+
+from app.services.config import settings
+from app.services.database import async_session
+from app.services.event_bus import event_bus, EVENT_JOB_STATUS, EVENT_JOB_ITEM, EVENT_ERROR
+from app.models.job import JobRecord
+
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = {JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED}
+
+JobHandler = Callable[["Job"], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class Job:
+    """单个后台任务"""
+
+    def __init__(
+        self,
+        kind: str,
+        project_id: str,
+        params: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None
+    ):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.project_id = project_id
+        self.params = params or {}
+        self.status = JOB_PENDING
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.created_at = datetime.now().isoformat()
+        self.updated_at = self.created_at
+        self.task: Optional[asyncio.Task] = None
+        self.cancel_requested = False
+        self.dirty = True
+
+    def set_item(self, item_id: str, status: str, **extra):
+        """更新单个条目的进度"""
+        item = self.items.setdefault(item_id, {"id": item_id})
+        item.update(status=status, **extra)
+        self.touch()
+        event_bus.publish(
+            self.project_id, EVENT_JOB_ITEM, coalesce_key=f"job_item:{self.id}:{item_id}",
+            job_id=self.id, kind=self.kind, item=dict(item), progress=self.progress()
+        )
+
+    def touch(self):
+        self.updated_at = datetime.now().isoformat()
+        self.dirty = True
+
+    def progress(self) -> Dict[str, int]:
+        counts = {"total": len(self.items), "done": 0, "failed": 0, "running": 0}
+        for item in self.items.values():
+            if item["status"] == "done":
+                counts["done"] += 1
+            elif item["status"] == "failed":
+                counts["failed"] += 1
+            elif item["status"] == "running":
+                counts["running"] += 1
+        return counts
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "project_id": self.project_id,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress(),
+            "items": list(self.items.values()),
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+    def to_record(self) -> JobRecord:
+        return JobRecord(
+            id=self.id,
+            kind=self.kind,
+            project_id=self.project_id,
+            status=self.status,
+            params=self.params,
+            items=self.items,
+            result=self.result,
+            error=self.error,
+            attempts=self.attempts,
+            created_at=self.created_at,
+            updated_at=self.updated_at
+        )
+
+    @classmethod
+    def from_record(cls, record: JobRecord) -> "Job":
+        job = cls(record.kind, record.project_id, record.params, job_id=record.id)
+        job.status = record.status
+        job.items = dict(record.items or {})
+        job.result = record.result
+        job.error = record.error
+        job.attempts = record.attempts or 0
+        job.created_at = record.created_at
+        job.updated_at = record.updated_at
+        job.dirty = False
+        return job
+
+
+class JobManager:
+    """持久化任务队列 + worker 池"""
+
+    def __init__(self, workers: int, flush_interval: float = 1.0, max_history: int = 200):
+        self._workers_count = workers
+        self._flush_interval = flush_interval
+        self._max_history = max_history
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    def handler(self, kind: str):
+        """注册任务处理函数的装饰器"""
+        def decorator(func: JobHandler) -> JobHandler:
+            self._handlers[kind] = func
+            return func
+        return decorator
+
+    # ============ 生命周期 ============
+
+    async def start(self):
+        """启动 worker 池，并恢复上次未完成的任务"""
+        self._queue = asyncio.Queue()
+
+        async with async_session() as session:
+            rows = await session.execute(
+                select(JobRecord)
+                .where(JobRecord.status.in_([JOB_PENDING, JOB_RUNNING]))
+                .order_by(JobRecord.created_at)
+            )
+            unfinished = [Job.from_record(record) for record in rows.scalars()]
+
+        for job in unfinished:
+            # 重启前正在执行的任务回到排队状态重新执行
+            job.status = JOB_PENDING
+            for item in job.items.values():
+                if item["status"] == "running":
+                    item["status"] = "pending"
+            job.touch()
+            self._jobs[job.id] = job
+            self._queue.put_nowait(job.id)
+
+        if unfinished:
+            print(f"✓ 恢复 {len(unfinished)} 个未完成的后台任务")
+
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self._workers_count)
+        ]
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """停止 worker 池; 正在执行的任务保持未完成状态，下次启动时恢复"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self._flush()
+
+    # ============ 任务操作 ============
+
+    async def submit(
+        self,
+        kind: str,
+        project_id: str,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Job:
+        """
+        提交后台任务
+
+        Args:
+            kind: 任务类型 (需已通过 handler 注册)
+            project_id: 所属项目
+            params: 任务参数 (须可 JSON 序列化)
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"未注册的任务类型: {kind}")
+
+        job = Job(kind, project_id, params)
+        self._jobs[job.id] = job
+        await self._save(job)
+        self._queue.put_nowait(job.id)
+        self._prune()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        """获取任务 (内存中没有时从数据库读取历史记录)"""
+        job = self._jobs.get(job_id)
+        if job:
+            return job
+        async with async_session() as session:
+            record = await session.get(JobRecord, job_id)
+            return Job.from_record(record) if record else None
+
+    async def list_jobs(self, project_id: Optional[str] = None, limit: int = 50) -> list:
+        """列出最近的任务"""
+        await self._flush()
+        query = select(JobRecord).order_by(JobRecord.created_at.desc()).limit(limit)
+        if project_id:
+            query = query.where(JobRecord.project_id == project_id)
+        async with async_session() as session:
+            rows = await session.execute(query)
+            return [self._jobs.get(r.id) or Job.from_record(r) for r in rows.scalars()]
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """取消任务，已结束的任务保持原状态"""
+        job = await self.get(job_id)
+        if not job or job.status in FINISHED_STATUSES:
+            return job
+
+        job.cancel_requested = True
+        if job.task and not job.task.done():
+            job.task.cancel()
+        else:
+            # 尚未开始执行，直接标记取消，worker 取到后会跳过
+            job.status = JOB_CANCELLED
+            job.touch()
+            await self._save(job)
+        return job
+
+    # ============ 内部实现 ============
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JOB_PENDING:
+                continue
+            job.task = asyncio.create_task(self._run(job))
+            try:
+                await asyncio.shield(job.task)
+            except asyncio.CancelledError:
+                # worker 自身被取消 (关闭服务)，同时中断当前任务
+                if not job.task.done():
+                    job.task.cancel()
+                    await asyncio.gather(job.task, return_exceptions=True)
+                raise
+
+    async def _run(self, job: Job):
+        handler = self._handlers.get(job.kind)
+        job.status = JOB_RUNNING
+        job.attempts += 1
+        job.touch()
+        await self._save(job)
+        self._publish_status(job)
+
+        try:
+            if handler is None:
+                raise ValueError(f"未注册的任务类型: {job.kind}")
+            # 处理过程中发布的生成事件都带上任务 ID
+            with event_bus.context(job_id=job.id):
+                job.result = await handler(job)
+            job.status = JOB_SUCCEEDED
+        except asyncio.CancelledError:
+            if job.cancel_requested:
+                job.status = JOB_CANCELLED
+                for item in job.items.values():
+                    if item["status"] in ("pending", "running"):
+                        item["status"] = "cancelled"
+            else:
+                # 服务关闭导致中断，保留为待执行，重启后恢复
+                job.status = JOB_PENDING
+        except Exception as e:
+            job.status = JOB_FAILED
+            job.error = str(e)
+            event_bus.publish(job.project_id, EVENT_ERROR, job_id=job.id, stage="job", detail=job.error)
+        finally:
+            job.touch()
+            await self._save(job)
+            self._publish_status(job)
+
+    @staticmethod
+    def _publish_status(job: Job):
+        event_bus.publish(
+            job.project_id, EVENT_JOB_STATUS, coalesce_key=f"job_status:{job.id}",
+            job_id=job.id, kind=job.kind, status=job.status, progress=job.progress(), error=job.error
+        )
+
+    async def _save(self, job: Job):
+        job.dirty = False
+        async with async_session() as session:
+            await session.merge(job.to_record())
+            await session.commit()
+
+    async def _flush(self):
+        for job in list(self._jobs.values()):
+            if job.dirty:
+                await self._save(job)
+
+    async def _flush_loop(self):
+        """定期持久化逐条进度"""
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self._flush()
+            except Exception as e:
+                print(f"保存任务进度失败: {e}")
+
+    def _prune(self):
+        """内存中只保留最近的已结束任务 (历史记录仍在数据库中)"""
+        overflow = len(self._jobs) - self._max_history
+        if overflow <= 0:
+            return
+        finished = [
+            j for j in self._jobs.values() if j.status in FINISHED_STATUSES and not j.dirty
+        ]
+        finished.sort(key=lambda j: j.updated_at)
+        for job in finished[:overflow]:
+            del self._jobs[job.id]
+
+
+# 全局任务管理器
+job_manager = JobManager(
+    workers=settings.JOB_WORKERS,
+    flush_interval=settings.JOB_FLUSH_INTERVAL
+)
@@ -0,0 +1,166 @@
+"""
+LLM 响应缓存
+
+基于内容寻址的磁盘缓存，避免重复点击生成时重复消耗 GPU
+- 缓存键: sha256(model, messages, temperature, max_tokens)
+- 支持 TTL 过期与按总大小的 LRU 淘汰
+- 统计命中 / 未命中 / 跳过 / 淘汰次数
+"""
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+import hashlib
+import json
+import os
+import time
+
+from app.services.config import settings
+
+
+class LLMResponseCache:
+    """LLM 响应磁盘缓存 (每个条目一个 JSON 文件)"""
+
+    def __init__(self, cache_dir: str, ttl: int, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # key -> 文件大小，按最近访问顺序排列 (最旧在前)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, messages: list, temperature: float, max_tokens: int) -> str:
+        """计算缓存键"""
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        """首次使用时扫描缓存目录，按文件 mtime 重建 LRU 顺序"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        entries = []
+        if os.path.exists(self.cache_dir):
+            for shard in os.listdir(self.cache_dir):
+                shard_dir = os.path.join(self.cache_dir, shard)
+                if not os.path.isdir(shard_dir):
+                    continue
+                for filename in os.listdir(shard_dir):
+                    if not filename.endswith(".json"):
+                        continue
+                    stat = os.stat(os.path.join(shard_dir, filename))
+                    entries.append((stat.st_mtime, filename[:-5], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _remove(self, key: str):
+        size = self._index.pop(key, 0)
+        self._total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，未命中或已过期返回 None"""
+        self._load_index()
+        if key not in self._index:
+            self.misses += 1
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        if self.ttl > 0 and time.time() - entry.get("created_at", 0) > self.ttl:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        # 刷新 LRU 位置，mtime 用于重启后恢复访问顺序
+        self._index.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return entry["content"]
+
+    def set(self, key: str, content: str, meta: Optional[Dict[str, Any]] = None):
+        """写入缓存并按总大小淘汰最久未使用的条目"""
+        self._load_index()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        entry = {"created_at": time.time(), "content": content, **(meta or {})}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        self._total_bytes -= self._index.pop(key, 0)
+        size = os.path.getsize(path)
+        self._index[key] = size
+        self._total_bytes += size
+
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            oldest = next(iter(self._index))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def record_bypass(self):
+        self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        self._load_index()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.LLM_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl
+        }
+
+
+# 全局 LLM 响应缓存
+llm_cache = LLMResponseCache(
+    cache_dir=settings.LLM_CACHE_DIR,
+    ttl=settings.LLM_CACHE_TTL,
+    max_bytes=settings.LLM_CACHE_MAX_BYTES
+)
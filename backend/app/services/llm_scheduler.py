@@ -0,0 +1,157 @@
+"""
+LLM 准入调度器
+
+在 _chat_completion 之前限制对本地 LLM 的并发访问
+- 可配置最大并发数
+- 优先级: 交互式 (文档编辑) > 普通 (单条资源) > 批量 (generate_from_spec)
+- 同一优先级内按项目轮转，避免单个项目占满队列
+- 队列已满立即拒绝，等待超时快速失败，而不是堆积到 300 秒读超时
+"""
+
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, Deque
+import asyncio
+import time
+
+from app.services.config import settings
+
+
+# 优先级 (数值越小越优先)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BATCH: "batch"
+}
+
+
+class LLMBusyError(Exception):
+    """LLM 队列已满或排队超时"""
+
+
+class LLMScheduler:
+    """异步准入调度器"""
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._in_flight = 0
+        # 优先级 -> {项目ID -> 等待者队列}，项目按轮转顺序排列
+        self._queues: Dict[int, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            priority: OrderedDict() for priority in PRIORITY_NAMES
+        }
+        self._queued: Dict[int, int] = {priority: 0 for priority in PRIORITY_NAMES}
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._wait_times: Deque[float] = deque(maxlen=512)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_NORMAL, project_id: Optional[str] = None):
+        """
+        占用一个 LLM 并发槽位
+
+        Raises:
+            LLMBusyError: 队列已满或排队超时 (批量任务只排队不超时)
+        """
+        started = time.monotonic()
+        await self._acquire(priority, project_id or "_global")
+        self._wait_times.append(time.monotonic() - started)
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: int, project_id: str):
+        # 无人排队且有空闲槽位时直接进入，避免插队
+        if self._in_flight < self.max_in_flight and sum(self._queued.values()) == 0:
+            self._in_flight += 1
+            return
+
+        if priority != PRIORITY_BATCH and self._queued_foreground() >= self.max_queue:
+            self.rejected += 1
+            raise LLMBusyError(f"LLM 队列已满 ({self.max_queue})，请稍后重试")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(project_id, deque()).append(waiter)
+        self._queued[priority] += 1
+
+        timeout = None if priority == PRIORITY_BATCH else self.queue_timeout
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 槽位已经移交，但调用方放弃了，直接归还
+                self._release()
+            else:
+                self._discard(priority, project_id, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise LLMBusyError(f"LLM 排队超过 {self.queue_timeout:.0f} 秒，请稍后重试")
+            raise
+
+    def _release(self):
+        """释放槽位: 优先移交给最高优先级中轮到的项目"""
+        for priority in sorted(self._queues):
+            projects = self._queues[priority]
+            while projects:
+                project_id, queue = next(iter(projects.items()))
+                waiter = queue.popleft()
+                self._queued[priority] -= 1
+                if queue:
+                    projects.move_to_end(project_id)
+                else:
+                    del projects[project_id]
+
+                if not waiter.done():
+                    waiter.set_result(None)
+                    return
+        self._in_flight -= 1
+
+    def _discard(self, priority: int, project_id: str, waiter: asyncio.Future):
+        queue = self._queues[priority].get(project_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued[priority] -= 1
+        if not queue:
+            del self._queues[priority][project_id]
+
+    def _queued_foreground(self) -> int:
+        return sum(count for priority, count in self._queued.items() if priority != PRIORITY_BATCH)
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度与等待时间统计"""
+        waits = sorted(self._wait_times)
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self._in_flight,
+            "queue_depth": {
+                PRIORITY_NAMES[priority]: count for priority, count in self._queued.items()
+            },
+            "queued_projects": sum(len(projects) for projects in self._queues.values()),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_seconds": {
+                "avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                "max": round(waits[-1], 3) if waits else 0.0
+            }
+        }
+
+
+# 全局 LLM 调度器
+llm_scheduler = LLMScheduler(
+    max_in_flight=settings.LLM_MAX_CONCURRENCY,
+    max_queue=settings.LLM_MAX_QUEUE,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT
+)
@@ -7,11 +7,32 @@ LLM 服务
 - 资源脚本生成
 """
 
-import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, AsyncIterator, Tuple
 import json
+import time
+import uuid
 
 from app.services.config import settings
+from app.services.http_client import http_client
+from app.services.llm_cache import llm_cache
+from app.services.llm_scheduler import (
+    llm_scheduler, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_NAMES
+)
+from app.services.event_bus import (
+    event_bus, EVENT_LLM_QUEUED, EVENT_LLM_STARTED, EVENT_LLM_TOKENS, EVENT_LLM_DONE, EVENT_ERROR
+)
+
+
+# 生成脚本可用的辅助库 (backend/gen_lib/ai_engine_gen.py) 说明，拼接进资源脚本提示词
+GEN_LIB_GUIDE = """【必须使用辅助库 ai_engine_gen】(已预装，`import ai_engine_gen as gen`)，禁止自己编写逐像素 for 循环 (pixels[x, y])：
+- `args = gen.parse_args()`: 解析 --output / --seed 并设定 random 与 numpy 的种子
+- `img, draw = gen.new_canvas(w, h)`: 透明 RGBA 画布；`gen.save(img, args.output)`: 保存 PNG
+- `gen.safe_rect / safe_ellipse(draw, (x0, y0, x1, y1), fill=, outline=)`，`gen.safe_line(draw, points, fill=, width=)`，`gen.safe_polygon(draw, points, fill=)`: 坐标顺序任意
+- `gen.add_noise(img, intensity=12)`: 不透明像素加明暗噪点；`gen.texture(img, scale=8, strength=0.25)`: 连续噪声纹理
+- `gen.linear_gradient(w, h, start, end, direction='vertical'|'horizontal'|'diagonal')`，`gen.radial_gradient(w, h, inner, outer)`: 返回渐变图，可 paste / alpha_composite
+- `gen.quantize(img, palette, dither_strength=0)`: 映射到调色板；`gen.dither(img, levels=4)`: 有序抖动；`gen.outline(img, color, thickness=1)`: 外描边
+- `gen.grid_offsets(fw, fh, cols, rows)`: 每帧左上角坐标；`gen.spritesheet(frames, cols)`: 拼接序列帧
+以上函数 (除渐变与 spritesheet 外) 均就地修改并返回 img。"""
 
 
 class LLMService:
@@ -26,27 +47,166 @@ class LLMService:
         self, 
         messages: list, 
         temperature: float = 0.7,
-        max_tokens: int = 8192  # 增加上限防止生成代码时被截断
+        max_tokens: int = 8192,  # 增加上限防止生成代码时被截断
+        bypass_cache: bool = False,
+        priority: int = PRIORITY_NORMAL,
+        project_id: Optional[str] = None
     ) -> str:
-        """调用 LLM Chat Completion API"""
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                    "stream": False
-                }
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+        """
+        调用 LLM Chat Completion API
+        
+        复用进程级共享连接池；相同请求优先命中缓存，未命中时经调度器排队占用并发槽位。
+        属于某个项目且开启 LLM_STREAM_PROGRESS 时改用流式请求，边生成边上报 token 进度
+        """
+        if project_id and settings.LLM_STREAM_PROGRESS:
+            parts = []
+            async for delta in self._chat_completion_stream(
+                messages, temperature, max_tokens, bypass_cache, priority, project_id
+            ):
+                parts.append(delta)
+            return "".join(parts)
+        
+        cache_key, cached = self._cache_lookup(messages, temperature, max_tokens, bypass_cache)
+        call_id = uuid.uuid4().hex[:8]
+        if cached is not None:
+            event_bus.publish(project_id, EVENT_LLM_DONE, call_id=call_id, cached=True, chars=len(cached))
+            return cached
+        
+        event_bus.publish(project_id, EVENT_LLM_QUEUED, call_id=call_id, priority=PRIORITY_NAMES[priority])
+        try:
+            async with llm_scheduler.slot(priority, project_id):
+                event_bus.publish(project_id, EVENT_LLM_STARTED, call_id=call_id)
+                response = await http_client.client.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self._headers(),
+                    json={
+                        "model": self.model,
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                        "stream": False
+                    }
+                )
+                response.raise_for_status()
+                result = response.json()
+        except Exception as e:
+            event_bus.publish(project_id, EVENT_ERROR, call_id=call_id, stage="llm", detail=str(e))
+            raise
+        content = result["choices"][0]["message"]["content"]
+        event_bus.publish(
+            project_id, EVENT_LLM_DONE, call_id=call_id, cached=False, chars=len(content),
+            tokens=(result.get("usage") or {}).get("completion_tokens")
+        )
+        
+        if cache_key:
+            llm_cache.set(cache_key, content, {"model": self.model})
+        return content
+    
+    async def _chat_completion_stream(
+        self,
+        messages: list,
+        temperature: float = 0.7,
+        max_tokens: int = 8192,
+        bypass_cache: bool = False,
+        priority: int = PRIORITY_NORMAL,
+        project_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        调用 LLM Chat Completion API (流式)
+        
+        解析 OpenAI 兼容的 SSE 响应 (data: {...} / data: [DONE])，逐段产出增量文本。
+        命中缓存时一次性产出完整内容；仅完整结束的流才写入缓存。
+        每个增量块按一个 token 计数，按 EVENT_TOKENS_INTERVAL 节流发布进度事件
+        """
+        cache_key, cached = self._cache_lookup(messages, temperature, max_tokens, bypass_cache)
+        call_id = uuid.uuid4().hex[:8]
+        if cached is not None:
+            event_bus.publish(project_id, EVENT_LLM_DONE, call_id=call_id, cached=True, chars=len(cached))
+            yield cached
+            return
+        
+        parts = []
+        chars = 0
+        event_bus.publish(project_id, EVENT_LLM_QUEUED, call_id=call_id, priority=PRIORITY_NAMES[priority])
+        try:
+            async with llm_scheduler.slot(priority, project_id):
+                event_bus.publish(project_id, EVENT_LLM_STARTED, call_id=call_id)
+                reported_at = time.monotonic()
+                async with http_client.client.stream(
+                    "POST",
+                    f"{self.base_url}/chat/completions",
+                    headers=self._headers(),
+                    json={
+                        "model": self.model,
+                        "messages": messages,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                        "stream": True
+                    }
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except json.JSONDecodeError:
+                            continue
+                        
+                        choices = chunk.get("choices") or []
+                        if not choices:
+                            continue
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if delta:
+                            parts.append(delta)
+                            chars += len(delta)
+                            now = time.monotonic()
+                            if now - reported_at >= settings.EVENT_TOKENS_INTERVAL:
+                                reported_at = now
+                                event_bus.publish(
+                                    project_id, EVENT_LLM_TOKENS, coalesce_key=f"llm_tokens:{call_id}",
+                                    call_id=call_id, tokens=len(parts), chars=chars
+                                )
+                            yield delta
+        except Exception as e:
+            event_bus.publish(project_id, EVENT_ERROR, call_id=call_id, stage="llm", detail=str(e))
+            raise
+        event_bus.publish(project_id, EVENT_LLM_DONE, call_id=call_id, cached=False, tokens=len(parts), chars=chars)
+            
+        if cache_key:
+            llm_cache.set(cache_key, "".join(parts), {"model": self.model})
+    
+    def _cache_lookup(
+        self,
+        messages: list,
+        temperature: float,
+        max_tokens: int,
+        bypass_cache: bool
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        查询响应缓存
+        
+        Returns:
+            (缓存键, 缓存内容)。缓存关闭时键为 None；未命中或跳过缓存时内容为 None
+        """
+        if not settings.LLM_CACHE_ENABLED:
+            return None, None
+        
+        cache_key = llm_cache.make_key(self.model, messages, temperature, max_tokens)
+        if bypass_cache:
+            llm_cache.record_bypass()
+            return cache_key, None
+        return cache_key, llm_cache.get(cache_key)
+    
+    def _headers(self) -> Dict[str, str]:
+        """请求头"""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
     
     async def generate_document(
         self,
@@ -54,7 +214,9 @@ class LLMService:
         project_intro: str,
         game_type: str,
         art_style: str,
-        doc_type: str
+        doc_type: str,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None
     ) -> str:
         """
         生成游戏设计文档
@@ -65,10 +227,53 @@ class LLMService:
             game_type: 游戏类型
             art_style: 美术风格
             doc_type: 文档类型
+            bypass_cache: 跳过响应缓存，强制重新生成
+            project_id: 所属项目 (用于调度器按项目轮转)
         
         Returns:
             Markdown 格式的设计文档
         """
+        messages = self._build_document_messages(
+            project_name, project_intro, game_type, art_style, doc_type
+        )
+        return await self._chat_completion(
+            messages, temperature=0.7, bypass_cache=bypass_cache,
+            priority=PRIORITY_INTERACTIVE, project_id=project_id
+        )
+    
+    async def generate_document_stream(
+        self,
+        project_name: str,
+        project_intro: str,
+        game_type: str,
+        art_style: str,
+        doc_type: str,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式生成游戏设计文档
+        
+        参数同 generate_document，逐段产出 Markdown 文本
+        """
+        messages = self._build_document_messages(
+            project_name, project_intro, game_type, art_style, doc_type
+        )
+        async for delta in self._chat_completion_stream(
+            messages, temperature=0.7, bypass_cache=bypass_cache,
+            priority=PRIORITY_INTERACTIVE, project_id=project_id
+        ):
+            yield delta
+    
+    def _build_document_messages(
+        self,
+        project_name: str,
+        project_intro: str,
+        game_type: str,
+        art_style: str,
+        doc_type: str
+    ) -> list:
+        """构建设计文档生成的对话消息"""
         # 文档类型对应的 Prompt 模板
         prompts = {
             "main": f"""你是一位专业的游戏策划，请根据以下信息创建一份完整的游戏设计文档。
@@ -210,15 +415,27 @@ class LLMService:
             {"role": "user", "content": prompt}
         ]
         
-        return await self._chat_completion(messages, temperature=0.7)
+        return messages
     
-    async def extract_spec(self, doc_content: str, doc_type: str) -> Dict[str, Any]:
+    async def extract_spec(
+        self,
+        doc_content: str,
+        doc_type: str,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None,
+        section_context: Optional[Dict[str, Any]] = None,
+        priority: int = PRIORITY_NORMAL
+    ) -> Dict[str, Any]:
         """
         从设计文档中提取 JSON 规格
         
         Args:
-            doc_content: Markdown 文档内容
+            doc_content: Markdown 文档内容 (按章节提取时为单个章节)
             doc_type: 文档类型
+            bypass_cache: 跳过响应缓存
+            project_id: 所属项目
+            section_context: 按章节提取时的上下文 {preamble: 文档开头, title: 章节标题路径, known_entities: 已有条目}
+            priority: 调度优先级 (后台任务使用 PRIORITY_BATCH)
         
         Returns:
             结构化 JSON 数据
@@ -300,10 +517,25 @@ class LLMService:
         
         schema = schemas.get(doc_type, "{}")
         
+        if section_context:
+            known = "\n".join(f"- {entity}" for entity in section_context.get("known_entities") or []) or "(无)"
+            source = f"""以下是游戏设计文档中的一个章节 ({section_context.get('title')})，只提取本章节中出现的条目；本章节没有相关内容时输出空列表。
+
+文档开头 (仅作背景参考，不要从中提取条目):
+{section_context.get('preamble') or '(无)'}
+
+文档中已有的条目 (id: 名称)，本章节涉及同一条目时必须沿用相同的 id:
+{known}
+
+章节内容:
+{doc_content}"""
+        else:
+            source = f"""设计文档:
+{doc_content}"""
+        
         prompt = f"""请从以下游戏设计文档中提取结构化数据，输出 JSON 格式。
 
-设计文档:
-{doc_content}
+{source}
 
 期望的 JSON 结构:
 {schema}
@@ -318,7 +550,10 @@ class LLMService:
             {"role": "user", "content": prompt}
         ]
         
-        result = await self._chat_completion(messages, temperature=0.2)
+        result = await self._chat_completion(
+            messages, temperature=0.2, bypass_cache=bypass_cache, project_id=project_id,
+            priority=priority
+        )
         
         # 尝试解析 JSON
         try:
@@ -337,7 +572,10 @@ class LLMService:
         resource_type: str,
         description: str,
         params: Dict[str, Any],
-        category: str
+        category: str,
+        bypass_cache: bool = False,
+        priority: int = PRIORITY_NORMAL,
+        project_id: Optional[str] = None
     ) -> str:
         """
         生成资源创建 Python 脚本
@@ -347,6 +585,9 @@ class LLMService:
             description: 自然语言描述
             params: 生成参数
             category: 类别 (image/audio)
+            bypass_cache: 跳过响应缓存 (对应 force_regenerate_script)
+            priority: 调度优先级 (批量生成使用 PRIORITY_BATCH)
+            project_id: 所属项目
         
         Returns:
             可执行的 Python 脚本代码
@@ -365,7 +606,7 @@ class LLMService:
 {json.dumps(params.get('elements', []), ensure_ascii=False, indent=2)}
 
 要求:
-1. **脚本接口**: 必须接受 --output 和 --seed (整数) 两个命令行参数。使用 `random.seed(args.seed)`。
+1. **脚本接口**: 必须接受 --output 和 --seed (整数) 两个命令行参数，使用 `args = gen.parse_args()` 解析 (同时设定 random 与 numpy 的种子)。
 2. **绘制核心 ( layout_map )**:
    - 这是一个“宏观布局图”。
    - **背景**: 根据 `background_color` ({params.get('background_color', '#000000')}) 填充底色。
@@ -379,6 +620,8 @@ class LLMService:
    - 确保所有坐标计算严谨。
 4. **输出**: 保存为 RGBA PNG。
 
+{GEN_LIB_GUIDE}
+
 代码质量: 包含完整的 import，添加详细中文注释。确保代码在 `if __name__ == '__main__': main()` 中执行。"""
         
         elif category == "image":
@@ -390,16 +633,18 @@ class LLMService:
 
 【核心生成要求】：
 1. **模块化设计**: 定义一个核心 `draw_base(draw, color_indices, offsets)` 函数。严禁为相似的部分重复编写绘图代码。
-2. **高效循环**: 使用循环来绘制重复的像素点或纹理，而非手动列举每一行代码。
+2. **复用辅助库**: 重复的纹理、噪点、渐变、描边使用 ai_engine_gen 的函数 (整块数组运算)，不要逐像素循环或手动列举每一行代码。
 4. **严格长度控制**: 整个脚本必须控制在 100 行以内。如果代码过长将导致生成失败。
 5. **填充率要求**: 主体物品必须【填满】画布。严禁在四周留下过大的空白。物品比例应占据至少 85% 的画布区域。
-6. **接口规范**: 必须接受 `--output` 和 `--seed` 参数。使用 `random.seed(args.seed)` 确保变体多样性。
+6. **接口规范**: 必须接受 `--output` 和 `--seed` 参数，使用 `args = gen.parse_args()` 解析，不同 seed 产生不同变体。
 7. **视觉逻辑**: 
    - 绘制基础剪影。
    - 绘制核心特征（如角色的眼睛、衣服，或场景的核心物件）。
    - 增加简单的明暗噪点以符合像素风格。
    - 背景必须透明 (RGBA)。
 
+{GEN_LIB_GUIDE}
+
 请只输出代码，不要解释。"""
 
         else:  # audio
@@ -412,7 +657,7 @@ class LLMService:
 - 采样率: {params.get('sample_rate', 44100)} Hz
 
 要求:
-1. 脚本需要接受 --output 命令行参数指定输出路径
+1. 脚本需要接受 --output (输出路径) 和 --seed (整数) 命令行参数，用 np.random.seed(args.seed) 让每个 seed 产生不同变体
 2. 使用 numpy 生成波形数据
 3. 使用 scipy.io.wavfile 保存为 WAV 格式
 4. 代码要完整可执行
@@ -434,7 +679,9 @@ from scipy.io import wavfile
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--output', required=True)
+    parser.add_argument('--seed', type=int, default=1)
     args = parser.parse_args()
+    np.random.seed(args.seed)
     
     sample_rate = {params.get('sample_rate', 44100)}
     duration = {params.get('duration', 2.0)}
@@ -457,7 +704,10 @@ if __name__ == '__main__':
             {"role": "user", "content": prompt}
         ]
         
-        result = await self._chat_completion(messages, temperature=0.1, max_tokens=8192)
+        result = await self._chat_completion(
+            messages, temperature=0.1, max_tokens=8192, bypass_cache=bypass_cache,
+            priority=priority, project_id=project_id
+        )
         
         # 清理可能的 Markdown 代码块
         if "```python" in result:
@@ -470,7 +720,9 @@ if __name__ == '__main__':
         self, 
         resource_id: str,
         description: str,
-        params: dict
+        params: dict,
+        bypass_cache: bool = False,
+        project_id: Optional[str] = None
     ) -> str:
         """
         生成角色动画序列帧脚本 (Spritesheet)
@@ -491,14 +743,19 @@ if __name__ == '__main__':
 4. **填充率关键要求**: 主体角色必须尽可能【填满】单帧画布。严禁在四周留下过大的空白。角色核心躯干高度应占据至少 85% 的画布高度。例如 64x64 画布，角色头顶应在 y=2 附近，脚部在 y=62 附近。
 5. **接口**: 接收 `--output` 参数。
 
-绘图建议：使用简单的几何图形组合来构建角色外观。"""
+{GEN_LIB_GUIDE}
+
+绘图建议：使用简单的几何图形组合来构建角色外观；帧坐标用 `gen.grid_offsets`。"""
 
         messages = [
             {"role": "system", "content": "你是一个严谨的游戏资源生成专家。你擅长使用 PIL 编写复杂的 2D 动画生成脚本。只输出代码，不要解释。"},
             {"role": "user", "content": prompt}
         ]
         
-        result = await self._chat_completion(messages, temperature=0.2, max_tokens=8192)
+        result = await self._chat_completion(
+            messages, temperature=0.2, max_tokens=8192, bypass_cache=bypass_cache,
+            project_id=project_id
+        )
         
         # 清理 Markdown 代码块
         if "```python" in result:
@@ -0,0 +1,71 @@
+"""
+事件循环延迟监控
+
+后台协程按固定间隔 sleep，实际唤醒时间与预期的差值即事件循环延迟。
+有同步阻塞调用 (如在 async def 中 subprocess.run) 时延迟会明显升高，
+通过 /api/metrics 暴露，便于发现回归
+"""
+
+from collections import deque
+from typing import Dict, Any, Optional, Deque
+import asyncio
+import time
+
+from app.services.config import settings
+
+
+class LoopLagMonitor:
+    """事件循环延迟采样"""
+
+    def __init__(self, interval: float, stall_threshold: float):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+
+        self._task: Optional[asyncio.Task] = None
+        self._samples: Deque[float] = deque(maxlen=600)
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.last_stall_at: Optional[float] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - expected)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.stall_threshold:
+                self.stalls += 1
+                self.last_stall_at = time.time()
+                print(f"⚠ 事件循环阻塞 {lag * 1000:.0f} ms")
+
+    def stats(self) -> Dict[str, Any]:
+        """延迟统计 (毫秒)"""
+        samples = sorted(self._samples)
+        return {
+            "interval_ms": round(self.interval * 1000),
+            "current_ms": round(self._samples[-1] * 1000, 2) if self._samples else 0.0,
+            "avg_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 2) if samples else 0.0,
+            "max_ms": round(self.max_lag * 1000, 2),
+            "stalls": self.stalls,
+            "stall_threshold_ms": round(self.stall_threshold * 1000),
+            "last_stall_at": self.last_stall_at
+        }
+
+
+# 全局事件循环监控
+loop_monitor = LoopLagMonitor(
+    interval=settings.LOOP_LAG_INTERVAL,
+    stall_threshold=settings.LOOP_LAG_STALL_THRESHOLD
+)
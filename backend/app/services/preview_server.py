@@ -0,0 +1,107 @@
+"""
+进程内游戏预览静态服务
+
+后端直接挂载 /preview/<项目ID>/，按项目分发到各自的 StaticFiles 实例，取代每个项目一个 npx serve 子进程:
+- 启动预览只是注册一个静态目录，立即可用，不占端口、不起进程
+- 预览根目录为项目的 game/；game/ 中没有的 assets/ 与 configs/ 回退到项目根目录
+  (选定资源、图集与资源清单就在那里，不必复制到 game/ 下)
+"""
+
+from typing import Dict, Any
+import os
+import posixpath
+import time
+
+from starlette.responses import PlainTextResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope, Receive, Send
+
+
+# game/ 中不存在时回退到项目根目录的子目录
+SHARED_DIRS = ("assets", "configs")
+
+
+class _ProjectPreview:
+    """单个项目的静态站点"""
+
+    def __init__(self, project_path: str, game_path: str):
+        self.project_path = project_path
+        self.game_path = game_path
+        self.game_files = StaticFiles(directory=game_path, html=True)
+        self.project_files = StaticFiles(directory=project_path)
+        self.started_at = time.time()
+        self.requests = 0
+
+    def pick(self, route_path: str) -> StaticFiles:
+        # 先规范化，assets/../ 之类的路径不能借回退访问项目根目录的其他文件
+        first = posixpath.normpath("/" + route_path).lstrip("/").split("/", 1)[0]
+        if first in SHARED_DIRS and not os.path.isdir(os.path.join(self.game_path, first)):
+            return self.project_files
+        return self.game_files
+
+
+class PreviewServer:
+    """按项目 ID 分发请求的 ASGI 应用"""
+
+    def __init__(self):
+        self._previews: Dict[str, _ProjectPreview] = {}
+        self.requests = 0
+
+    def start(self, project_id: str, project_path: str, game_path: str) -> float:
+        """注册项目的预览目录 (已注册时保持不变)，返回启动时间"""
+        preview = self._previews.get(project_id)
+        if preview is None or preview.game_path != game_path:
+            preview = _ProjectPreview(project_path, game_path)
+            self._previews[project_id] = preview
+        return preview.started_at
+
+    def start_time(self, project_id: str) -> float:
+        return self._previews[project_id].started_at
+
+    def stop(self, project_id: str) -> bool:
+        return self._previews.pop(project_id, None) is not None
+
+    def is_running(self, project_id: str) -> bool:
+        preview = self._previews.get(project_id)
+        # 目录被删除后视为已停止
+        if preview and not os.path.isdir(preview.game_path):
+            self.stop(project_id)
+            return False
+        return preview is not None
+
+    def running(self) -> list:
+        return [project_id for project_id in list(self._previews) if self.is_running(project_id)]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return
+
+        # 挂载点之后的路径: /<项目ID>/<文件路径>
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        relative = path[len(root_path):] if root_path and path.startswith(root_path) else path
+        project_id, _, rest = relative.lstrip("/").partition("/")
+
+        preview = self._previews.get(project_id)
+        if preview is None:
+            response = PlainTextResponse("预览未启动", status_code=404)
+            await response(scope, receive, send)
+            return
+
+        self.requests += 1
+        preview.requests += 1
+        app = preview.pick(rest)
+        child_scope = dict(scope)
+        child_scope["root_path"] = f"{root_path}/{project_id}"
+        await app(child_scope, receive, send)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._previews),
+            "requests": self.requests,
+            "projects": {project_id: preview.requests for project_id, preview in self._previews.items()}
+        }
+
+
+# 全局预览服务
+preview_server = PreviewServer()
@@ -0,0 +1,190 @@
+"""
+游戏预览热重载
+
+监听运行中预览项目的 game/、assets/、configs/ 目录 (watchfiles，Linux 下基于 inotify)，
+去抖后把变化归类为细粒度事件，通过 WebSocket 广播给预览页面:
+- texture_changed / audio_changed: 单个资源变化 (带资源清单中的 key 与新 URL)，预览只需重新拉取这一个文件
+- animation_changed: 角色动作序列帧变化
+- atlas_changed / manifest_changed: 图集或资源清单重新生成
+- code_changed: 游戏代码 / 页面变化，需要整页刷新
+"""
+
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+import asyncio
+import os
+
+from app.services.config import settings
+from app.services.resource_types import RESOURCE_TYPES
+
+
+CODE_EXTENSIONS = {".js", ".mjs", ".ts", ".html", ".css", ".json"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".ogg"}
+
+# 资源目录 -> 资源类型 (长路径优先，audio/bgm 先于其他)
+_FOLDER_TYPES = sorted(
+    ((config["folder"], resource_type) for resource_type, config in RESOURCE_TYPES.items()),
+    key=lambda item: -len(item[0])
+)
+
+
+def classify_change(project_path: str, path: str) -> Optional[Dict[str, Any]]:
+    """
+    把单个文件变化归类为预览事件，无关文件 (临时文件、脚本、元数据) 返回 None
+    """
+    rel = os.path.relpath(path, project_path).replace(os.sep, "/")
+    name = os.path.basename(rel)
+    ext = os.path.splitext(name)[1].lower()
+    if name.endswith(".tmp") or name.startswith("."):
+        return None
+
+    area, _, inner = rel.partition("/")
+    if area == "game":
+        if ext in CODE_EXTENSIONS:
+            return {"type": "code_changed", "path": rel}
+        area, _, inner = inner.partition("/")
+        if area != "assets":
+            return None
+
+    if area == "configs":
+        return {"type": "manifest_changed", "path": rel} if name == "asset_manifest.json" else None
+    if area != "assets":
+        return None
+
+    if inner.startswith("atlas/"):
+        return {"type": "atlas_changed", "path": rel} if name == "atlas.json" else None
+    if ext not in IMAGE_EXTENSIONS and ext not in AUDIO_EXTENSIONS:
+        return None
+
+    # 与资源清单一致的 key: <类型>/<ID> 或 anim/<角色ID>/<动作>
+    key = None
+    for folder, resource_type in _FOLDER_TYPES:
+        if not inner.startswith(folder + "/"):
+            continue
+        parts = inner[len(folder) + 1:].split("/")
+        if len(parts) == 2 and parts[1] == f"{parts[0]}{RESOURCE_TYPES[resource_type]['extension']}":
+            key = f"{resource_type}/{parts[0]}"
+        elif (resource_type == "character" and len(parts) == 3 and parts[1] == "animations"
+              and parts[2].startswith("anim_") and ext == ".png"):
+            return {
+                "type": "animation_changed",
+                "key": f"anim/{parts[0]}/{parts[2][5:-4]}",
+                "animation": f"character/{parts[0]}/{parts[2][5:-4]}",
+                "path": rel
+            }
+        break
+
+    event_type = "audio_changed" if ext in AUDIO_EXTENSIONS else "texture_changed"
+    return {"type": event_type, "key": key, "path": rel}
+
+
+class PreviewWatcher:
+    """按项目管理文件监听任务"""
+
+    def __init__(self, debounce_ms: int, enabled: bool = True):
+        self.debounce_ms = debounce_ms
+        self.enabled = enabled
+
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stops: Dict[str, asyncio.Event] = {}
+
+        self.batches = 0
+        self.events = 0
+
+    def _events(self, project_path: str, changes) -> List[Dict[str, Any]]:
+        """一批文件变化 -> 去重后的事件列表 (代码变化合并为一条)"""
+        events: Dict[Any, Dict[str, Any]] = {}
+        code_paths = []
+        for _, path in changes:
+            event = classify_change(project_path, path)
+            if event is None:
+                continue
+            if event["type"] == "code_changed":
+                code_paths.append(event["path"])
+                continue
+            if os.path.exists(path):
+                # 相对预览根目录的 URL (game/ 下的文件去掉前缀)，带上 mtime，浏览器不会用到旧缓存
+                url_path = event["path"][5:] if event["path"].startswith("game/") else event["path"]
+                event["url"] = f"{url_path}?v={os.stat(path).st_mtime_ns}"
+            events[(event["type"], event.get("key") or event["path"])] = event
+
+        result = list(events.values())
+        if code_paths:
+            result.append({"type": "code_changed", "paths": sorted(set(code_paths))})
+        return result
+
+    async def _run(
+        self,
+        project_id: str,
+        project_path: str,
+        stop_event: asyncio.Event,
+        on_events: Callable[[List[Dict[str, Any]]], Awaitable[None]]
+    ):
+        from watchfiles import awatch
+
+        paths = [os.path.join(project_path, d) for d in ("game", "assets", "configs")]
+        paths = [p for p in paths if os.path.isdir(p)]
+        try:
+            async for changes in awatch(
+                *paths, debounce=self.debounce_ms, step=min(50, self.debounce_ms),
+                stop_event=stop_event, recursive=True
+            ):
+                events = self._events(project_path, changes)
+                if not events:
+                    continue
+                self.batches += 1
+                self.events += len(events)
+                try:
+                    await on_events(events)
+                except Exception as e:
+                    print(f"推送预览变化失败: {e}")
+        except Exception as e:
+            print(f"预览文件监听异常 ({project_id}): {e}")
+
+    def watch(self, project_id: str, project_path: str, on_events: Callable[[List[Dict[str, Any]]], Awaitable[None]]):
+        """开始监听项目 (已在监听时忽略)"""
+        if not self.enabled:
+            return
+        task = self._tasks.get(project_id)
+        if task and not task.done():
+            return
+        try:
+            import watchfiles  # noqa: F401
+        except ImportError:
+            print("未安装 watchfiles，预览热重载不可用")
+            self.enabled = False
+            return
+        stop_event = asyncio.Event()
+        self._stops[project_id] = stop_event
+        self._tasks[project_id] = asyncio.create_task(self._run(project_id, project_path, stop_event, on_events))
+
+    async def unwatch(self, project_id: str):
+        """停止监听项目"""
+        stop = self._stops.pop(project_id, None)
+        task = self._tasks.pop(project_id, None)
+        if stop:
+            stop.set()
+        if task:
+            try:
+                await asyncio.wait_for(task, timeout=2)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                task.cancel()
+
+    async def stop_all(self):
+        for project_id in list(self._tasks):
+            await self.unwatch(project_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "watching": [project_id for project_id, task in self._tasks.items() if not task.done()],
+            "batches": self.batches,
+            "events": self.events
+        }
+
+
+# 全局预览文件监听
+preview_watcher = PreviewWatcher(
+    debounce_ms=settings.PREVIEW_WATCH_DEBOUNCE_MS,
+    enabled=settings.PREVIEW_HOT_RELOAD
+)
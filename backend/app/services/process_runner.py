@@ -0,0 +1,162 @@
+"""
+异步子进程执行
+
+所有外部进程统一经由 process_runner 执行，不阻塞事件循环
+- asyncio.create_subprocess_exec 启动，子进程位于独立进程组
+- stdout / stderr 流式读取，超过上限的部分丢弃 (仍持续读取，避免子进程写满管道卡住)
+- 超时后杀掉整个进程树 (含脚本自行启动的孙进程)
+
+接口与 subprocess.run 保持一致: 返回 CompletedProcess，超时抛出 TimeoutExpired
+"""
+
+from typing import Dict, Any, List, Optional
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+
+import psutil
+
+from app.services.config import settings
+
+
+# 流式读取的块大小
+READ_CHUNK = 64 * 1024
+
+TRUNCATED_MARK = "\n...[输出已截断]"
+
+
+class ProcessRunner:
+    """异步子进程执行器"""
+
+    def __init__(self, max_output: int):
+        self.max_output = max_output
+
+        self.runs = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.trees_killed = 0
+        self.truncated = 0
+        self._running = 0
+
+    async def run(
+        self,
+        cmd: List[str],
+        cwd: Optional[str] = None,
+        timeout: float = 120,
+        env: Optional[Dict[str, str]] = None,
+        max_output: Optional[int] = None
+    ) -> subprocess.CompletedProcess:
+        """
+        执行命令并捕获输出
+
+        Raises:
+            subprocess.TimeoutExpired: 执行超时 (进程树已被杀掉)
+        """
+        limit = max_output or self.max_output
+        kwargs: Dict[str, Any] = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+
+        self.runs += 1
+        self._running += 1
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                env=env,
+                **kwargs
+            )
+            readers = asyncio.gather(
+                self._read_capped(proc.stdout, limit),
+                self._read_capped(proc.stderr, limit)
+            )
+            try:
+                (stdout, out_cut), (stderr, err_cut) = await asyncio.wait_for(
+                    asyncio.shield(readers), timeout
+                )
+                await proc.wait()
+            except BaseException as e:
+                # 超时或调用方取消: 杀掉整个进程树后再退出
+                self.kill_tree(proc.pid)
+                await proc.wait()
+                readers.cancel()
+                await asyncio.gather(readers, return_exceptions=True)
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                raise
+        finally:
+            self._running -= 1
+
+        if out_cut or err_cut:
+            self.truncated += 1
+        if proc.returncode != 0:
+            self.failed += 1
+        return subprocess.CompletedProcess(
+            cmd,
+            proc.returncode,
+            stdout.decode("utf-8", errors="replace") + (TRUNCATED_MARK if out_cut else ""),
+            stderr.decode("utf-8", errors="replace") + (TRUNCATED_MARK if err_cut else "")
+        )
+
+    @staticmethod
+    async def _read_capped(stream: asyncio.StreamReader, limit: int):
+        """读到 EOF，只保留前 limit 字节。返回 (内容, 是否截断)"""
+        chunks = []
+        kept = 0
+        truncated = False
+        while True:
+            chunk = await stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            if kept < limit:
+                chunk = chunk[:limit - kept]
+                chunks.append(chunk)
+                kept += len(chunk)
+            else:
+                truncated = True
+        return b"".join(chunks), truncated
+
+    def kill_tree(self, pid: int):
+        """杀掉进程及其全部子孙进程"""
+        try:
+            parent = psutil.Process(pid)
+            victims = parent.children(recursive=True) + [parent]
+        except psutil.NoSuchProcess:
+            victims = []
+
+        if sys.platform != "win32":
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        # 脱离进程组的子孙进程 (如脚本自行 setsid) 逐个清理
+        for proc in victims:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        self.trees_killed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """执行统计"""
+        return {
+            "running": self._running,
+            "runs": self.runs,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "trees_killed": self.trees_killed,
+            "truncated": self.truncated,
+            "max_output": self.max_output
+        }
+
+
+# 全局子进程执行器
+process_runner = ProcessRunner(max_output=settings.GENERATOR_MAX_OUTPUT)
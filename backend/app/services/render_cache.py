@@ -0,0 +1,249 @@
+"""
+生成结果缓存
+
+脚本内容、seed、尺寸、输出格式都相同时，生成结果必然相同，不必再执行脚本
+- 缓存键: sha256(脚本内容哈希, seed, size, 扩展名, 风格, 辅助库版本)
+- 命中时把缓存对象硬链接到新的变体路径 (跨文件系统等无法链接时退回复制)
+- 对象按脚本内容哈希分目录存放，可按脚本整体失效
+- 按总大小 LRU 淘汰 (命中时刷新 mtime，重启后据此恢复顺序)
+- 接口可在多个线程中同时调用 (请求处理把文件操作放到线程中执行)，索引由锁保护
+"""
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+from app.services.config import settings
+
+
+# 生成脚本依赖的辅助库，库本身变化也会改变输出
+GEN_LIB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../gen_lib/ai_engine_gen.py"))
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(src: str, dst: str):
+    """硬链接 src 到 dst，不支持时复制"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class RenderCache:
+    """生成结果磁盘缓存"""
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+        # 对象相对路径 -> 文件大小，按最近访问顺序排列 (最旧在前)
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._lib_version: Optional[Tuple[int, str]] = None
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _gen_lib_hash(self) -> str:
+        """辅助库内容哈希 (按 mtime 缓存)"""
+        try:
+            mtime = os.stat(GEN_LIB_PATH).st_mtime_ns
+        except OSError:
+            return ""
+        if self._lib_version is None or self._lib_version[0] != mtime:
+            self._lib_version = (mtime, _file_sha256(GEN_LIB_PATH))
+        return self._lib_version[1]
+
+    def make_key(
+        self,
+        script_path: str,
+        seed: int,
+        size: Any,
+        extension: str,
+        style: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        计算缓存键，形如 "<脚本哈希>/<结果哈希><扩展名>"；未启用或脚本不存在时返回 None
+        """
+        if not self.enabled:
+            return None
+        try:
+            script_hash = _file_sha256(script_path)
+        except OSError:
+            return None
+        payload = json.dumps(
+            {
+                "seed": seed,
+                "size": size,
+                "extension": extension,
+                "style": style,
+                "gen_lib": self._gen_lib_hash()
+            },
+            sort_keys=True,
+            separators=(",", ":")
+        )
+        digest = hashlib.sha256(f"{script_hash}:{payload}".encode("utf-8")).hexdigest()
+        return f"{script_hash[:32]}/{digest}{extension}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, *key.split("/"))
+
+    def _load_index(self):
+        """首次使用时扫描缓存目录，按文件 mtime 重建 LRU 顺序"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        entries = []
+        if os.path.exists(self.cache_dir):
+            for group in os.listdir(self.cache_dir):
+                group_dir = os.path.join(self.cache_dir, group)
+                if not os.path.isdir(group_dir):
+                    continue
+                for filename in os.listdir(group_dir):
+                    if filename.endswith(".tmp"):
+                        continue
+                    stat = os.stat(os.path.join(group_dir, filename))
+                    entries.append((stat.st_mtime, f"{group}/{filename}", stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _remove(self, key: str):
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def fetch(self, key: Optional[str], dest: str) -> bool:
+        """命中时把缓存结果链接到 dest，返回是否命中"""
+        with self._lock:
+            if key is None:
+                return False
+            self._load_index()
+            path = self._path(key)
+            if key not in self._index or not os.path.exists(path):
+                if key in self._index:
+                    self._remove(key)
+                self.misses += 1
+                return False
+
+            try:
+                link_or_copy(path, dest)
+            except OSError as e:
+                print(f"读取生成缓存失败: {e}")
+                self.misses += 1
+                return False
+
+            self._index.move_to_end(key)
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return True
+
+    def store(self, key: Optional[str], src: str):
+        """把生成结果存入缓存 (硬链接，不额外占用空间)，并按总大小淘汰"""
+        with self._lock:
+            if key is None or not os.path.isfile(src):
+                return
+            self._load_index()
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                link_or_copy(src, tmp_path)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"写入生成缓存失败: {e}")
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                return
+
+            self._total_bytes -= self._index.pop(key, 0)
+            size = os.path.getsize(path)
+            self._index[key] = size
+            self._total_bytes += size
+            self.stores += 1
+
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                self._remove(next(iter(self._index)))
+                self.evictions += 1
+
+    def invalidate(self, script_path: Optional[str] = None) -> int:
+        """
+        使缓存失效
+
+        Args:
+            script_path: 只清除该脚本 (按当前内容) 的全部结果；为空时清空整个缓存
+
+        Returns:
+            清除的条目数
+        """
+        with self._lock:
+            self._load_index()
+            if script_path is None:
+                prefix = ""
+            else:
+                try:
+                    prefix = _file_sha256(script_path)[:32] + "/"
+                except OSError:
+                    return 0
+
+            keys = [key for key in self._index if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            if script_path is None and os.path.exists(self.cache_dir):
+                shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            self._load_index()
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+
+# 全局生成结果缓存
+render_cache = RenderCache(
+    cache_dir=settings.RENDER_CACHE_DIR,
+    max_bytes=settings.RENDER_CACHE_MAX_BYTES,
+    enabled=settings.RENDER_CACHE_ENABLED
+)
@@ -0,0 +1,17 @@
+"""
+资源类型定义
+
+资源类型 -> 存放目录 / 文件扩展名 / 类别，资源 API 与元数据索引共用
+"""
+
+RESOURCE_TYPES = {
+    "character": {"folder": "characters", "extension": ".png", "category": "image"},
+    "scene": {"folder": "scenes", "extension": ".png", "category": "image"},
+    "item": {"folder": "items", "extension": ".png", "category": "image"},
+    "ui": {"folder": "ui", "extension": ".png", "category": "image"},
+    "bgm": {"folder": "audio/bgm", "extension": ".wav", "category": "audio"},
+    "sfx": {"folder": "audio/sfx", "extension": ".wav", "category": "audio"},
+}
+
+# 可提取规格的文档类型
+SPEC_TYPES = ["character", "scene", "item", "audio", "gameplay", "quest", "ui"]
@@ -0,0 +1,259 @@
+"""
+生成脚本静态检查
+
+LLM 生成的脚本在保存时先做静态检查，明显有问题的脚本毫秒级拒绝，不必等到启动子进程才发现:
+- AST 解析与编译 (语法错误带行号)
+- 命令行接口: 须接受 --output，资源脚本还须接受 --seed (调用 gen.parse_args() 视为两者都有)
+- import 白名单: 数值/文件相关标准库与 numpy / PIL / scipy / pydub / ai_engine_gen
+- 禁止 eval / exec / os.system 等调用
+- 明显的死循环: while True 且循环体内没有 break / return / raise / sys.exit
+
+通过检查的脚本同时写入字节码缓存，generator_worker 执行时直接加载，不再重复编译
+"""
+
+from typing import Dict, Any, List, Optional
+import ast
+import os
+import time
+
+from app.services.config import settings
+from app.services.bytecode_cache import BytecodeCache
+from app.services.file_utils import write_text_atomic
+
+
+# 脚本类型: resource (图片/音频，多 seed 执行) / animation (序列帧，只需 --output)
+KIND_RESOURCE = "resource"
+KIND_ANIMATION = "animation"
+
+ALLOWED_MODULES = {
+    "__future__", "argparse", "random", "math", "cmath", "colorsys", "wave", "struct", "array",
+    "os", "sys", "io", "json", "time", "datetime", "pathlib", "typing", "dataclasses", "enum",
+    "itertools", "functools", "collections", "copy", "re", "string", "statistics", "fractions",
+    "decimal", "operator", "numbers", "heapq", "bisect", "abc", "warnings",
+    "numpy", "PIL", "scipy", "pydub", "ai_engine_gen",
+}
+
+FORBIDDEN_CALLS = {"eval", "exec", "compile", "__import__", "breakpoint", "input"}
+FORBIDDEN_OS_CALLS = {
+    "system", "popen", "fork", "forkpty", "kill", "killpg", "execv", "execve", "execvp",
+    "execl", "execlp", "spawnv", "spawnl", "posix_spawn", "rmdir", "removedirs",
+}
+
+# 这些调用视为可以结束 while True 循环
+EXIT_CALLS = {"exit", "quit", "_exit"}
+
+
+class ScriptValidationError(Exception):
+    """生成脚本未通过静态检查"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("; ".join(errors))
+
+
+def _call_name(node: ast.Call) -> Optional[str]:
+    func = node.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def _can_leave(body: List[ast.stmt]) -> bool:
+    """
+    循环体是否可能跳出: break (只算本层循环) / return / raise / sys.exit()
+    不进入嵌套的函数与类定义
+    """
+    if _own_breaks(body):
+        return True
+    for stmt in body:
+        for node in _walk_shallow(stmt):
+            if isinstance(node, (ast.Return, ast.Raise)):
+                return True
+            if isinstance(node, ast.Call) and _call_name(node) in EXIT_CALLS:
+                return True
+    return False
+
+
+def _walk_shallow(node: ast.AST):
+    """ast.walk，但跳过嵌套的函数 / 类 / lambda"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        yield current
+        for child in ast.iter_child_nodes(current):
+            if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                stack.append(child)
+
+
+def _own_breaks(body: List[ast.stmt]) -> List[ast.Break]:
+    """属于当前循环 (不在内层循环中) 的 break 语句"""
+    breaks = []
+    stack = list(body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Break):
+            breaks.append(node)
+            continue
+        if isinstance(node, (ast.For, ast.AsyncFor, ast.While)):
+            # 内层循环的 else 子句仍属于外层
+            stack.extend(node.orelse)
+            continue
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        stack.extend(ast.iter_child_nodes(node))
+    return breaks
+
+
+def _is_always_true(test: ast.expr) -> bool:
+    return isinstance(test, ast.Constant) and bool(test.value) and test.value is not Ellipsis
+
+
+def _is_infinite_iter(node: ast.expr) -> bool:
+    """for x in itertools.count() / itertools.cycle(...)"""
+    if not isinstance(node, ast.Call) or _call_name(node) not in ("count", "cycle"):
+        return False
+    func = node.func
+    return isinstance(func, ast.Name) or (
+        isinstance(func.value, ast.Name) and func.value.id == "itertools"
+    )
+
+
+def check_source(source: str, filename: str = "<script>", kind: str = KIND_RESOURCE) -> List[str]:
+    """
+    静态检查脚本源码
+
+    Returns:
+        问题列表，空列表表示通过
+    """
+    try:
+        tree = ast.parse(source, filename)
+        compile(tree, filename, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return [f"语法错误 (第 {e.lineno} 行): {e.msg}"]
+    except ValueError as e:
+        return [f"无法编译: {e}"]
+
+    errors: List[str] = []
+    nodes = list(ast.walk(tree))
+
+    # 先收集导入，辅助库的别名在后面识别 gen.parse_args() 时要用
+    gen_aliases = set()      # import ai_engine_gen as gen
+    gen_parse_args = set()   # from ai_engine_gen import parse_args
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split(".")[0] not in ALLOWED_MODULES:
+                    errors.append(f"第 {node.lineno} 行: 不允许导入 {alias.name}")
+                if alias.name == "ai_engine_gen":
+                    gen_aliases.add(alias.asname or alias.name)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or (node.module or "").split(".")[0] not in ALLOWED_MODULES:
+                errors.append(f"第 {node.lineno} 行: 不允许导入 {'.' * node.level}{node.module or ''}")
+            if node.module == "ai_engine_gen":
+                gen_parse_args.update(
+                    "parse_args" if a.name == "*" else (a.asname or a.name)
+                    for a in node.names if a.name in ("parse_args", "*")
+                )
+
+    arguments = set()
+    uses_gen_parse_args = False
+    for node in nodes:
+        if isinstance(node, ast.Call):
+            name = _call_name(node)
+            func = node.func
+            if isinstance(func, ast.Name) and name in FORBIDDEN_CALLS:
+                errors.append(f"第 {node.lineno} 行: 不允许调用 {name}()")
+            elif (isinstance(func, ast.Attribute) and name in FORBIDDEN_OS_CALLS
+                  and isinstance(func.value, ast.Name) and func.value.id == "os"):
+                errors.append(f"第 {node.lineno} 行: 不允许调用 os.{name}()")
+
+            if name == "add_argument":
+                arguments.update(
+                    arg.value for arg in node.args
+                    if isinstance(arg, ast.Constant) and isinstance(arg.value, str)
+                )
+            elif isinstance(func, ast.Name) and func.id in gen_parse_args:
+                uses_gen_parse_args = True
+            elif (name == "parse_args" and isinstance(func, ast.Attribute)
+                  and isinstance(func.value, ast.Name) and func.value.id in gen_aliases):
+                uses_gen_parse_args = True
+
+        elif isinstance(node, ast.While):
+            if _is_always_true(node.test) and not _can_leave(node.body):
+                errors.append(f"第 {node.lineno} 行: while 循环无法退出 (缺少 break / return)")
+        elif isinstance(node, (ast.For, ast.AsyncFor)):
+            if _is_infinite_iter(node.iter) and not _can_leave(node.body):
+                errors.append(f"第 {node.lineno} 行: 遍历无限迭代器且无法退出")
+
+    if not uses_gen_parse_args:
+        required = ["--output"] if kind == KIND_ANIMATION else ["--output", "--seed"]
+        missing = [arg for arg in required if arg not in arguments]
+        if missing:
+            errors.append(f"缺少命令行参数: {', '.join(missing)}")
+
+    return errors
+
+
+class ScriptValidator:
+    """脚本静态检查 + 保存 + 字节码缓存"""
+
+    def __init__(self, cache: BytecodeCache, enabled: bool = True):
+        self.cache = cache
+        self.enabled = enabled
+
+        self.checked = 0
+        self.rejected = 0
+        self._check_time = 0.0
+        self._saves_since_prune = 0
+
+    def validate(self, source: str, filename: str = "<script>", kind: str = KIND_RESOURCE):
+        """
+        检查脚本并缓存其字节码
+
+        Raises:
+            ScriptValidationError: 未通过检查
+        """
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        errors = check_source(source, filename, kind)
+        self._check_time += time.perf_counter() - started
+        self.checked += 1
+        if errors:
+            self.rejected += 1
+            raise ScriptValidationError(errors)
+        self.cache.compile(source, filename)
+
+    def save(self, path: str, source: str, kind: str = KIND_RESOURCE):
+        """
+        检查通过后再写入脚本文件 (未通过时不覆盖已有脚本)
+
+        Raises:
+            ScriptValidationError: 未通过检查
+        """
+        path = os.path.abspath(path)
+        self.validate(source, path, kind)
+        write_text_atomic(path, source)
+
+        self._saves_since_prune += 1
+        if self._saves_since_prune >= 100:
+            self._saves_since_prune = 0
+            self.cache.prune()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "avg_check_ms": round(self._check_time / self.checked * 1000, 2) if self.checked else 0.0,
+            "bytecode_cache": self.cache.stats()
+        }
+
+
+# 全局脚本检查器
+script_validator = ScriptValidator(
+    BytecodeCache(settings.SCRIPT_BYTECODE_DIR, max_entries=settings.SCRIPT_BYTECODE_MAX_ENTRIES),
+    enabled=settings.SCRIPT_VALIDATION_ENABLED
+)
@@ -0,0 +1,270 @@
+"""
+增量规格提取
+
+设计文档按标题切分为章节，每个章节单独交给 LLM 提取 JSON 片段，片段按章节内容哈希保存在
+specs/.sections/<类型>.json。再次提取时只有内容变化的章节会调用 LLM，其余直接复用，
+所有片段按章节顺序合并写入 specs/<类型>.json:
+- 列表字段中带 id 的条目按 id 合并 (后出现的章节补充 / 覆盖字段)，其余条目依次追加
+- 字典字段浅合并，标量字段后出现的非空值覆盖
+
+只有规格是实体列表的文档 (角色 / 场景 / 道具 / 音频) 按章节提取；玩法、任务、UI 等结构依赖全文，
+整篇作为一个章节 (文档未变化时同样不调用 LLM)。
+文档开头到第一个章节之前的部分 (标题、概述) 作为每个章节的背景，变化时所有章节都会重新提取
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import re
+
+from app.services.config import settings
+from app.services.file_utils import write_json_atomic
+from app.services.llm_service import LLMService
+from app.services.llm_scheduler import PRIORITY_NORMAL
+from app.services.event_bus import event_bus
+
+
+SECTIONS_DIR = os.path.join("specs", ".sections")
+SECTIONS_FORMAT = 1
+
+# 按章节提取的规格类型
+SECTIONED_SPEC_TYPES = {"character", "scene", "item", "audio"}
+
+# 作为章节边界的最深标题级别 (更深的标题留在所属章节内)
+SECTION_MAX_LEVEL = 3
+
+# 过短的章节与相邻章节合并提取，避免为几行文字单独调用一次 LLM
+SECTION_MIN_CHARS = 300
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def split_sections(
+    markdown: str,
+    max_level: int = SECTION_MAX_LEVEL,
+    min_chars: int = SECTION_MIN_CHARS
+) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    按标题切分 Markdown (代码块中的 # 不算标题)
+
+    只有一个一级标题时 (文档标题) 它不作为边界；不足 min_chars 的章节并入下一个章节 (最后一个并入上一个)。
+
+    Returns:
+        (背景: 第一个章节之前的文本, 章节列表 [{title: 标题路径, text: 含标题的正文}])
+        只有标题没有正文的章节 (如紧跟子标题的上级标题) 不单独成章节，标题并入子章节的路径
+    """
+    lines = markdown.splitlines()
+    headings: List[Tuple[int, int, str]] = []
+    in_fence = False
+    for index, line in enumerate(lines):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _HEADING.match(line)
+        if match and len(match.group(1)) <= max_level:
+            headings.append((index, len(match.group(1)), match.group(2)))
+
+    if sum(1 for _, level, _ in headings if level == 1) == 1:
+        headings = [h for h in headings if h[1] > 1]
+    if not headings:
+        return markdown.strip(), []
+
+    preamble = "\n".join(lines[:headings[0][0]]).strip()
+    sections = []
+    path: List[Tuple[int, str]] = []
+    for i, (start, level, title) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(lines)
+        path = [(l, t) for l, t in path if l < level] + [(level, title)]
+        body = "\n".join(lines[start + 1:end]).strip()
+        if not body:
+            continue
+        title = " > ".join(t for _, t in path)
+        text = "\n".join([lines[start], body])
+        if sections and len(sections[-1]["text"]) < min_chars:
+            sections[-1] = {"title": f"{sections[-1]['title']} / {title}", "text": f"{sections[-1]['text']}\n\n{text}"}
+        else:
+            sections.append({"title": title, "text": text})
+    if len(sections) > 1 and len(sections[-1]["text"]) < min_chars:
+        last = sections.pop()
+        sections[-1] = {"title": f"{sections[-1]['title']} / {last['title']}", "text": f"{sections[-1]['text']}\n\n{last['text']}"}
+    return preamble, sections
+
+
+def _merge_value(current: Any, new: Any) -> Any:
+    if isinstance(current, list) and isinstance(new, list):
+        merged = list(current)
+        positions = {item["id"]: i for i, item in enumerate(merged) if isinstance(item, dict) and item.get("id")}
+        for item in new:
+            if isinstance(item, dict) and item.get("id") in positions:
+                index = positions[item["id"]]
+                merged[index] = {**merged[index], **{k: v for k, v in item.items() if v not in (None, "", [], {})}}
+            else:
+                if isinstance(item, dict) and item.get("id"):
+                    positions[item["id"]] = len(merged)
+                merged.append(item)
+        return merged
+    if isinstance(current, dict) and isinstance(new, dict):
+        return {**current, **{k: v for k, v in new.items() if v not in (None, "", [], {})}}
+    return current if new in (None, "", [], {}) else new
+
+
+def merge_fragments(fragments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """按章节顺序合并 JSON 片段"""
+    merged: Dict[str, Any] = {}
+    for fragment in fragments:
+        for key, value in fragment.items():
+            merged[key] = _merge_value(merged[key], value) if key in merged else value
+    return merged
+
+
+def _known_entities(fragments: List[Dict[str, Any]]) -> List[str]:
+    """片段中已有的条目 (id: 名称)，提示 LLM 在其他章节中沿用相同 id"""
+    known = {}
+    for fragment in fragments:
+        for value in fragment.values():
+            if not isinstance(value, list):
+                continue
+            for item in value:
+                if isinstance(item, dict) and item.get("id"):
+                    known.setdefault(item["id"], item.get("name") or "")
+    return [f"{entity_id}: {name}" if name else entity_id for entity_id, name in known.items()]
+
+
+class SpecExtractor:
+    """按章节增量提取规格"""
+
+    def __init__(self, projects_dir: str, llm: LLMService):
+        self.projects_dir = projects_dir
+        self.llm = llm
+
+        self.extractions = 0
+        self.sections_extracted = 0
+        self.sections_reused = 0
+        self.sections_failed = 0
+
+    def _state_path(self, project_id: str, doc_type: str) -> str:
+        return os.path.join(self.projects_dir, project_id, SECTIONS_DIR, f"{doc_type}.json")
+
+    def _load_state(self, project_id: str, doc_type: str) -> Dict[str, Dict[str, Any]]:
+        """章节哈希 -> 已提取的片段"""
+        try:
+            with open(self._state_path(project_id, doc_type), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if state.get("format") != SECTIONS_FORMAT:
+            return {}
+        return {section["hash"]: section["fragment"] for section in state.get("sections", [])}
+
+    @staticmethod
+    def _hash(doc_type: str, preamble: str, text: str) -> str:
+        return hashlib.sha256(f"{doc_type}\0{preamble}\0{text}".encode("utf-8")).hexdigest()
+
+    async def extract(
+        self,
+        project_id: str,
+        doc_type: str,
+        doc_content: str,
+        bypass_cache: bool = False,
+        priority: int = PRIORITY_NORMAL
+    ) -> Dict[str, Any]:
+        """
+        提取规格 (只对内容变化的章节调用 LLM)
+
+        同时进行的章节数不超过 LLM 并发上限，避免一次占满调度队列；
+        部分章节调用失败 (如 LLMBusyError) 时已完成的片段照常保存，再抛出第一个异常，重试只需补齐剩余章节
+
+        Args:
+            bypass_cache: 忽略已保存的片段并跳过 LLM 响应缓存，全部重新提取
+            priority: 调度优先级 (后台任务使用 PRIORITY_BATCH)
+
+        Returns:
+            {spec: 合并后的规格, sections: 章节数, extracted: 调用 LLM 的章节数,
+             reused: 复用的章节数, failed: 解析失败的章节标题}
+        """
+        if doc_type in SECTIONED_SPEC_TYPES:
+            preamble, sections = split_sections(doc_content)
+        else:
+            preamble, sections = "", []
+        if not sections:
+            preamble, sections = "", [{"title": "", "text": doc_content.strip()}]
+
+        previous = {} if bypass_cache else self._load_state(project_id, doc_type)
+        hashes = [self._hash(doc_type, preamble, section["text"]) for section in sections]
+        known = _known_entities(list(previous.values()))
+        semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_CONCURRENCY))
+
+        async def extract_one(section: Dict[str, str]) -> Dict[str, Any]:
+            context = None
+            if len(sections) > 1:
+                context = {"preamble": preamble, "title": section["title"], "known_entities": known}
+            async with semaphore:
+                with event_bus.context(doc_type=doc_type, section=section["title"]):
+                    return await self.llm.extract_spec(
+                        section["text"], doc_type,
+                        bypass_cache=bypass_cache,
+                        project_id=project_id,
+                        section_context=context,
+                        priority=priority
+                    )
+
+        pending = [i for i, digest in enumerate(hashes) if digest not in previous]
+        results = await asyncio.gather(*(extract_one(sections[i]) for i in pending), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        fresh = {i: result for i, result in zip(pending, results) if not isinstance(result, BaseException)}
+
+        fragments: List[Optional[Dict[str, Any]]] = []
+        failed = []
+        for i, digest in enumerate(hashes):
+            fragment = fresh.get(i) if i in pending else previous[digest]
+            if not isinstance(fragment, dict) or ("error" in fragment and "raw" in fragment):
+                failed.append(sections[i]["title"])
+                fragment = None
+            fragments.append(fragment)
+
+        # 解析或调用失败的章节不保存，下次提取时重试
+        os.makedirs(os.path.dirname(self._state_path(project_id, doc_type)), exist_ok=True)
+        write_json_atomic(self._state_path(project_id, doc_type), {
+            "format": SECTIONS_FORMAT,
+            "doc_type": doc_type,
+            "sections": [
+                {"title": section["title"], "hash": digest, "fragment": fragment}
+                for section, digest, fragment in zip(sections, hashes, fragments) if fragment is not None
+            ]
+        })
+        self.sections_extracted += len(fresh)
+        if errors:
+            self.sections_failed += len(errors)
+            raise errors[0]
+
+        good = [fragment for fragment in fragments if fragment is not None]
+        if good:
+            spec = merge_fragments(good)
+        else:
+            # 全部失败时与整篇提取一致，保留原始输出供手动调整
+            spec = fresh[pending[0]] if pending else {}
+
+        self.extractions += 1
+        self.sections_reused += len(sections) - len(pending)
+        return {
+            "spec": spec,
+            "sections": len(sections),
+            "extracted": len(pending),
+            "reused": len(sections) - len(pending),
+            "failed": failed
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "extractions": self.extractions,
+            "sections_extracted": self.sections_extracted,
+            "sections_reused": self.sections_reused,
+            "sections_failed": self.sections_failed
+        }
+
+
+# 全局规格提取器
+spec_extractor = SpecExtractor(settings.PROJECTS_DIR, LLMService())
@@ -0,0 +1,332 @@
+"""
+ai_engine_gen - 资源生成脚本的运行时辅助库
+
+供 LLM 生成的资源脚本直接 `import ai_engine_gen as gen` 使用 (执行池会把本目录加入 PYTHONPATH)
+- 命令行接口: parse_args (统一 --output / --seed 并设定随机种子)
+- 画布与保存: new_canvas / save
+- 安全图形: safe_rect / safe_ellipse / safe_line / safe_polygon (坐标自动排序、越界裁剪)
+- 纹理: value_noise / add_noise / texture
+- 渐变: linear_gradient / radial_gradient
+- 调色: quantize / dither / outline
+- 序列帧: grid_offsets / spritesheet
+
+所有逐像素处理都以 NumPy 向量化实现，避免在脚本里写 pixels[x, y] 双重循环。
+随机数默认取自 random 模块的当前状态，因此 random.seed(seed) 后结果可复现。
+"""
+
+import argparse
+import os
+import random
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+Color = Tuple[int, ...]
+
+__all__ = [
+    "parse_args", "new_canvas", "save",
+    "safe_rect", "safe_ellipse", "safe_line", "safe_polygon",
+    "value_noise", "add_noise", "texture",
+    "linear_gradient", "radial_gradient",
+    "quantize", "dither", "outline",
+    "grid_offsets", "spritesheet",
+]
+
+
+# ============ 命令行与画布 ============
+
+def parse_args(description: str = "", argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析 --output / --seed，并用 seed 初始化 random 与 numpy.random"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--output", required=True, help="输出文件路径")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    args, _ = parser.parse_known_args(argv)
+    random.seed(args.seed)
+    np.random.seed(args.seed % (2 ** 32))
+    return args
+
+
+def new_canvas(width: int, height: Optional[int] = None, color: Color = (0, 0, 0, 0)):
+    """创建 RGBA 画布，返回 (img, draw)"""
+    img = Image.new("RGBA", (int(width), int(height or width)), color)
+    return img, ImageDraw.Draw(img)
+
+
+def save(img: Image.Image, path: str):
+    """保存为 PNG (RGBA)，自动创建目录"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    img.save(path, "PNG")
+
+
+def _rng(seed: Optional[int]) -> np.random.Generator:
+    """未指定 seed 时从 random 模块取种子，保证 random.seed() 后可复现"""
+    return np.random.default_rng(random.getrandbits(32) if seed is None else seed)
+
+
+def _to_array(img: Image.Image) -> np.ndarray:
+    return np.array(img.convert("RGBA"))
+
+
+def _write_back(img: Image.Image, arr: np.ndarray) -> Image.Image:
+    """把数组写回原图 (就地修改，同时返回该图)"""
+    result = Image.fromarray(arr, "RGBA")
+    if img.mode == "RGBA":
+        img.paste(result)
+        return img
+    return result
+
+
+# ============ 安全图形 ============
+
+def _box(box: Sequence[float]) -> List[float]:
+    x0, y0, x1, y1 = box
+    return [min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)]
+
+
+def safe_rect(draw: ImageDraw.ImageDraw, box, fill=None, outline=None, width: int = 1):
+    """矩形 (坐标顺序任意)"""
+    draw.rectangle(_box(box), fill=fill, outline=outline, width=width)
+
+
+def safe_ellipse(draw: ImageDraw.ImageDraw, box, fill=None, outline=None, width: int = 1):
+    """椭圆 (坐标顺序任意)"""
+    draw.ellipse(_box(box), fill=fill, outline=outline, width=width)
+
+
+def safe_line(draw: ImageDraw.ImageDraw, points, fill=None, width: int = 1):
+    """折线，少于 2 个点时忽略"""
+    points = [tuple(p) for p in points] if points and isinstance(points[0], (tuple, list)) else points
+    if points is None or len(points) < 2:
+        return
+    draw.line(points, fill=fill, width=max(1, int(width)))
+
+
+def safe_polygon(draw: ImageDraw.ImageDraw, points, fill=None, outline=None):
+    """多边形，少于 3 个点时退化为线段"""
+    points = [tuple(p) for p in points]
+    if len(points) >= 3:
+        draw.polygon(points, fill=fill, outline=outline)
+    elif len(points) == 2:
+        draw.line(points, fill=fill or outline)
+
+
+# ============ 纹理 ============
+
+def value_noise(
+    width: int,
+    height: int,
+    scale: float = 8.0,
+    octaves: int = 3,
+    persistence: float = 0.5,
+    seed: Optional[int] = None
+) -> np.ndarray:
+    """
+    分形值噪声
+
+    Args:
+        scale: 最大特征尺寸 (像素)
+        octaves: 叠加层数，每层尺寸减半
+        persistence: 每层振幅衰减
+
+    Returns:
+        (height, width) float32，取值 0~1
+    """
+    rng = _rng(seed)
+    result = np.zeros((height, width), dtype=np.float32)
+    amplitude, total = 1.0, 0.0
+    for octave in range(max(1, octaves)):
+        cell = max(1.0, scale / (2 ** octave))
+        grid = rng.random((int(height / cell) + 2, int(width / cell) + 2), dtype=np.float32)
+
+        ys = np.arange(height, dtype=np.float32) / cell
+        xs = np.arange(width, dtype=np.float32) / cell
+        y0, x0 = ys.astype(np.int64), xs.astype(np.int64)
+        fy, fx = ys - y0, xs - x0
+        fy, fx = fy * fy * (3 - 2 * fy), fx * fx * (3 - 2 * fx)
+
+        top = grid[y0][:, x0] * (1 - fx) + grid[y0][:, x0 + 1] * fx
+        bottom = grid[y0 + 1][:, x0] * (1 - fx) + grid[y0 + 1][:, x0 + 1] * fx
+        result += (top * (1 - fy[:, None]) + bottom * fy[:, None]) * amplitude
+
+        total += amplitude
+        amplitude *= persistence
+    return result / total
+
+
+def add_noise(
+    img: Image.Image,
+    intensity: int = 12,
+    per_channel: bool = False,
+    seed: Optional[int] = None
+) -> Image.Image:
+    """给不透明像素加随机明暗噪点 (替代逐像素循环的 add_texture)，就地修改并返回"""
+    arr = _to_array(img)
+    rng = _rng(seed)
+    shape = arr.shape[:2] + ((3,) if per_channel else (1,))
+    noise = rng.integers(-intensity, intensity + 1, size=shape, dtype=np.int16)
+    rgb = arr[..., :3].astype(np.int16) + noise
+    opaque = arr[..., 3] > 0
+    arr[..., :3][opaque] = np.clip(rgb, 0, 255).astype(np.uint8)[opaque]
+    return _write_back(img, arr)
+
+
+def texture(
+    img: Image.Image,
+    scale: float = 8.0,
+    strength: float = 0.25,
+    octaves: int = 3,
+    seed: Optional[int] = None
+) -> Image.Image:
+    """用值噪声调制不透明像素的明暗，得到石材 / 布料 / 地表等连续纹理，就地修改并返回"""
+    arr = _to_array(img)
+    height, width = arr.shape[:2]
+    noise = value_noise(width, height, scale, octaves, seed=seed)
+    factor = 1.0 + (noise[..., None] - 0.5) * 2 * strength
+    opaque = arr[..., 3] > 0
+    shaded = np.clip(arr[..., :3] * factor, 0, 255).astype(np.uint8)
+    arr[..., :3][opaque] = shaded[opaque]
+    return _write_back(img, arr)
+
+
+# ============ 渐变 ============
+
+def _lerp_colors(t: np.ndarray, start: Color, end: Color) -> np.ndarray:
+    start = np.array(tuple(start) + (255,) * (4 - len(start)), dtype=np.float32)
+    end = np.array(tuple(end) + (255,) * (4 - len(end)), dtype=np.float32)
+    return (start + (end - start) * t[..., None]).astype(np.uint8)
+
+
+def linear_gradient(
+    width: int,
+    height: int,
+    start: Color,
+    end: Color,
+    direction: str = "vertical"
+) -> Image.Image:
+    """线性渐变，direction: vertical (上→下) / horizontal (左→右) / diagonal"""
+    ys = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    xs = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    if direction == "horizontal":
+        t = np.broadcast_to(xs, (height, width))
+    elif direction == "diagonal":
+        t = (xs + ys) / 2
+    else:
+        t = np.broadcast_to(ys, (height, width))
+    return Image.fromarray(_lerp_colors(t, start, end), "RGBA")
+
+
+def radial_gradient(
+    width: int,
+    height: int,
+    inner: Color,
+    outer: Color,
+    center: Optional[Tuple[float, float]] = None,
+    radius: Optional[float] = None
+) -> Image.Image:
+    """径向渐变 (中心 inner → 半径处 outer)"""
+    cx, cy = center if center else ((width - 1) / 2, (height - 1) / 2)
+    radius = radius or max(width, height) / 2
+    ys, xs = np.ogrid[:height, :width]
+    t = np.clip(np.sqrt((xs - cx) ** 2 + (ys - cy) ** 2) / radius, 0, 1).astype(np.float32)
+    return Image.fromarray(_lerp_colors(t, inner, outer), "RGBA")
+
+
+# ============ 调色 ============
+
+_BAYER_4 = np.array([
+    [0, 8, 2, 10],
+    [12, 4, 14, 6],
+    [3, 11, 1, 9],
+    [15, 7, 13, 5],
+], dtype=np.float32) / 16.0 - 0.5
+
+
+def quantize(img: Image.Image, palette: Sequence[Color], dither_strength: float = 0.0) -> Image.Image:
+    """
+    把不透明像素映射到给定调色板中最接近的颜色
+
+    Args:
+        palette: [(r, g, b), ...]
+        dither_strength: >0 时先叠加 Bayer 有序抖动 (0~1)
+    """
+    arr = _to_array(img)
+    colors = np.array([tuple(c)[:3] for c in palette], dtype=np.float32)
+    rgb = arr[..., :3].astype(np.float32)
+    if dither_strength > 0:
+        height, width = rgb.shape[:2]
+        spread = 255.0 / max(1, len(colors) - 1) * dither_strength
+        rgb += np.tile(_BAYER_4, (height // 4 + 1, width // 4 + 1))[:height, :width, None] * spread
+
+    # |p - c|^2 = |p|^2 - 2 p·c + |c|^2，|p|^2 与 argmin 无关，用矩阵乘法一次算完
+    flat = rgb.reshape(-1, 3)
+    weights = -2 * colors.T
+    bias = (colors ** 2).sum(1)
+    nearest = np.empty(len(flat), dtype=np.int64)
+    # 分块计算，避免大图 (如 3840x1080) 一次性占用过多内存
+    chunk = 1 << 18
+    for start in range(0, len(flat), chunk):
+        nearest[start:start + chunk] = (flat[start:start + chunk] @ weights + bias).argmin(1)
+
+    mapped = colors.astype(np.uint8)[nearest].reshape(arr.shape[:2] + (3,))
+    opaque = arr[..., 3] > 0
+    arr[..., :3][opaque] = mapped[opaque]
+    return _write_back(img, arr)
+
+
+def dither(img: Image.Image, levels: int = 4) -> Image.Image:
+    """Bayer 4x4 有序抖动，每个通道量化为 levels 级，就地修改并返回"""
+    arr = _to_array(img)
+    height, width = arr.shape[:2]
+    steps = max(2, levels) - 1
+    threshold = np.tile(_BAYER_4, (height // 4 + 1, width // 4 + 1))[:height, :width, None]
+    values = arr[..., :3].astype(np.float32) / 255.0 * steps + threshold
+    arr[..., :3] = (np.clip(np.round(values), 0, steps) * (255.0 / steps)).astype(np.uint8)
+    return _write_back(img, arr)
+
+
+def outline(
+    img: Image.Image,
+    color: Color = (0, 0, 0, 255),
+    thickness: int = 1,
+    diagonal: bool = False
+) -> Image.Image:
+    """在不透明区域外侧描边 (像素风常用)，就地修改并返回"""
+    arr = _to_array(img)
+    opaque = arr[..., 3] > 0
+    grown = opaque.copy()
+    for _ in range(max(1, thickness)):
+        padded = np.pad(grown, 1)
+        step = padded[:-2, 1:-1] | padded[2:, 1:-1] | padded[1:-1, :-2] | padded[1:-1, 2:]
+        if diagonal:
+            step |= padded[:-2, :-2] | padded[:-2, 2:] | padded[2:, :-2] | padded[2:, 2:]
+        grown = step | grown
+    edge = grown & ~opaque
+    arr[edge] = tuple(color) + (255,) * (4 - len(color))
+    return _write_back(img, arr)
+
+
+# ============ 序列帧 ============
+
+def grid_offsets(frame_width: int, frame_height: int, columns: int, rows: int) -> List[List[Tuple[int, int]]]:
+    """Spritesheet 网格中每一帧左上角坐标，按行返回 [[(x, y), ...], ...]"""
+    return [
+        [(col * frame_width, row * frame_height) for col in range(columns)]
+        for row in range(rows)
+    ]
+
+
+def spritesheet(frames: Sequence[Image.Image], columns: int) -> Image.Image:
+    """把等尺寸的帧按行优先拼成 Spritesheet"""
+    if not frames:
+        raise ValueError("frames 不能为空")
+    width, height = frames[0].size
+    rows = (len(frames) + columns - 1) // columns
+    sheet = Image.new("RGBA", (width * columns, height * rows), (0, 0, 0, 0))
+    for index, frame in enumerate(frames):
+        sheet.paste(frame.convert("RGBA"), ((index % columns) * width, (index // columns) * height))
+    return sheet
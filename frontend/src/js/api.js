@@ -4,6 +4,12 @@
 
 const API_BASE = 'http://localhost:8000/api';
 
+// 批量资源状态缓存: 请求地址 -> { etag, body }
+const assetStatusCache = new Map();
+
+// 项目事件连接: 项目 ID -> { socket, listeners }，同一项目的订阅共用一个 WebSocket
+const eventChannels = new Map();
+
 export const api = {
     /**
      * 获取项目列表
@@ -75,25 +81,78 @@ export const api = {
     },
 
     /**
-     * 生成文档
+     * 生成文档 (forceRegenerate 跳过 LLM 响应缓存，重新生成时得到新的草稿)
      */
-    async generateDocument(projectId, docType) {
+    async generateDocument(projectId, docType, forceRegenerate = false) {
         const response = await fetch(`${API_BASE}/documents/generate`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ project_id: projectId, doc_type: docType })
+            body: JSON.stringify({ project_id: projectId, doc_type: docType, force_regenerate: forceRegenerate })
         });
         return response.json();
     },
 
     /**
-     * 提取JSON规格
+     * 流式生成文档 (SSE)
+     * onDelta(text, fullContent) 在每段增量文本到达时回调；forceRegenerate 跳过 LLM 响应缓存
+     */
+    async generateDocumentStream(projectId, docType, onDelta, forceRegenerate = false) {
+        const response = await fetch(`${API_BASE}/documents/generate-stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ project_id: projectId, doc_type: docType, force_regenerate: forceRegenerate })
+        });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.detail || '文档生成失败');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let content = '';
+        let result = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE 消息以空行分隔
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const raw = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                for (const line of raw.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                const payload = data ? JSON.parse(data) : {};
+
+                if (event === 'delta') {
+                    content += payload.content;
+                    if (onDelta) onDelta(payload.content, content);
+                } else if (event === 'done') {
+                    result = { ...payload, content };
+                } else if (event === 'error') {
+                    throw new Error(payload.detail);
+                }
+            }
+        }
+        return result || { content };
+    },
+
+    /**
+     * 提取JSON规格 (默认只重新提取有变化的章节；forceRegenerate 全部章节重新提取并跳过 LLM 响应缓存)
      */
-    async extractSpec(projectId, docType) {
+    async extractSpec(projectId, docType, forceRegenerate = false) {
         const response = await fetch(`${API_BASE}/documents/extract-spec`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ project_id: projectId, doc_type: docType })
+            body: JSON.stringify({ project_id: projectId, doc_type: docType, force_regenerate: forceRegenerate })
         });
         return response.json();
     },
@@ -164,6 +223,31 @@ export const api = {
         return response.json();
     },
 
+    /**
+     * 批量获取项目资源状态 (变体 / 选定版本 / 动画)，specType 为空时返回全部类型
+     * 带 If-None-Match 请求，未变化 (304) 时直接使用上次的结果
+     */
+    async getProjectAssetStatus(projectId, specType) {
+        const query = specType ? `?spec_type=${encodeURIComponent(specType)}` : '';
+        const url = `${API_BASE}/resources/${projectId}/status${query}`;
+        const cached = assetStatusCache.get(url);
+        const response = await fetch(url, {
+            headers: cached ? { 'If-None-Match': cached.etag } : {}
+        });
+        if (response.status === 304 && cached) {
+            return cached.body;
+        }
+        if (!response.ok) {
+            throw new Error('获取资源状态失败');
+        }
+        const body = await response.json();
+        const etag = response.headers.get('ETag');
+        if (etag) {
+            assetStatusCache.set(url, { etag, body });
+        }
+        return body;
+    },
+
     /**
      * 选择资源变体
      */
@@ -196,6 +280,46 @@ export const api = {
         return response.json();
     },
 
+    /**
+     * 订阅项目的生成进度事件 (LLM token 进度、脚本保存、变体渲染等，经游戏控制 WebSocket 推送)
+     * 连接建立后才返回，保证随后发起的请求的事件不会漏掉；返回取消订阅函数
+     */
+    async subscribeProjectEvents(projectId, onEvent) {
+        let channel = eventChannels.get(projectId);
+        if (!channel) {
+            const socket = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/game/ws/${projectId}`);
+            channel = { socket, listeners: new Set() };
+            socket.onmessage = (message) => {
+                let event;
+                try {
+                    event = JSON.parse(message.data);
+                } catch (e) {
+                    return;
+                }
+                channel.listeners.forEach(listener => listener(event));
+            };
+            socket.onclose = () => {
+                if (eventChannels.get(projectId) === channel) eventChannels.delete(projectId);
+            };
+            eventChannels.set(projectId, channel);
+        }
+        if (channel.socket.readyState === WebSocket.CONNECTING) {
+            await new Promise(resolve => {
+                channel.socket.addEventListener('open', resolve, { once: true });
+                channel.socket.addEventListener('close', resolve, { once: true });
+            });
+        }
+
+        channel.listeners.add(onEvent);
+        return () => {
+            channel.listeners.delete(onEvent);
+            if (channel.listeners.size === 0) {
+                eventChannels.delete(projectId);
+                channel.socket.close();
+            }
+        };
+    },
+
     /**
      * 上传角色序列帧动画
      */
@@ -82,6 +82,11 @@ export async function renderProjectPanel(project) {
                                 <button class="btn btn-sm btn-generate" onclick="extractSpec('${project.id}', '${spec.spec_type}')">
                                     ${spec.exists ? '重新提取' : '提取'}
                                 </button>
+                                ${spec.exists ? `
+                                    <button class="btn btn-sm btn-view" title="忽略已提取的章节，全部重新提取" onclick="extractSpec('${project.id}', '${spec.spec_type}', true)">
+                                        全部重提
+                                    </button>
+                                ` : ''}
                             </div>
                         </div>
                     `).join('')}
@@ -315,6 +320,16 @@ export async function viewDocument(projectId, docType) {
         document.getElementById('document-editor').classList.add('hidden');
         document.getElementById('document-content').classList.remove('hidden');
 
+        // 重新生成: 跳过 LLM 响应缓存，得到新的草稿
+        const regenBtn = document.getElementById('regen-doc-btn');
+        if (regenBtn) {
+            regenBtn.onclick = () => {
+                if (confirm('重新生成会覆盖当前文档（包括手动编辑的内容），确定继续吗？')) {
+                    generateSingleDocument(projectId, docType, true);
+                }
+            };
+        }
+
         // 显示提取规格按钮（main文档不需要提取）
         const extractBtn = document.getElementById('extract-spec-btn');
         if (extractBtn) {
@@ -335,16 +350,33 @@ export async function viewDocument(projectId, docType) {
 /**
  * 生成单个文档
  */
-export async function generateSingleDocument(projectId, docType) {
+export async function generateSingleDocument(projectId, docType, forceRegenerate = false) {
     const btn = event.target;
     const originalText = btn.textContent;
     btn.textContent = '生成中...';
     btn.disabled = true;
 
     try {
-        await api.generateDocument(projectId, docType);
-        // 刷新项目面板以更新文档列表
+        // 流式生成：首段文本到达后即切换到文档面板并逐步渲染
+        let contentDiv = null;
+        let renderPending = false;
+        await api.generateDocumentStream(projectId, docType, (delta, content) => {
+            if (!contentDiv) {
+                contentDiv = showStreamingDocument();
+            }
+            btn.textContent = `生成中... ${content.length} 字`;
+            // 合并到下一帧渲染，避免每个 token 都重排 DOM
+            if (!renderPending) {
+                renderPending = true;
+                requestAnimationFrame(() => {
+                    renderPending = false;
+                    contentDiv.innerHTML = renderMarkdown(content);
+                });
+            }
+        }, forceRegenerate);
+        // 刷新项目面板以更新文档列表，再按正常流程打开文档（含编辑/提取按钮状态）
         await renderProjectPanel(state.currentProject);
+        await viewDocument(projectId, docType);
     } catch (error) {
         console.error('生成文档失败:', error);
         alert('生成文档失败: ' + error.message);
@@ -354,6 +386,21 @@ export async function generateSingleDocument(projectId, docType) {
     }
 }
 
+/**
+ * 切换到文档面板用于流式显示，返回内容容器
+ */
+function showStreamingDocument() {
+    document.getElementById('project-panel').classList.add('hidden');
+    document.getElementById('document-panel').classList.remove('hidden');
+    document.getElementById('document-title').textContent = '生成中...';
+    document.getElementById('document-editor').classList.add('hidden');
+
+    const contentDiv = document.getElementById('document-content');
+    contentDiv.classList.remove('hidden');
+    contentDiv.innerHTML = '';
+    return contentDiv;
+}
+
 /**
  * 生成全部文档
  */
@@ -367,7 +414,7 @@ export async function generateAllDocuments(projectId) {
     btn.disabled = true;
 
     try {
-        await api.generateDocument(projectId, 'all');
+        await api.generateDocument(projectId, 'all', true);
         alert('文档生成任务已启动，请稍后刷新。');
         await renderProjectPanel(state.currentProject);
     } catch (error) {
@@ -382,14 +429,14 @@ export async function generateAllDocuments(projectId) {
 /**
  * 提取规格
  */
-export async function extractSpec(projectId, docType) {
+export async function extractSpec(projectId, docType, forceRegenerate = false) {
     const btn = event.target;
     const originalText = btn.textContent;
     btn.textContent = '提取中...';
     btn.disabled = true;
 
     try {
-        await api.extractSpec(projectId, docType);
+        await api.extractSpec(projectId, docType, forceRegenerate);
         await renderProjectPanel(state.currentProject);
     } catch (error) {
         console.error('提取规格失败:', error);
@@ -500,8 +547,11 @@ export async function extractAllSpecs(projectId) {
  */
 export async function extractSpecFromDoc(projectId, docType) {
     try {
-        await api.extractSpec(projectId, docType);
-        alert('规格提取成功');
+        const result = await api.extractSpec(projectId, docType);
+        const sections = result.sections;
+        alert(sections && sections.sections > 1
+            ? `规格提取成功 (重新提取 ${sections.extracted} 个章节，复用 ${sections.reused} 个)`
+            : '规格提取成功');
     } catch (error) {
         console.error('提取规格失败:', error);
         alert('提取规格失败: ' + error.message);
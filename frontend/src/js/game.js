@@ -58,44 +58,36 @@ export async function initPreviewTab(projectId) {
         const readyCharacters = [];
         const readyScenes = [];
 
-        // 并行请求资源状态以提升速度
-        const charPromises = characters.map(async (char) => {
-            try {
-                const result = await api.getResourceVariants(projectId, 'character', char.id);
-                const selected = result.variants?.find(v => v.selected);
-                if (selected) {
-                    return {
-                        id: char.id,
-                        name: char.name,
-                        imgUrl: getAssetUrl(projectId, 'characters', char.id, selected.file_path),
-                        animation: result.animation
-                    };
-                }
-            } catch (e) { }
-            return null;
+        // 一次请求取得全部资源状态
+        const status = await api.getProjectAssetStatus(projectId).catch(() => ({ items: {} }));
+        const charStatus = status.items?.character || {};
+        const sceneStatus = status.items?.scene || {};
+
+        characters.forEach(char => {
+            const result = charStatus[char.id];
+            const selected = result?.variants?.find(v => v.selected);
+            if (selected) {
+                readyCharacters.push({
+                    id: char.id,
+                    name: char.name,
+                    imgUrl: getAssetUrl(projectId, 'characters', char.id, selected.file_path),
+                    animation: result.animation
+                });
+            }
         });
 
-        const scenePromises = scenes.map(async (scene) => {
-            try {
-                const result = await api.getResourceVariants(projectId, 'scene', scene.id);
-                const selected = result.variants?.find(v => v.selected);
-                if (selected) {
-                    return {
-                        id: scene.id,
-                        name: scene.name,
-                        imgUrl: getAssetUrl(projectId, 'scenes', scene.id, selected.file_path)
-                    };
-                }
-            } catch (e) { }
-            return null;
+        scenes.forEach(scene => {
+            const result = sceneStatus[scene.id];
+            const selected = result?.variants?.find(v => v.selected);
+            if (selected) {
+                readyScenes.push({
+                    id: scene.id,
+                    name: scene.name,
+                    imgUrl: getAssetUrl(projectId, 'scenes', scene.id, selected.file_path)
+                });
+            }
         });
 
-        const charResults = await Promise.all(charPromises);
-        readyCharacters.push(...charResults.filter(Boolean));
-
-        const sceneResults = await Promise.all(scenePromises);
-        readyScenes.push(...sceneResults.filter(Boolean));
-
         // 填充下拉框
         const fillSelect = (el, items, defaultText, emptyText) => {
             let html = `<option value="">${items.length > 0 ? defaultText : emptyText}</option>`;
@@ -6,6 +6,15 @@ import { api } from './api.js';
 import { state } from './state.js';
 import { getAssetUrl } from './utils.js';
 
+// 风格化变体的显示名称 (与后端 image_stylizer.STYLES 对应)
+const STYLE_LABELS = {
+    vivid: '鲜艳',
+    bright: '明亮',
+    retro: '复古',
+    palette: '调色板',
+    outline: '描边'
+};
+
 /**
  * 显示资源面板
  */
@@ -100,9 +109,15 @@ export async function showResourcePanel(projectId, specType) {
             btn.onclick = () => clearItemTempDirectory(projectId, specType, btn.dataset.id);
         });
 
-        // 自动加载所有变体/选定状态
+        // 自动加载所有变体/选定状态 (一次批量请求)
+        const resourceType = specType === 'audio' ? 'sfx' : specType;
+        const status = await api.getProjectAssetStatus(projectId, specType).catch(error => {
+            console.error('获取资源状态失败:', error);
+            return { items: {} };
+        });
+        const statusItems = status.items?.[resourceType] || {};
         items.forEach(item => {
-            viewItemVariants(projectId, specType, item.id);
+            renderItemVariants(projectId, specType, item.id, statusItems[item.id] || { variants: [] });
         });
 
     } catch (error) {
@@ -150,6 +165,26 @@ export async function generateItemVariants(projectId, specType, itemId, forceReg
         btn.disabled = true;
     }
 
+    // 进度事件: 按钮显示脚本生成进度，每个变体渲染完成后立即显示
+    const resourceType = specType === 'audio' ? 'sfx' : specType;
+    const rendered = {};
+    const unsubscribe = await api.subscribeProjectEvents(projectId, (event) => {
+        if (event.item_id !== itemId || event.resource_type !== resourceType) return;
+        if (event.type === 'llm_tokens' && btn) {
+            btn.textContent = `AI 编写脚本中... (${event.tokens} tokens)`;
+        } else if (event.type === 'script_saved' && btn) {
+            btn.textContent = '渲染方案中...';
+        } else if (event.type === 'variant_rendered') {
+            rendered[event.seed] = event.variant;
+            const container = document.getElementById(`variants-${itemId}`);
+            if (container) {
+                const variants = Object.keys(rendered).sort((a, b) => a - b).map(seed => rendered[seed]);
+                container.innerHTML = renderVariantsHtml({ variants }, projectId, specType, itemId);
+            }
+            if (btn) btn.textContent = `渲染方案中... (${Object.keys(rendered).length}/${event.total})`;
+        }
+    }).catch(() => null);
+
     try {
         const result = await api.generateResourceScript(projectId, specType, itemId, {
             force_regenerate_script: forceRegen
@@ -167,6 +202,7 @@ export async function generateItemVariants(projectId, specType, itemId, forceReg
         console.error('生成变体失败:', error);
         alert('生成失败: ' + error.message);
     } finally {
+        if (unsubscribe) unsubscribe();
         if (btn) {
             btn.textContent = originalText;
             btn.disabled = false;
@@ -181,21 +217,26 @@ export async function viewItemVariants(projectId, specType, itemId) {
     try {
         const resourceType = specType === 'audio' ? 'sfx' : specType;
         const result = await api.getResourceVariants(projectId, resourceType, itemId);
-
-        const container = document.getElementById(`variants-${itemId}`);
-        if (!container) return;
-
-        if (result.variants && result.variants.length > 0) {
-            container.innerHTML = renderVariantsHtml(result, projectId, specType, itemId);
-        } else {
-            container.innerHTML = '<p class="muted">暂无方案，点击“智能生成”开始创作</p>';
-        }
-
+        renderItemVariants(projectId, specType, itemId, result);
     } catch (error) {
         console.error('获取变体失败:', error);
     }
 }
 
+/**
+ * 把变体结果渲染到条目的容器中
+ */
+function renderItemVariants(projectId, specType, itemId, result) {
+    const container = document.getElementById(`variants-${itemId}`);
+    if (!container) return;
+
+    if (result.variants && result.variants.length > 0) {
+        container.innerHTML = renderVariantsHtml(result, projectId, specType, itemId);
+    } else {
+        container.innerHTML = '<p class="muted">暂无方案，点击“智能生成”开始创作</p>';
+    }
+}
+
 /**
  * 渲染变体HTML
  */
@@ -336,7 +377,7 @@ export function renderVariantsHtml(result, projectId, specType, itemId) {
                 <div class="variant-preview">${previewHtml}</div>
                 <div class="variant-info">
                     <span class="variant-name">方案 ${idx + 1}</span>
-                    <span class="variant-seed">种子: ${v.seed || idx + 1}</span>
+                    <span class="variant-seed">${v.style ? `风格: ${STYLE_LABELS[v.style] || v.style}` : `种子: ${v.seed || idx + 1}`}</span>
                 </div>
                 <button class="btn btn-sm btn-primary w-full select-version-btn" data-variant="${v.variant_id}">选择此方案</button>
             </div>
@@ -384,6 +425,15 @@ export async function generateCharacterAnimations(projectId, itemId) {
         btn.disabled = true;
     }
 
+    const unsubscribe = await api.subscribeProjectEvents(projectId, (event) => {
+        if (event.item_id !== itemId || event.resource_type !== 'character' || !btn) return;
+        if (event.type === 'llm_tokens') {
+            btn.textContent = `动画设计中... (${event.tokens} tokens)`;
+        } else if (event.type === 'script_saved') {
+            btn.textContent = '动画渲染中...';
+        }
+    }).catch(() => null);
+
     try {
         const card = document.getElementById(`card-${itemId}`);
         const desc = card ? card.querySelector('.resource-item-desc').textContent.trim() : '游戏角色';
@@ -396,6 +446,7 @@ export async function generateCharacterAnimations(projectId, itemId) {
         console.error('动画生成失败:', error);
         alert('动画创作失败: ' + error.message);
     } finally {
+        if (unsubscribe) unsubscribe();
         if (btn) {
             btn.textContent = originalText;
             btn.disabled = false;
@@ -0,0 +1,109 @@
+/**
+ * 资源清单加载工具
+ *
+ * configs/asset_manifest.json 由后端生成:
+ * - assets: 资源 key -> { type, url, size, ... }，已打包进图集的资源带 atlas 字段
+ * - groups: boot (共用) / scene:<场景ID> / deferred (其余)
+ */
+
+export const MANIFEST_KEY = 'asset-manifest';
+export const MANIFEST_URL = 'configs/asset_manifest.json';
+
+export function getManifest(scene) {
+    return scene.cache.json.get(MANIFEST_KEY) || null;
+}
+
+/**
+ * 当前场景: URL 参数 ?scene= 优先，否则使用清单中的起始场景
+ */
+export function getCurrentSceneId(manifest) {
+    const param = new URLSearchParams(window.location.search).get('scene');
+    if (param && manifest?.groups?.[`scene:${param}`]) return param;
+    return manifest?.start_scene || null;
+}
+
+function isLoaded(scene, key, asset) {
+    if (asset.type === 'audio') return scene.cache.audio.exists(key);
+    return scene.textures.exists(key);
+}
+
+/**
+ * 把一个资源加入加载队列 (已加载或由图集提供的跳过)
+ */
+export function queueAsset(scene, key, asset) {
+    if (!asset || asset.atlas || isLoaded(scene, key, asset)) return false;
+
+    switch (asset.type) {
+        case 'image':
+            scene.load.image(key, asset.url);
+            break;
+        case 'spritesheet':
+            scene.load.spritesheet(key, asset.url, {
+                frameWidth: asset.frameWidth,
+                frameHeight: asset.frameHeight
+            });
+            break;
+        case 'audio':
+            scene.load.audio(key, asset.url);
+            break;
+        case 'multiatlas':
+            scene.load.multiatlas(key, asset.url, asset.path);
+            break;
+        default:
+            return false;
+    }
+    return true;
+}
+
+/**
+ * 把一个分组的资源加入加载队列，返回新加入的数量
+ */
+export function queueGroup(scene, manifest, group) {
+    const keys = manifest?.groups?.[group] || [];
+    return keys.filter(key => queueAsset(scene, key, manifest.assets[key])).length;
+}
+
+/**
+ * 后台加载其余全部资源 (不阻塞当前场景)
+ */
+export function loadRemaining(scene) {
+    const manifest = getManifest(scene);
+    if (!manifest) return;
+
+    let queued = 0;
+    for (const group of Object.keys(manifest.groups)) {
+        queued += queueGroup(scene, manifest, group);
+    }
+    if (queued > 0) {
+        scene.load.once('complete', () => createAnimations(scene));
+        scene.load.start();
+    }
+}
+
+/**
+ * 为已加载的序列帧创建动画 (图集中的动画由 BootScene 按帧名创建)
+ */
+export function createAnimations(scene) {
+    const manifest = getManifest(scene);
+    if (!manifest) return;
+
+    for (const [key, asset] of Object.entries(manifest.assets)) {
+        if (asset.type !== 'spritesheet' || asset.atlas) continue;
+        if (!scene.textures.exists(key) || scene.anims.exists(asset.animation)) continue;
+        scene.anims.create({
+            key: asset.animation,
+            frames: scene.anims.generateFrameNumbers(key, { start: 0, end: asset.frames - 1 }),
+            frameRate: 8,
+            repeat: asset.animation.endsWith('/attack') ? 0 : -1
+        });
+    }
+}
+
+/**
+ * 资源 key 对应的 [纹理 key, 帧名]，图集中的资源返回图集纹理与帧名
+ */
+export function textureFor(scene, key) {
+    const atlas = getManifest(scene)?.assets?.[key]?.atlas;
+    if (atlas?.frame) return [atlas.key, atlas.frame];
+    return [key, undefined];
+}
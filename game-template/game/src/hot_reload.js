@@ -0,0 +1,134 @@
+/**
+ * 预览热重载客户端
+ *
+ * 由后端预览服务 (/preview/<项目ID>/) 提供页面时连接游戏控制 WebSocket，按事件类型处理:
+ * - texture_changed / animation_changed: 只重新加载变化的纹理并替换到正在使用它的对象上
+ * - audio_changed: 重新加载音频缓存
+ * - manifest_changed: 刷新资源清单缓存
+ * - atlas_changed / code_changed: 整页刷新
+ */
+
+import { MANIFEST_KEY, MANIFEST_URL, getManifest } from './assets.js';
+
+const PREVIEW_PATH = /^\/preview\/([^/]+)\//;
+
+/**
+ * 取一个处于运行状态的场景用于加载文件
+ */
+function activeScene(game) {
+    return game.scene.getScenes(true)[0] || null;
+}
+
+/**
+ * 加载新纹理 (临时 key)，完成后替换同名纹理并更新所有引用它的对象
+ */
+function swapTexture(game, key, url, asset) {
+    const scene = activeScene(game);
+    if (!scene || !game.textures.exists(key)) return;
+
+    const tmpKey = `${key}#${Date.now()}`;
+    if (asset?.type === 'spritesheet') {
+        scene.load.spritesheet(tmpKey, url, { frameWidth: asset.frameWidth, frameHeight: asset.frameHeight });
+    } else {
+        scene.load.image(tmpKey, url);
+    }
+
+    scene.load.once('complete', () => {
+        game.textures.remove(key);
+        game.textures.renameTexture(tmpKey, key);
+
+        for (const s of game.scene.getScenes(true)) {
+            s.children.list.forEach(obj => {
+                if (obj.texture?.key === key) {
+                    obj.setTexture(key, obj.frame?.name);
+                }
+            });
+        }
+
+        // 序列帧: 用新纹理重建动画，正在播放的对象重新播放
+        if (asset?.animation && scene.anims.exists(asset.animation)) {
+            const config = scene.anims.get(asset.animation);
+            scene.anims.remove(asset.animation);
+            scene.anims.create({
+                key: asset.animation,
+                frames: scene.anims.generateFrameNumbers(key, { start: 0, end: asset.frames - 1 }),
+                frameRate: config.frameRate,
+                repeat: config.repeat
+            });
+            for (const s of game.scene.getScenes(true)) {
+                s.children.list.forEach(obj => {
+                    if (obj.anims?.currentAnim?.key === asset.animation) {
+                        obj.play(asset.animation);
+                    }
+                });
+            }
+        }
+    });
+    scene.load.start();
+}
+
+function reloadAudio(game, key, url) {
+    const scene = activeScene(game);
+    if (!scene || !scene.cache.audio.exists(key)) return;
+    scene.cache.audio.remove(key);
+    scene.load.audio(key, url);
+    scene.load.start();
+}
+
+function reloadManifest(game) {
+    const scene = activeScene(game);
+    if (!scene) return;
+    scene.cache.json.remove(MANIFEST_KEY);
+    scene.load.json(MANIFEST_KEY, `${MANIFEST_URL}?t=${Date.now()}`);
+    scene.load.start();
+}
+
+function handleEvent(game, event) {
+    const scene = activeScene(game);
+    const asset = scene ? getManifest(scene)?.assets?.[event.key] : null;
+
+    switch (event.type) {
+        case 'texture_changed':
+        case 'animation_changed':
+            // 由图集提供的资源要等图集重新打包 (atlas_changed)
+            if (event.key && event.url && !asset?.atlas) {
+                swapTexture(game, event.key, event.url, asset);
+            }
+            break;
+        case 'audio_changed':
+            if (event.key && event.url) reloadAudio(game, event.key, event.url);
+            break;
+        case 'manifest_changed':
+            reloadManifest(game);
+            break;
+        case 'atlas_changed':
+        case 'code_changed':
+            window.location.reload();
+            break;
+    }
+}
+
+/**
+ * 在预览页面中启用热重载 (非预览环境下不做任何事)
+ */
+export function enableHotReload(game) {
+    const match = window.location.pathname.match(PREVIEW_PATH);
+    if (!match) return;
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const url = `${protocol}//${window.location.host}/api/game/ws/${match[1]}`;
+
+    const connect = () => {
+        const socket = new WebSocket(url);
+        socket.onmessage = (message) => {
+            try {
+                handleEvent(game, JSON.parse(message.data));
+            } catch (e) {
+                console.warn('热重载事件处理失败:', e);
+            }
+        };
+        // 后端重启后自动重连
+        socket.onclose = () => setTimeout(connect, 2000);
+    };
+    connect();
+}
@@ -8,6 +8,7 @@ import Phaser from 'phaser';
 import { BootScene } from './scenes/BootScene.js';
 import { MenuScene } from './scenes/MenuScene.js';
 import { GameScene } from './scenes/GameScene.js';
+import { enableHotReload } from './hot_reload.js';
 
 // 游戏配置
 const config = {
@@ -32,3 +33,6 @@ const game = new Phaser.Game(config);
 
 // 导出游戏实例供调试使用
 window.game = game;
+
+// 预览环境下资源 / 代码变化时热重载
+enableHotReload(game);
@@ -1,7 +1,14 @@
 /**
  * 启动场景 - 加载游戏资源
+ *
+ * 只预加载资源清单中的共用资源 (boot) 与当前场景的资源，其余资源在菜单场景后台加载
  */
 
+import { MANIFEST_KEY, MANIFEST_URL, getCurrentSceneId, queueGroup, createAnimations } from '../assets.js';
+
+// 精灵图集的纹理 key
+export const ATLAS_KEY = 'sprites';
+
 export class BootScene extends Phaser.Scene {
     constructor() {
         super({ key: 'BootScene' });
@@ -46,15 +53,55 @@ export class BootScene extends Phaser.Scene {
             percentText.destroy();
         });
 
-        // 加载资源
-        // TODO: 从配置文件动态加载资源
-        // this.load.image('player', 'assets/characters/hero/selected/final.png');
-        // this.load.image('background', 'assets/scenes/level1/selected/final.png');
-        // this.load.audio('bgm', 'assets/audio/bgm/main/selected/final.wav');
+        // 加载资源清单 (后端在选定资源 / 上传动画 / 打包图集后生成)，读到后再把需要的分组加入队列
+        // 图集已打包时，角色 / 道具 / 动画帧由图集提供 (帧名: character/<id>、item/<id>、character/<id>/<动作>/<帧号>)
+        this.load.json(MANIFEST_KEY, MANIFEST_URL);
+        this.load.once(`filecomplete-json-${MANIFEST_KEY}`, (key, type, manifest) => {
+            queueGroup(this, manifest, 'boot');
+            const sceneId = getCurrentSceneId(manifest);
+            if (sceneId) {
+                queueGroup(this, manifest, `scene:${sceneId}`);
+            }
+            this.registry.set('currentScene', sceneId);
+        });
+        this.load.on('loaderror', (file) => {
+            if (file.key === MANIFEST_KEY) {
+                console.warn('未找到资源清单，跳过资源加载');
+            }
+        });
     }
 
     create() {
+        if (this.textures.exists(ATLAS_KEY)) {
+            this.createAtlasAnimations();
+        }
+        createAnimations(this);
+        this.registry.set('atlas', this.textures.exists(ATLAS_KEY) ? ATLAS_KEY : null);
+
         // 跳转到菜单场景
         this.scene.start('MenuScene');
     }
+
+    /**
+     * 按帧名为图集中的动画条创建动画，动画 key 与帧名前缀相同 (如 character/hero/walk)
+     */
+    createAtlasAnimations() {
+        const groups = {};
+        for (const name of this.textures.get(ATLAS_KEY).getFrameNames()) {
+            const match = name.match(/^(character\/[^/]+\/[^/]+)\/(\d+)$/);
+            if (match) {
+                (groups[match[1]] = groups[match[1]] || []).push(Number(match[2]));
+            }
+        }
+
+        for (const [key, indices] of Object.entries(groups)) {
+            if (this.anims.exists(key)) continue;
+            this.anims.create({
+                key,
+                frames: indices.sort((a, b) => a - b).map(i => ({ key: ATLAS_KEY, frame: `${key}/${i}` })),
+                frameRate: 8,
+                repeat: key.endsWith('/attack') ? 0 : -1
+            });
+        }
+    }
 }
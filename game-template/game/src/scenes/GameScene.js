@@ -4,6 +4,8 @@
  * 这是一个模板场景，会根据游戏配置动态生成
  */
 
+import { getManifest, queueGroup, createAnimations } from '../assets.js';
+
 export class GameScene extends Phaser.Scene {
     constructor() {
         super({ key: 'GameScene' });
@@ -15,7 +17,17 @@ export class GameScene extends Phaser.Scene {
         this.cursors = null;
     }
 
+    preload() {
+        // 当前场景的资源若还没在后台加载完，在这里补齐 (已加载的会跳过)
+        const manifest = getManifest(this);
+        const sceneId = this.registry.get('currentScene');
+        if (manifest && sceneId) {
+            queueGroup(this, manifest, `scene:${sceneId}`);
+        }
+    }
+
     create() {
+        createAnimations(this);
         const { width, height } = this.cameras.main;
 
         // 创建简单的地面平台
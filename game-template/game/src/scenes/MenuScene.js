@@ -2,6 +2,8 @@
  * 菜单场景 - 游戏主菜单
  */
 
+import { loadRemaining } from '../assets.js';
+
 export class MenuScene extends Phaser.Scene {
     constructor() {
         super({ key: 'MenuScene' });
@@ -52,5 +54,8 @@ export class MenuScene extends Phaser.Scene {
             font: '14px Arial',
             fill: '#64748b'
         }).setOrigin(0.5);
+
+        // 停留在菜单时后台加载其余场景的资源
+        loadRemaining(this);
     }
 }